@@ -3,17 +3,49 @@
 
 __version__ = '0.0.1'
 
-from .fuzzymatch import FuzzyMatchRatio, fuzzy_match, fuzzy_score
-from .hamming import (HammingMetric, HammingRatio, hamming_distance,
-                      hamming_ratio)
-from .jaccard import jaccard_distance, jaccard_index
-from .levenshtein import (LevenshteinMetric, LevenshteinRatio,
-                          levenshtein_distance, levenshtein_ratio)
+from importlib import import_module
+from typing import Any, List
+
+from .index import BKTree, VPTree
+from .jaccard import JaccardRatio, jaccard_distance, jaccard_index
 from .overlap import OverlapRatio, overlap_coefficient
 from .sequencematch import (Sequence, SequenceMatcher, sequence_match_length,
                             sequence_match_ratio)
 from .sorensendice import (Sequence, SorensenDiceRatio, SorensenRatio,
                            sorensen_coefficient, sorensen_dice_coefficient)
-from .trie import Trie
-from .word2vec import (Word2VecMetric, Word2VecRatio, word2vec_distance,
-                       word2vec_similarity)
+
+# Modules compiling numba kernels or loading spaCy are only imported on first use
+_LAZY = {
+    'fuzzymatch': ['FuzzyMatchRatio', 'fuzzy_match', 'fuzzy_score'],
+    'hamming': ['HammingIndex', 'HammingMetric', 'HammingRatio', 'hamming_cdist', 'hamming_distance', 'hamming_ratio',
+                'hamming_within', 'pack_bits'],
+    'levenshtein': ['LevenshteinMetric', 'LevenshteinRatio', 'levenshtein_distance', 'levenshtein_ratio'],
+    'minhash': ['MinHash', 'MinHashLSH'],
+    'process': ['FuzzySession', 'cdist', 'cpdist', 'extract', 'extract_one', 'fuzzy_score_many'],
+    'qgram': ['QGramIndex', 'qgrams'],
+    'tokenset': ['TokenSetCorpus', 'Vocabulary'],
+    'trie': ['FrozenTrie', 'Trie'],
+    'word2vec': ['Word2VecMetric', 'Word2VecRatio', 'word2vec_distance', 'word2vec_similarity'],
+}
+
+_LAZY_NAMES = {name: module for module, names in _LAZY.items() for name in names}
+
+__all__ = [
+    'BKTree', 'JaccardRatio', 'OverlapRatio', 'Sequence', 'SequenceMatcher', 'SorensenDiceRatio', 'SorensenRatio',
+    'VPTree', 'jaccard_distance', 'jaccard_index', 'overlap_coefficient', 'sequence_match_length',
+    'sequence_match_ratio', 'sorensen_coefficient', 'sorensen_dice_coefficient', *_LAZY_NAMES
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_NAMES:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+    value = getattr(import_module('.' + _LAZY_NAMES[name], __name__), name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_NAMES))
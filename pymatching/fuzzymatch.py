@@ -1,44 +1,217 @@
-import re
-from functools import lru_cache
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import numba
+import numpy as np
 
+from .levenshtein import _code_points
 from .measures.ratio import Ratio
 
+_NEWLINE = ord('\n')
 
-def _remaining(final_match: List[int]) -> int:
-    return len(list(filter(lambda x: x == -1, final_match)))
 
+@numba.njit(cache=True)
+def _candidates(pattern: np.ndarray, text: np.ndarray) -> np.ndarray:
+    """
+    Marks, for every pattern index s, the positions of pattern[s] from which
+    the rest of the pattern follows with no gap crossing a newline, which is
+    where the lookahead of pattern[s:] matches
+    """
+    n_pattern = len(pattern)
+    n_text = len(text)
+    candidates = np.zeros((n_pattern, n_text), dtype=np.bool_)
+
+    for p in range(n_text):
+        candidates[n_pattern - 1, p] = text[p] == pattern[n_pattern - 1]
+
+    for s in range(n_pattern - 2, -1, -1):
+        # Whether a candidate of the next index follows p within its line
+        follows = False
+
+        for p in range(n_text - 2, -1, -1):
+            if candidates[s + 1, p + 1]:
+                follows = True
+            elif text[p + 1] == _NEWLINE:
+                follows = False
+
+            candidates[s, p] = follows and text[p] == pattern[s]
+
+    return candidates
+
+
+@numba.njit(cache=True)
+def _follows(candidates: np.ndarray, text: np.ndarray, s: int, p: int) -> bool:
+    """
+    Whether pattern[s:] is empty or starts a match past p with no newline
+    before it
+    """
+    if s == len(candidates):
+        return True
+
+    for x in range(p + 1, len(text)):
+        if candidates[s, x]:
+            return True
+
+        if text[x] == _NEWLINE:
+            return False
+
+    return False
+
+
+@numba.njit(cache=True)
+def _masked(pattern: np.ndarray, candidates: np.ndarray, text: np.ndarray, s: int, p: int) -> bool:
+    """
+    Whether pattern[s:] matches where the regex matcher blanked text[:p + 1]
+    out with newlines, which its search finds before anything past p
+
+    Gaps cannot hold the newlines, so such a match starts with newlines of
+    the pattern running up to p
+    """
+    for j in range(1, min(len(pattern) - s, p + 1) + 1):
+        if pattern[s + j - 1] != _NEWLINE:
+            return False
+
+        if _follows(candidates, text, s + j, p):
+            return True
+
+    return False
+
+
+@numba.njit(cache=True)
+def _is_candidate(candidates: np.ndarray, firsts: np.ndarray, lasts: np.ndarray, s: int, p: int) -> bool:
+    """
+    Whether p is among the indices kept for pattern[s], those past the first
+    one kept for pattern[s - 1] up to the last one found
+    """
+    if p < 0 or p > lasts[s] or (s > 0 and p <= firsts[s - 1]):
+        return False
+
+    return candidates[s, p]
+
+
+@numba.njit(cache=True)
+def _remaining(match: np.ndarray) -> int:
+    count = 0
+    for x in match:
+        if x == -1:
+            count += 1
+
+    return count
+
+
+@numba.njit(cache=True)
+def _spread_consec(candidates: np.ndarray, firsts: np.ndarray, lasts: np.ndarray, match: np.ndarray):
+    """
+    Extends the decided indices to their undecided neighbours, one index
+    further on either side, until nothing changes
+    """
+    n_pattern = len(match)
+
+    before = n_pattern
+    left = _remaining(match)
+
+    while before > left > 0:
+        start = 0
+        while match[start] != -1:
+            start += 1
+
+        for s in range(start, n_pattern):
+            if match[s] != -1:
+                continue
+
+            # The index before the first one is the last one
+            bottom = match[s - 1] if s > 0 else match[n_pattern - 1]
+            if bottom > -1 and _is_candidate(candidates, firsts, lasts, s, bottom + 1):
+                match[s] = bottom + 1
+
+            if s + 1 < n_pattern:
+                top = match[s + 1]
+                if top > -1 and _is_candidate(candidates, firsts, lasts, s, top - 1):
+                    match[s] = top - 1
+
+        before = left
+        left = _remaining(match)
+
+
+@numba.njit(cache=True)
+def _align(pattern: np.ndarray, text: np.ndarray) -> np.ndarray:
+    """
+    Matches pattern in text as the regex matcher did, as the text index of
+    every pattern character, or -1 everywhere if there is none
+
+    The indices kept for pattern[s] are the positions past the first one kept
+    for pattern[s - 1] that start a match of pattern[s:] whose gaps stay
+    within a line. Middle characters with a single index take it and grow
+    groups of consecutive indices around them. Then, while characters are
+    left, the first one left takes the index that leaves the fewest left
+    """
+    n_pattern = len(pattern)
+    match = np.full(n_pattern, -1, dtype=np.int64)
+
+    candidates = _candidates(pattern, text)
+
+    # The first and last indices kept for every character, and their number
+    firsts = np.full(n_pattern, -1, dtype=np.int64)
+    lasts = np.full(n_pattern, -1, dtype=np.int64)
+    counts = np.zeros(n_pattern, dtype=np.int64)
+
+    for s in range(n_pattern):
+        p = firsts[s - 1] if s > 0 else -1
+
+        while p < 0 or not _masked(pattern, candidates, text, s, p):
+            p += 1
+            while p < len(text) and not candidates[s, p]:
+                p += 1
+
+            if p == len(text):
+                break
+
+            if counts[s] == 0:
+                firsts[s] = p
+            lasts[s] = p
+            counts[s] += 1
 
-def _spread_consec(matches, final_match):
-    final_match = final_match.copy()
+        if counts[s] == 0:
+            return match
 
-    oleft = len(matches)
-    left = _remaining(final_match)
-    while left < oleft and final_match.count(-1) > 0:
-        for i, l in list(enumerate(matches))[final_match.index(-1):]:
-            if final_match[i] == -1:
-                try:
-                    bot = final_match[i - 1]
-                    if bot > -1 and (bot + 1) in l:
-                        final_match[i] = bot + 1
+    for s in range(1, n_pattern - 1):
+        if counts[s] == 1:
+            match[s] = firsts[s]
 
-                except (IndexError, TypeError):
-                    pass
+    _spread_consec(candidates, firsts, lasts, match)
 
-                try:
-                    top = final_match[i + 1]
-                    if top > -1 and (top - 1) in l:
-                        final_match[i] = top - 1
+    while _remaining(match) != 0:
+        i = 0
+        while match[i] != -1:
+            i += 1
 
-                except (IndexError, TypeError):
-                    pass
+        # Characters between decided neighbours take their first index
+        for s in range(1, n_pattern - 1):
+            if match[s - 1] != -1 and match[s] == -1 and match[s + 1] != -1:
+                match[s] = firsts[s]
 
-        oleft = left
-        left = _remaining(final_match)
+        best = match
+        fewest = _remaining(match)
 
-    return final_match
+        for p in range(firsts[i], lasts[i] + 1):
+            if not _is_candidate(candidates, firsts, lasts, i, p):
+                continue
+
+            trial = match.copy()
+            trial[i] = p
+            _spread_consec(candidates, firsts, lasts, trial)
+
+            left = _remaining(trial)
+            if left < fewest:
+                best = trial
+                fewest = left
+
+                # Nothing can leave fewer
+                if left == 0:
+                    break
+
+        match = best
+
+    return match
 
 
 def _capture(s: str, l: List[int]) -> str:
@@ -63,84 +236,36 @@ def _compress_match(text: str, match: List[int]) -> Tuple[List[str], str, int]:
 
 
 def fuzzy_match(pattern: str, text: str) -> Tuple[List[str], str, int]:
-    def patlist(pat, sep):
-        return '(?=({}))'.format(sep.join(list(map(lambda x: '({})'.format(re.escape(x)), pat))))
-
-    # Mark all viable character indices
-    matches: List[List[int]] = [[] for _ in range(len(pattern))]
-    for s in range(len(pattern)):
-        pat = patlist(pattern[s:], '.*')
-
-        if s == 0:
-            ttext = text
-            st = -1
-        else:
-            # If previous character index list was empty, abort
-            if len(matches[s - 1]) == 0:
-                return ([], '', -1)
-
-            # Else make string with remaining valid text
-            st = matches[s - 1][0]
-            ttext = '\n' * (st + 1) + text[st + 1:]
-
-        m = re.search(pat, ttext)
-        while m is not None and m.start(1) > st:
-            st = m.start(1)
-            matches[s].append(st)
-
-            ttext = '\n' * (st + 1) + text[st + 1:]
-
-            m = re.search(pat, ttext)
-
-        # if s == 0:
-        #     matches[s] = [matches[s][-1]]
-        # elif s == len(pattern) - 1:
-        #     matches[s] = [matches[s][0]]
-
-    # If last character index list is empty, abort
-    if len(matches[-1]) == 0:
-        return ([], '', -1)
-
-    # -1 marks undecided indices
-    final_match: List[int] = [-1 for _ in range(len(pattern))]
-
-    # For any characters with only one choice, fill in index
-    for i, l in enumerate(matches[1: -1]):
-        if len(l) == 1:
-            final_match[i + 1] = l[0]
-
-    # Propagate decided indices to form groups
-    final_match = _spread_consec(matches, final_match)
-
-    # If there are remaining characters that aren't part of an existing group
-    while _remaining(final_match) != 0:
-        i = final_match.index(-1)
-
-        # If character is part of neighboring groups, then index doesn't matter
-        for j in range(1, len(final_match) - 1):
-            if final_match[j - 1] != -1 and final_match[j] == -1 and final_match[j + 1] != -1:
-                final_match[j] = matches[j][0]
+    """
+    Matches pattern as a subsequence of text, favouring long continuous
+    segments, gaps between segments never cross a newline
 
-        # Else, find the index that has the largest group
-        smallest = (_remaining(final_match), final_match)
-        for j in matches[i]:
-            fm = final_match.copy()
-            fm[i] = j
+    Parameters
+    ----------
+    pattern : str
+        the characters to find, in order
+    text : str
+        the string to search
 
-            fm = _spread_consec(matches, fm)
-            s = _remaining(fm)
+    Return
+    ------
+    Tuple[List[str], str, int]
+        the matched segments, the span of text they cover and its start, or
+        ([], '', -1) if there is no match, the same as those of the regex
+        matcher this replaced
+    """
+    if len(pattern) == 0 or len(pattern) > len(text):
+        return ([], '', -1)
 
-            if smallest is None or s < smallest[0]:
-                smallest = (s, fm)
+    match = _align(_code_points(pattern), _code_points(text))
 
-        final_match = smallest[1]
+    if match[0] < 0:
+        return ([], '', -1)
 
-    # Put the corresponding strings
-    return _compress_match(text, final_match)
+    return _compress_match(text, match.tolist())
 
 
-@lru_cache(100)
-@numba.njit('f8(u2, u2, u2, u2)')
+@numba.njit(cache=True)
 def _map_to_norm(a: int, b: int, c: int, n: int) -> float:
     """
     Maps the results of the fuzzy match to [0,1]
@@ -173,13 +298,72 @@ def _map_to_norm(a: int, b: int, c: int, n: int) -> float:
     return 1 - b / c + m / c
 
 
-def fuzzy_score(pattern: str, text: str) -> float:
-    result = fuzzy_match(pattern, text)
+@numba.njit(cache=True)
+def _fuzzy_score_encoded(pattern: np.ndarray, text: np.ndarray) -> float:
+    if len(pattern) == 0 or len(pattern) > len(text):
+        return 0
+
+    match = _align(pattern, text)
+
+    if match[0] < 0:
+        return 0
 
-    return _map_to_norm(len(result[1]), len(result[0]), len(pattern), len(text))
+    segments = 1
+    for i in range(1, len(match)):
+        if match[i] - match[i - 1] > 1:
+            segments += 1
+
+    # As the length of the span text[match[0]:match[-1] + 1]
+    return _map_to_norm(max(match[-1] - match[0] + 1, 0), segments, len(pattern), len(text))
+
+
+@numba.njit(cache=True)
+def _char_mask(codes: np.ndarray) -> np.uint64:
+    """
+    Sets one of 64 bits per character, a subsequence sets a subset of them
+    """
+    mask = np.uint64(0)
+    for i in range(len(codes)):
+        mask |= np.uint64(1) << np.uint64(codes[i] & 63)
+
+    return mask
+
+
+@numba.njit(cache=True)
+def _is_subsequence(pattern: np.ndarray, text: np.ndarray) -> bool:
+    s = 0
+    for p in range(len(text)):
+        if s < len(pattern) and text[p] == pattern[s]:
+            s += 1
+
+    return s == len(pattern)
+
+
+@numba.njit(cache=True)
+def _fuzzy_score_filtered(pattern: np.ndarray, mask: np.uint64, text: np.ndarray, cutoff: float) -> float:
+    """
+    Scores text, returning 0 without aligning when the character mask or a
+    greedy subsequence scan rule it out
+    """
+    if len(pattern) == 0 or len(pattern) > len(text):
+        return 0
+
+    if _char_mask(text) & mask != mask or not _is_subsequence(pattern, text):
+        return 0
+
+    score = _fuzzy_score_encoded(pattern, text)
+
+    return score if score >= cutoff else 0
+
+
+def fuzzy_score(pattern: str, text: str) -> float:
+    return float(_fuzzy_score_encoded(_code_points(pattern), _code_points(text)))
 
 
 class FuzzyMatchRatio(Ratio[str]):
+    _preprocess = staticmethod(_code_points)
+    cost = 16
+
     def ratio_min(self):
         return 0
 
@@ -188,3 +372,10 @@ class FuzzyMatchRatio(Ratio[str]):
 
     def ratio(self, a: str, b: str) -> float:
         return fuzzy_score(a, b)
+
+    def _ratio_prepared(self, a: str, b: str, prepared_a: Optional[np.ndarray],
+                        prepared_b: Optional[np.ndarray]) -> float:
+        if prepared_a is None or prepared_b is None:
+            return self.ratio(a, b)
+
+        return float(_fuzzy_score_encoded(prepared_a, prepared_b))
@@ -1,15 +1,70 @@
-from typing import Collection, TypeVar
+import heapq
+from functools import lru_cache
+from itertools import combinations
+from numbers import Integral
+from operator import ne
+from typing import (Any, Collection, List, Optional, Sequence, Set, Tuple,
+                    TypeVar, Union)
+
+import numba
+import numpy as np
 
 from .measures import Metric, Ratio
 
 T = TypeVar('T')
 
+Codes = Union[np.ndarray, Sequence[bytes], Sequence[int]]
+
+# Below this length, comparing in Python beats building arrays
+_VECTORISE_FROM = 64
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0f0f0f0f0f0f0f0f)
+_H01 = np.uint64(0x0101010101010101)
+
+
+def _as_arrays(a: Any, b: Any) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Views both sequences as arrays, if they compare element-wise the same
+    way as arrays
+    """
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        a = np.asarray(a)
+        b = np.asarray(b)
+
+        # Anything else, such as a str becoming a single element, would broadcast
+        if a.ndim == 1 and b.ndim == 1 and len(a) == len(b):
+            return a, b
+
+        return None
+
+    if len(a) < _VECTORISE_FROM:
+        return None
+
+    if isinstance(a, str) and isinstance(b, str):
+        return (np.frombuffer(a.encode('utf-32-le'), dtype=np.uint32),
+                np.frombuffer(b.encode('utf-32-le'), dtype=np.uint32))
+
+    if isinstance(a, (bytes, bytearray)) and isinstance(b, (bytes, bytearray)):
+        return np.frombuffer(a, dtype=np.uint8), np.frombuffer(b, dtype=np.uint8)
+
+    return None
+
 
 def hamming_distance(a: Collection[T], b: Collection[T]) -> int:
+    """
+    Counts the positions at which two equal length sequences differ, str,
+    bytes and NumPy arrays are compared as arrays
+    """
     if len(a) != len(b):
         raise ValueError("'a' and 'b' must be of equal length")
 
-    return sum(x != y for x, y in zip(a, b))
+    arrays = _as_arrays(a, b)
+    if arrays is not None:
+        return int(np.count_nonzero(arrays[0] != arrays[1]))
+
+    return sum(map(ne, a, b))
 
 
 def hamming_ratio(a: Collection[T], b: Collection[T]) -> float:
@@ -19,6 +74,492 @@ def hamming_ratio(a: Collection[T], b: Collection[T]) -> float:
     return 1 - hamming_distance(a, b) / len(a)
 
 
+def pack_bits(codes: Codes, n_bits: Optional[int] = None) -> np.ndarray:
+    """
+    Packs binary codes, such as perceptual hashes, into rows of uint64 words
+
+    Parameters
+    ----------
+    codes : Codes
+        a 2D array of bits, equal length bytes, or non-negative ints
+    n_bits : Optional[int]
+        the number of bits of int codes, by default that of the largest
+
+    Return
+    ------
+    np.ndarray
+        one row of words per code, padded with zero bits, the Hamming
+        distance between rows is that between the codes
+    """
+    if isinstance(codes, np.ndarray) and codes.ndim == 1 and codes.dtype.kind in 'iu':
+        # 64 bit hashes are already one word each
+        if (n_bits is None or n_bits <= 64) and (codes.dtype.kind == 'u' or np.all(codes >= 0)):
+            return codes.astype(np.uint64).reshape(-1, 1)
+
+        codes = codes.tolist()
+
+    elif not isinstance(codes, np.ndarray):
+        codes = list(codes)
+
+    if len(codes) > 0 and isinstance(codes[0], Integral) and not isinstance(codes, np.ndarray):
+        if n_bits is None:
+            n_bits = max(int(x).bit_length() for x in codes)
+
+        codes = [int(x).to_bytes((n_bits + 7) // 8, 'little') for x in codes]
+
+    if len(codes) > 0 and isinstance(codes[0], (bytes, bytearray)):
+        if len({len(x) for x in codes}) > 1:
+            raise ValueError('Codes must be of equal length')
+
+        data = np.frombuffer(b''.join(codes), dtype=np.uint8).reshape(len(codes), -1)
+
+    else:
+        bits = np.asarray(codes, dtype=bool)
+
+        if bits.ndim != 2:
+            raise ValueError('Codes must be bytes, ints or a 2D array of bits')
+
+        data = np.packbits(bits, axis=1, bitorder='little')
+
+    padding = -data.shape[1] % 8
+
+    return np.ascontiguousarray(np.pad(data, ((0, 0), (0, padding)))).view(np.uint64)
+
+
+def _packed(codes: Codes, n_bits: Optional[int] = None) -> np.ndarray:
+    # Packed rows pass through
+    if isinstance(codes, np.ndarray) and codes.dtype == np.uint64 and codes.ndim == 2:
+        return np.ascontiguousarray(codes)
+
+    return pack_bits(codes, n_bits)
+
+
+def _bit_length(codes: Codes) -> Optional[int]:
+    """
+    The number of bits of the largest int code, None for other codes
+    """
+    if isinstance(codes, np.ndarray):
+        if codes.ndim != 1 or codes.dtype.kind not in 'iu' or len(codes) == 0:
+            return None
+
+        return int(codes.max()).bit_length()
+
+    if len(codes) == 0 or not isinstance(codes[0], Integral):
+        return None
+
+    return max(int(x).bit_length() for x in codes)
+
+
+def _packed_query(query: Any, corpus: np.ndarray) -> np.ndarray:
+    if isinstance(query, np.ndarray) and query.dtype == np.uint64 and query.ndim == 1:
+        packed = query
+    else:
+        packed = pack_bits([query], corpus.shape[1] * 64 if isinstance(query, Integral) else None)[0]
+
+    if len(packed) != corpus.shape[1]:
+        raise ValueError('The query and the corpus must have codes of equal length')
+
+    return packed
+
+
+@numba.njit(cache=True)
+def _popcount(x: np.uint64) -> np.uint64:
+    x = x - ((x >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+
+    return (x * _H01) >> np.uint64(56)
+
+
+@numba.njit(cache=True, parallel=True)
+def _packed_cdist(queries: np.ndarray, corpus: np.ndarray, out: np.ndarray):
+    n_columns = len(corpus)
+
+    # Flattened, so a single query still spreads over every thread
+    for p in numba.prange(out.size):
+        i = p // n_columns
+        j = p % n_columns
+
+        count = np.uint64(0)
+        for k in range(queries.shape[1]):
+            count += _popcount(queries[i, k] ^ corpus[j, k])
+
+        out[i, j] = count
+
+
+@numba.njit(cache=True, parallel=True)
+def _packed_within(query: np.ndarray, corpus: np.ndarray, radius: np.uint64, out: np.ndarray):
+    for i in numba.prange(len(corpus)):
+        count = np.uint64(0)
+
+        # Codes are dropped as soon as they exceed the radius
+        for k in range(len(query)):
+            count += _popcount(query[k] ^ corpus[i, k])
+
+            if count > radius:
+                break
+
+        out[i] = count
+
+
+def hamming_cdist(queries: Codes, corpus: Codes, n_bits: Optional[int] = None) -> np.ndarray:
+    """
+    Computes the Hamming distance between every query and every code of a
+    corpus, both packed or taken by pack_bits
+
+    Parameters
+    ----------
+    queries : Codes
+        packed rows, or codes taken by pack_bits
+    corpus : Codes
+        packed rows, or codes taken by pack_bits
+    n_bits : Optional[int]
+        the number of bits of int codes, by default that of the largest of
+        either, so that both are packed to the same length
+
+    Return
+    ------
+    np.ndarray
+        an int64 matrix, rows following queries and columns corpus
+    """
+    if not isinstance(queries, np.ndarray):
+        queries = list(queries)
+
+    if not isinstance(corpus, np.ndarray):
+        corpus = list(corpus)
+
+    if n_bits is None:
+        lengths = [x for x in (_bit_length(queries), _bit_length(corpus)) if x is not None]
+        n_bits = max(lengths, default=None)
+
+    corpus = _packed(corpus, n_bits)
+    queries = _packed(queries, n_bits)
+
+    if queries.shape[1] != corpus.shape[1]:
+        raise ValueError('Queries and the corpus must have codes of equal length')
+
+    out = np.empty((len(queries), len(corpus)), dtype=np.int64)
+    _packed_cdist(queries, corpus, out)
+
+    return out
+
+
+def hamming_within(query: Any, corpus: Codes, radius: int) -> List[Tuple[int, int]]:
+    """
+    Finds every code of a corpus within radius of a query
+
+    Parameters
+    ----------
+    query : Any
+        a packed row, a row of bits, bytes or an int
+    corpus : Codes
+        packed rows, or codes taken by pack_bits, packing beforehand saves
+        doing it on every call
+    radius : int
+        the largest Hamming distance
+
+    Return
+    ------
+    List[Tuple[int, int]]
+        (index, distance) pairs, closest first then by index
+    """
+    if radius < 0:
+        raise ValueError("'radius' must be non-negative")
+
+    corpus = _packed(corpus)
+    out = np.empty(len(corpus), dtype=np.int64)
+    _packed_within(_packed_query(query, corpus), corpus, np.uint64(radius), out)
+
+    indices = np.flatnonzero(out <= radius)
+    indices = indices[np.argsort(out[indices], kind='stable')]
+
+    return list(zip(indices.tolist(), out[indices].tolist()))
+
+
+@numba.njit(cache=True)
+def _substrings(codes: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Cuts every packed code into consecutive substrings of bits, as integers
+    """
+    out = np.empty((len(codes), len(starts)), dtype=np.uint64)
+
+    for i in range(len(codes)):
+        for s in range(len(starts)):
+            word = starts[s] // 64
+            offset = starts[s] % 64
+
+            value = codes[i, word] >> np.uint64(offset)
+            if offset + lengths[s] > 64:
+                value |= codes[i, word + 1] << np.uint64(64 - offset)
+
+            if lengths[s] < 64:
+                value &= (np.uint64(1) << np.uint64(lengths[s])) - np.uint64(1)
+
+            out[i, s] = value
+
+    return out
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(n_bits: int, distance: int) -> np.ndarray:
+    """
+    Every mask of n_bits bits with exactly distance bits set
+    """
+    return np.array([sum(1 << i for i in bits) for bits in combinations(range(n_bits), distance)], dtype=np.uint64)
+
+
+def _n_masks(n_bits: int, distance: int) -> int:
+    """
+    The number of masks _flip_masks would enumerate, without enumerating them
+    """
+    count = 1
+    for i in range(distance):
+        count = count * (n_bits - i) // (i + 1)
+
+    return count
+
+
+class HammingIndex:
+    """
+    Multi-index hashing of binary codes, for Hamming radius and nearest
+    neighbour queries without scanning every code
+
+    Codes are cut into m substrings with one table each. Codes within r of a
+    query are within r // m of it on at least one substring, so only the
+    entries of the tables that close to the query need verifying
+    """
+    __slots__ = ['n_bits', 'm', 'size', '_codes', '_starts', '_lengths', '_tables']
+
+    def __init__(self, n_bits: int, codes: Codes = (), m: Optional[int] = None):
+        """
+        Parameters
+        ----------
+        n_bits : int
+            the number of bits of every code
+        codes : Codes
+            codes indexed in bulk, see pack_bits
+        m : Optional[int]
+            the number of substrings, by default one per 16 bits, substrings
+            of about log2(len(codes)) bits answer queries fastest
+        """
+        if n_bits < 1:
+            raise ValueError("'n_bits' must be positive")
+
+        if m is None:
+            m = max(round(n_bits / 16), 1)
+
+        if not 0 < m <= n_bits or -(-n_bits // m) > 64:
+            raise ValueError("'m' must be within [n_bits / 64, n_bits]")
+
+        self.n_bits = n_bits
+        self.m = m
+        self.size = 0
+
+        self._codes = np.empty((16, -(-n_bits // 64)), dtype=np.uint64)
+        self._lengths = np.array([n_bits // m + (s < n_bits % m) for s in range(m)], dtype=np.int64)
+        self._starts = np.concatenate([[0], np.cumsum(self._lengths)[:-1]]).astype(np.int64)
+
+        self._tables: Optional[List[Tuple[np.ndarray, np.ndarray, np.ndarray]]] = None
+
+        self.extend(codes)
+
+    @property
+    def codes(self) -> np.ndarray:
+        """
+        The packed codes, in insertion order
+        """
+        return self._codes[:self.size]
+
+    def _pack(self, codes: Codes) -> np.ndarray:
+        is_packed = isinstance(codes, np.ndarray) and codes.dtype == np.uint64 and codes.ndim == 2
+        packed = codes if is_packed else pack_bits(codes, self.n_bits)
+
+        if packed.shape[1] != self._codes.shape[1]:
+            raise ValueError('Codes must have n_bits bits')
+
+        # Bits past n_bits would count towards distances without being hashed
+        if self.n_bits % 64 and np.any(packed[:, -1] >> np.uint64(self.n_bits % 64)):
+            raise ValueError('Codes must have n_bits bits')
+
+        return np.ascontiguousarray(packed)
+
+    def add(self, code: Any) -> int:
+        """
+        Inserts a code, returning its index
+        """
+        is_row = isinstance(code, np.ndarray) and code.dtype == np.uint64 and code.ndim == 1
+        self.extend(code[None] if is_row else [code])
+
+        return self.size - 1
+
+    def extend(self, codes: Codes):
+        """
+        Inserts codes, the tables are sorted again on the next query
+        """
+        if not isinstance(codes, np.ndarray):
+            codes = list(codes)
+
+        if len(codes) == 0:
+            return
+
+        packed = self._pack(codes)
+
+        if self.size + len(packed) > len(self._codes):
+            grown = np.empty((max(2 * len(self._codes), self.size + len(packed)), self._codes.shape[1]),
+                             dtype=np.uint64)
+            grown[:self.size] = self.codes
+            self._codes = grown
+
+        self._codes[self.size:self.size + len(packed)] = packed
+        self.size += len(packed)
+
+        self._tables = None
+
+    @property
+    def tables(self) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        The table of every substring, as its sorted distinct values, the
+        offsets of each into the indices of the codes holding it and those
+        indices, by increasing index
+        """
+        if self._tables is None:
+            keys = _substrings(self.codes, self._starts, self._lengths)
+            self._tables = []
+
+            for s in range(self.m):
+                # Short substrings sort as narrow integers, which NumPy radix sorts
+                column = keys[:, s].astype(np.min_scalar_type((1 << int(self._lengths[s])) - 1))
+                order = np.argsort(column, kind='stable')
+                column = column[order]
+
+                changes = np.ones(len(column), dtype=bool)
+                changes[1:] = column[1:] != column[:-1]
+                starts = np.flatnonzero(changes)
+                offsets = np.append(starts, self.size).astype(np.int64)
+
+                self._tables.append((column[starts].astype(np.uint64), offsets, order.astype(np.int64)))
+
+        return self._tables
+
+    def _query_keys(self, code: Any) -> Tuple[np.ndarray, np.ndarray]:
+        packed = self._pack(code[None] if isinstance(code, np.ndarray) and code.dtype == np.uint64 else [code])
+
+        return packed, _substrings(packed, self._starts, self._lengths)[0]
+
+    def _lookup(self, key: np.uint64, s: int, distance: int, seen: Set[int]) -> List[int]:
+        """
+        The unseen codes whose substring s is exactly distance away from key
+        """
+        unique, offsets, ids = self.tables[s]
+        if len(unique) == 0:
+            return []
+
+        neighbours = key ^ _flip_masks(int(self._lengths[s]), distance)
+        positions = np.minimum(np.searchsorted(unique, neighbours), len(unique) - 1)
+        positions = positions[unique[positions] == neighbours]
+
+        found = []
+        for p in positions.tolist():
+            for i in ids[offsets[p]:offsets[p + 1]].tolist():
+                if i not in seen:
+                    seen.add(i)
+                    found.append(i)
+
+        return found
+
+    def _scan(self, packed: np.ndarray) -> np.ndarray:
+        out = np.empty((1, self.size), dtype=np.int64)
+        _packed_cdist(packed, self.codes, out)
+
+        return out[0]
+
+    def _verify(self, packed: np.ndarray, ids: List[int]) -> np.ndarray:
+        out = np.empty((1, len(ids)), dtype=np.int64)
+        _packed_cdist(packed, self._codes[ids], out)
+
+        return out[0]
+
+    def query(self, code: Any, radius: int) -> List[Tuple[int, int]]:
+        """
+        Finds every code within radius of a code
+
+        Parameters
+        ----------
+        code : Any
+            a packed row, a row of bits, bytes or an int
+        radius : int
+            the largest Hamming distance
+
+        Return
+        ------
+        List[Tuple[int, int]]
+            (index, distance) pairs, closest first then by index
+        """
+        if radius < 0:
+            raise ValueError("'radius' must be non-negative")
+
+        packed, keys = self._query_keys(code)
+        depths = [min(radius // self.m, int(length)) for length in self._lengths]
+
+        # Past as many masks as codes, scanning every code is cheaper
+        if sum(_n_masks(int(length), d) for length, depth in zip(self._lengths, depths)
+               for d in range(depth + 1)) > self.size:
+            return hamming_within(packed[0], self.codes, radius)
+
+        seen: Set[int] = set()
+        ids: List[int] = []
+
+        for s in range(self.m):
+            for distance in range(depths[s] + 1):
+                ids.extend(self._lookup(keys[s], s, distance, seen))
+
+        distances = self._verify(packed, ids)
+        order = np.lexsort((ids, distances))
+
+        return [(ids[i], int(distances[i])) for i in order if distances[i] <= radius]
+
+    def knn(self, code: Any, k: int) -> List[Tuple[int, int]]:
+        """
+        Finds the k codes closest to a code, closest first then by index
+
+        Substrings are searched at growing distances, after which unseen codes
+        are known to be at least as far as the sum of those distances. Once a
+        distance has more neighbours to enumerate than there are codes, every
+        code is scanned instead
+        """
+        if k < 1 or self.size == 0:
+            return []
+
+        packed, keys = self._query_keys(code)
+        seen: Set[int] = set()
+        best: List[Tuple[int, int]] = []
+
+        for distance in range(int(self._lengths.max()) + 1):
+            for s in range(self.m):
+                if distance > self._lengths[s]:
+                    continue
+
+                # Past as many masks as codes, scanning every code is cheaper
+                if _n_masks(int(self._lengths[s]), distance) > self.size:
+                    distances = self._scan(packed)
+                    order = np.argsort(distances, kind='stable')[:k]
+
+                    return list(zip(order.tolist(), distances[order].tolist()))
+
+                ids = self._lookup(keys[s], s, distance, seen)
+                best = heapq.nsmallest(k, best + list(zip(self._verify(packed, ids).tolist(), ids)))
+
+                # Tables up to s are searched to distance, the others one less
+                bound = self.m * distance + s + 1
+                if len(seen) == self.size or len(best) == k and best[-1][0] < bound:
+                    return [(i, d) for d, i in best]
+
+        return [(i, d) for d, i in best]
+
+    def __len__(self) -> int:
+        return self.size
+
+
 class HammingMetric(Metric[Collection[T]]):
     def __call__(self, a: Collection[T], b: Collection[T]) -> int:
         return hamming_distance(a, b)
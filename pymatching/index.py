@@ -0,0 +1,300 @@
+import heapq
+from itertools import count
+from typing import Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from .measures import Metric
+
+T = TypeVar('T')
+
+
+def _nearest(candidates: List[Tuple[float, int, T]]) -> List[Tuple[T, float]]:
+    return [(item, -negated) for negated, _, item in sorted(candidates, key=lambda x: (-x[0], -x[1]))]
+
+
+class _BKNode(Generic[T]):
+    __slots__ = ['item', 'children']
+
+    def __init__(self, item: T):
+        self.item = item
+        self.children: Dict[float, _BKNode[T]] = {}
+
+
+class BKTree(Generic[T]):
+    """
+    Burkhard-Keller tree, indexes items under an integer valued metric such
+    as LevenshteinMetric or HammingMetric
+
+    Every child is keyed by its distance to its parent, so the triangle
+    inequality bounds which subtrees can hold items near a query
+    """
+    __slots__ = ['metric', 'root', 'size']
+
+    def __init__(self, metric: Metric[T], items: Iterable[T] = ()):
+        self.metric = metric
+        self.root: Optional[_BKNode[T]] = None
+        self.size = 0
+
+        self.extend(items)
+
+    def add(self, item: T) -> bool:
+        """
+        Inserts an item, returning False if it was already present
+        """
+        if self.root is None:
+            self.root = _BKNode(item)
+            self.size += 1
+
+            return True
+
+        curr = self.root
+
+        while True:
+            d = self.metric(item, curr.item)
+
+            if d == 0:
+                return False
+
+            if d not in curr.children:
+                curr.children[d] = _BKNode(item)
+                self.size += 1
+
+                return True
+
+            curr = curr.children[d]
+
+    def extend(self, items: Iterable[T]):
+        for item in items:
+            self.add(item)
+
+    def range_query(self, x: T, radius: float) -> List[Tuple[T, float]]:
+        """
+        Finds every item within radius of x, closest first
+        """
+        results: List[Tuple[T, float]] = []
+
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = self.metric(x, node.item)
+
+            if d <= radius:
+                results.append((node.item, d))
+
+            for key, child in node.children.items():
+                if d - radius <= key <= d + radius:
+                    stack.append(child)
+
+        return sorted(results, key=lambda x: x[1])
+
+    def knn(self, x: T, k: int) -> List[Tuple[T, float]]:
+        """
+        Finds the k items closest to x, closest first
+        """
+        if k < 1 or self.root is None:
+            return []
+
+        tiebreak = count()
+
+        # Max-heap of the best items found, min-heap of subtrees by lower bound
+        best: List[Tuple[float, int, T]] = []
+        frontier: List[Tuple[float, int, _BKNode[T]]] = [(0, next(tiebreak), self.root)]
+
+        while frontier:
+            bound, _, node = heapq.heappop(frontier)
+
+            if len(best) == k and bound > -best[0][0]:
+                break
+
+            d = self.metric(x, node.item)
+            entry = (-d, -next(tiebreak), node.item)
+
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif d < -best[0][0]:
+                heapq.heapreplace(best, entry)
+
+            for key, child in node.children.items():
+                heapq.heappush(frontier, (abs(d - key), next(tiebreak), child))
+
+        return _nearest(best)
+
+    def __contains__(self, item: T) -> bool:
+        return len(self.range_query(item, 0)) > 0
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class _VPNode(Generic[T]):
+    __slots__ = ['item', 'mu', 'inside', 'outside']
+
+    def __init__(self, item: T):
+        self.item = item
+        self.mu: Optional[float] = None
+        self.inside: Optional[_VPNode[T]] = None
+        self.outside: Optional[_VPNode[T]] = None
+
+
+class VPTree(Generic[T]):
+    """
+    Vantage-point tree, indexes items under any metric, including real valued
+    ones such as Word2VecMetric or WeightedSumMetric
+
+    Every node splits its subtree at the median distance mu to its vantage
+    point, items closer than mu are inside, those farther are outside and
+    those at mu fall on either side
+    """
+    __slots__ = ['metric', 'root', 'size']
+
+    def __init__(self, metric: Metric[T], items: Iterable[T] = ()):
+        self.metric = metric
+        self.root: Optional[_VPNode[T]] = None
+        self.size = 0
+
+        self.extend(items)
+
+    def _build(self, items: List[T]) -> Optional[_VPNode[T]]:
+        if not items:
+            return None
+
+        root = _VPNode(items[0])
+
+        # Explicit stack of nodes and the items left to place below them
+        stack = [(root, items[1:])]
+        while stack:
+            node, rest = stack.pop()
+
+            if not rest:
+                continue
+
+            # Split at the median by position, so items at mu fill both halves
+            ranked = sorted(zip([self.metric(node.item, x) for x in rest], count(), rest))
+            half = len(ranked) // 2
+            node.mu = ranked[half][0]
+
+            inside = [x for _, _, x in ranked[:half]]
+            outside = [x for _, _, x in ranked[half:]]
+
+            if inside:
+                node.inside = _VPNode(inside[0])
+                stack.append((node.inside, inside[1:]))
+
+            node.outside = _VPNode(outside[0])
+            stack.append((node.outside, outside[1:]))
+
+        return root
+
+    def add(self, item: T):
+        """
+        Inserts an item below the existing vantage points
+        """
+        self.size += 1
+
+        if self.root is None:
+            self.root = _VPNode(item)
+
+            return
+
+        curr = self.root
+
+        while True:
+            d = self.metric(curr.item, item)
+
+            if curr.mu is None:
+                curr.mu = d
+
+            if d < curr.mu:
+                if curr.inside is None:
+                    curr.inside = _VPNode(item)
+
+                    return
+
+                curr = curr.inside
+
+            else:
+                if curr.outside is None:
+                    curr.outside = _VPNode(item)
+
+                    return
+
+                curr = curr.outside
+
+    def extend(self, items: Iterable[T]):
+        """
+        Inserts items, an empty tree is built balanced in bulk
+        """
+        items = list(items)
+
+        if self.root is None:
+            self.root = self._build(items)
+            self.size = len(items)
+
+        else:
+            for item in items:
+                self.add(item)
+
+    def range_query(self, x: T, radius: float) -> List[Tuple[T, float]]:
+        """
+        Finds every item within radius of x, closest first
+        """
+        results: List[Tuple[T, float]] = []
+
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = self.metric(x, node.item)
+
+            if d <= radius:
+                results.append((node.item, d))
+
+            if node.mu is None:
+                continue
+
+            if node.inside is not None and d - radius <= node.mu:
+                stack.append(node.inside)
+
+            if node.outside is not None and d + radius >= node.mu:
+                stack.append(node.outside)
+
+        return sorted(results, key=lambda x: x[1])
+
+    def knn(self, x: T, k: int) -> List[Tuple[T, float]]:
+        """
+        Finds the k items closest to x, closest first
+        """
+        if k < 1 or self.root is None:
+            return []
+
+        tiebreak = count()
+
+        # Max-heap of the best items found, min-heap of subtrees by lower bound
+        best: List[Tuple[float, int, T]] = []
+        frontier: List[Tuple[float, int, _VPNode[T]]] = [(0, next(tiebreak), self.root)]
+
+        while frontier:
+            bound, _, node = heapq.heappop(frontier)
+
+            if len(best) == k and bound > -best[0][0]:
+                break
+
+            d = self.metric(x, node.item)
+            entry = (-d, -next(tiebreak), node.item)
+
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif d < -best[0][0]:
+                heapq.heapreplace(best, entry)
+
+            if node.mu is None:
+                continue
+
+            if node.inside is not None:
+                heapq.heappush(frontier, (max(d - node.mu, 0), next(tiebreak), node.inside))
+
+            if node.outside is not None:
+                heapq.heappush(frontier, (max(node.mu - d, 0), next(tiebreak), node.outside))
+
+        return _nearest(best)
+
+    def __len__(self) -> int:
+        return self.size
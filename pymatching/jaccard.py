@@ -1,16 +1,36 @@
-from typing import Iterable, TypeVar
+from typing import AbstractSet, Any, Iterable, TypeVar
 
-T = TypeVar('T')
+from .measures import Ratio
 
+T = TypeVar('T')
 
-def jaccard_index(one: Iterable[T], two: Iterable[T]) -> float:
-    a = set(one)
-    b = set(two)
 
+def _jaccard_sets(a: AbstractSet[Any], b: AbstractSet[Any]) -> float:
     len_inter = len(a & b)
 
     return len_inter / (len(a) + len(b) - len_inter)
 
 
+def jaccard_index(one: Iterable[T], two: Iterable[T]) -> float:
+    return _jaccard_sets(set(one), set(two))
+
+
 def jaccard_distance(one: Iterable[T], two: Iterable[T]) -> float:
     return 1 - jaccard_index(one, two)
+
+
+class JaccardRatio(Ratio[Iterable[T]]):
+    _preprocess = staticmethod(set)
+
+    def ratio_min(self) -> int:
+        return 0
+
+    def ratio_max(self) -> int:
+        return 1
+
+    def ratio(self, a: Iterable[T], b: Iterable[T]) -> float:
+        return jaccard_index(a, b)
+
+    def _ratio_prepared(self, a: Iterable[T], b: Iterable[T], prepared_a: AbstractSet[T],
+                        prepared_b: AbstractSet[T]) -> float:
+        return _jaccard_sets(prepared_a, prepared_b)
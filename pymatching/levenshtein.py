@@ -1,4 +1,4 @@
-from typing import Sequence, TypeVar
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple, TypeVar
 
 import numba
 import numpy as np
@@ -7,9 +7,257 @@ from .measures import Metric, Ratio
 
 T = TypeVar('T')
 
+_ONE = np.uint64(1)
+_WORD_SIZE = 64
+_BAND_MIN = 16
+_BAND_PER_WORD = 4
+
+
+def _code_points(s: Any) -> Optional[np.ndarray]:
+    """
+    Encodes a string as an int64 array of its code points, None otherwise
+    """
+    if not isinstance(s, str):
+        return None
+
+    return np.frombuffer(s.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+
+def _encode(one: Sequence[T], two: Sequence[T]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encodes two sequences as int64 arrays so that equal elements share a code
+
+    Strings are encoded by their code points, any other sequence is encoded by
+    interning its elements
+    """
+    if isinstance(one, str) and isinstance(two, str):
+        return _code_points(one), _code_points(two)
+
+    codes: Dict[Hashable, int] = {}
+
+    return (
+        np.array([codes.setdefault(x, len(codes)) for x in one], dtype=np.int64),
+        np.array([codes.setdefault(x, len(codes)) for x in two], dtype=np.int64)
+    )
+
+
+@numba.njit(cache=True)
+def _pattern_masks(pattern: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Builds the match bit vectors of the pattern, one row per distinct symbol
+    and one column per 64 symbol block of the pattern
+    """
+    alphabet = np.unique(pattern)
+    peq = np.zeros((len(alphabet), (len(pattern) + _WORD_SIZE - 1) // _WORD_SIZE), dtype=np.uint64)
+
+    for i in range(len(pattern)):
+        peq[np.searchsorted(alphabet, pattern[i]), i // _WORD_SIZE] |= _ONE << np.uint64(i % _WORD_SIZE)
+
+    return alphabet, peq
+
+
+@numba.njit(cache=True)
+def _symbol_row(alphabet: np.ndarray, symbol: int) -> int:
+    k = np.searchsorted(alphabet, symbol)
+
+    if k < len(alphabet) and alphabet[k] == symbol:
+        return k
+
+    return -1
+
+
+@numba.njit(cache=True)
+def _myers(pattern: np.ndarray, text: np.ndarray, max_distance: int) -> int:
+    """
+    Myers' bit-parallel edit distance for patterns of at most 64 symbols,
+    returns max_distance + 1 once the distance can no longer be within bound
+    """
+    alphabet, peq = _pattern_masks(pattern)
+
+    pv = ~np.uint64(0)
+    mv = np.uint64(0)
+    last = _ONE << np.uint64(len(pattern) - 1)
+    score = len(pattern)
+
+    for j in range(len(text)):
+        k = _symbol_row(alphabet, text[j])
+        eq = peq[k, 0] if k >= 0 else np.uint64(0)
+
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+
+        ph = (ph << _ONE) | _ONE
+        mh = mh << _ONE
+        pv = mh | ~(xv | ph)
+        mv = ph & xv
+
+        # Each remaining column lowers the score by at most one
+        if score - (len(text) - j - 1) > max_distance:
+            return max_distance + 1
+
+    return score
+
+
+@numba.njit(cache=True)
+def _myers_blocked(pattern: np.ndarray, text: np.ndarray, max_distance: int) -> int:
+    """
+    Hyyrö's blocked variant of Myers' algorithm for patterns longer than 64
+    symbols, the horizontal deltas are carried from one block to the next
+    """
+    alphabet, peq = _pattern_masks(pattern)
+    words = peq.shape[1]
+
+    pv = np.full(words, ~np.uint64(0), dtype=np.uint64)
+    mv = np.zeros(words, dtype=np.uint64)
+    high = np.uint64(_WORD_SIZE - 1)
+    last = _ONE << np.uint64((len(pattern) - 1) % _WORD_SIZE)
+    score = len(pattern)
+
+    for j in range(len(text)):
+        k = _symbol_row(alphabet, text[j])
+
+        # The first row of the matrix always increases by one
+        ph_carry = _ONE
+        mh_carry = np.uint64(0)
+
+        for w in range(words):
+            eq = peq[k, w] if k >= 0 else np.uint64(0)
+            p = pv[w]
+            m = mv[w]
+
+            xv = eq | m
+            eq |= mh_carry
+            xh = (((eq & p) + p) ^ p) | eq
+            ph = m | ~(xh | p)
+            mh = p & xh
+
+            if w == words - 1:
+                if ph & last:
+                    score += 1
+                elif mh & last:
+                    score -= 1
+
+            ph_out = ph >> high
+            mh_out = mh >> high
+
+            ph = (ph << _ONE) | ph_carry
+            mh = (mh << _ONE) | mh_carry
+            pv[w] = mh | ~(xv | ph)
+            mv[w] = ph & xv
+
+            ph_carry = ph_out
+            mh_carry = mh_out
+
+        if score - (len(text) - j - 1) > max_distance:
+            return max_distance + 1
+
+    return score
+
+
+@numba.njit(cache=True)
+def _levenshtein_banded(one: np.ndarray, two: np.ndarray, max_distance: int) -> int:
+    """
+    Ukkonen's banded dynamic programming, only the diagonals that can still
+    lead to a distance within max_distance are computed
+
+    Expects len(one) <= len(two) <= len(one) + max_distance
+    """
+    m = len(one)
+    n = len(two)
+    bound = max_distance + 1
+
+    # A cell off the band costs at least its offset from both end diagonals
+    slack = (max_distance - (n - m)) // 2
+    hi = n - m + slack
+
+    row = np.empty(n + 1, dtype=np.int64)
+    for j in range(n + 1):
+        row[j] = j if j <= hi else bound
+
+    for i in range(1, m + 1):
+        first = max(1, i - slack)
+        last = min(n, i + hi)
+
+        if first == 1:
+            diag = row[0]
+            left = i if i <= slack else bound
+            row[0] = left
+
+        else:
+            diag = row[first - 1]
+            left = bound
+
+        row_min = bound
+        for j in range(first, last + 1):
+            up = row[j]
+
+            if one[i - 1] == two[j - 1]:
+                value = diag
+            else:
+                value = min(1 + min(diag, up, left), bound)
+
+            diag = up
+            left = value
+            row[j] = value
+            row_min = min(row_min, value)
+
+        if last < n:
+            row[last + 1] = bound
+
+        # Every alignment crosses this row
+        if row_min > max_distance:
+            return bound
+
+    return min(row[n], bound)
+
+
+@numba.njit(cache=True)
+def _levenshtein_encoded(one: np.ndarray, two: np.ndarray, max_distance: int) -> int:
+    # The shorter sequence is used as the pattern, minimizing the blocks
+    if len(one) > len(two):
+        one, two = two, one
+
+    if len(two) - len(one) > max_distance:
+        return max_distance + 1
+
+    # Common affixes never change the distance
+    start = 0
+    while start < len(one) and one[start] == two[start]:
+        start += 1
+
+    end = 0
+    while end < len(one) - start and one[len(one) - end - 1] == two[len(two) - end - 1]:
+        end += 1
+
+    one = one[start:len(one) - end]
+    two = two[start:len(two) - end]
+
+    if len(one) == 0:
+        return len(two)
+
+    # A narrow band is cheaper than a pass over every block of the pattern
+    words = (len(one) + _WORD_SIZE - 1) // _WORD_SIZE
+    if max_distance < max(_BAND_MIN, _BAND_PER_WORD * words):
+        return _levenshtein_banded(one, two, max_distance)
+
+    if len(one) <= _WORD_SIZE:
+        return _myers(one, two, max_distance)
+
+    return _myers_blocked(one, two, max_distance)
+
 
 @numba.jit(cache=True)
-def levenshtein_distance(one: Sequence[T], two: Sequence[T]) -> int:
+def _levenshtein_dp(one: Sequence[T], two: Sequence[T]) -> int:
+    """
+    Reference Wagner-Fischer implementation, filling the full matrix
+    """
     l1 = len(one) + 1
     l2 = len(two) + 1
 
@@ -36,22 +284,101 @@ def levenshtein_distance(one: Sequence[T], two: Sequence[T]) -> int:
     return distances[l1 - 1][l2 - 1]
 
 
-@numba.jit()
-def levenshtein_ratio(one: Sequence[T], two: Sequence[T]) -> float:
-    return 1 - levenshtein_distance(one, two) / max(len(one), len(two))
+def levenshtein_distance(one: Sequence[T], two: Sequence[T], max_distance: Optional[int] = None) -> int:
+    """
+    Computes the edit distance between two sequences
+
+    Parameters
+    ----------
+    one : Sequence[T]
+        the first sequence
+    two : Sequence[T]
+        the second sequence
+    max_distance : Optional[int]
+        if given, the computation stops as soon as the distance is known to
+        exceed it
+
+    Return
+    ------
+    int
+        the edit distance, or max_distance + 1 if it exceeds max_distance
+    """
+    if max_distance is None:
+        max_distance = max(len(one), len(two))
+
+    elif max_distance < 0:
+        raise ValueError("'max_distance' must be non-negative")
+
+    elif abs(len(one) - len(two)) > max_distance:
+        return max_distance + 1
+
+    return int(_levenshtein_encoded(*_encode(one, two), max_distance))
+
+
+def levenshtein_ratio(one: Sequence[T], two: Sequence[T], score_cutoff: Optional[float] = None) -> float:
+    """
+    Computes the edit distance normalized to [0,1], where 1 is identical
+
+    Parameters
+    ----------
+    one : Sequence[T]
+        the first sequence
+    two : Sequence[T]
+        the second sequence
+    score_cutoff : Optional[float]
+        if given, ratios below it are not computed exactly
+
+    Return
+    ------
+    float
+        the ratio, or 0 if it is below score_cutoff
+    """
+    longest = max(len(one), len(two))
+
+    if score_cutoff is None:
+        return 1 - levenshtein_distance(one, two) / longest
+
+    # Small epsilon guards against (1 - cutoff) * longest rounding down
+    max_distance = int((1 - score_cutoff) * longest + 1e-9)
+    if max_distance < 0:
+        return 0
+
+    result = 1 - levenshtein_distance(one, two, max_distance) / longest
+
+    return result if result >= score_cutoff else 0
 
 
 class LevenshteinMetric(Metric[Sequence[T]]):
-    def __call__(self, a: Sequence[T], b: Sequence[T]) -> int:
-        return levenshtein_distance(a, b)
+    __slots__ = ['max_distance']
+
+    def __init__(self, max_distance: Optional[int] = None):
+        self.max_distance = max_distance
+
+    def __call__(self, a: Sequence[T], b: Sequence[T], max_distance: Optional[int] = None) -> int:
+        if max_distance is None:
+            max_distance = self.max_distance
+
+        return levenshtein_distance(a, b, max_distance)
 
 
 class LevenshteinRatio(Ratio[Sequence[T]]):
+    _preprocess = staticmethod(_code_points)
+    cost = 4
+
     def ratio_min(self) -> int:
         return 0
 
     def ratio_max(self) -> int:
         return 1
 
-    def ratio(self, a: Sequence[T], b: Sequence[T]) -> float:
-        return levenshtein_ratio(a, b)
+    def ratio(self, a: Sequence[T], b: Sequence[T], score_cutoff: Optional[float] = None) -> float:
+        return levenshtein_ratio(a, b, score_cutoff)
+
+    def _ratio_prepared(self, a: Sequence[T], b: Sequence[T], prepared_a: Optional[np.ndarray],
+                        prepared_b: Optional[np.ndarray]) -> float:
+        if prepared_a is None or prepared_b is None:
+            return self.ratio(a, b)
+
+        longest = max(len(a), len(b))
+
+        return 1 - int(_levenshtein_encoded(prepared_a, prepared_b, longest)) / longest
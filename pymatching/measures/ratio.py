@@ -1,18 +1,107 @@
 from __future__ import annotations
 
 from abc import ABCMeta, abstractmethod
-from functools import reduce
-from typing import Generic, Iterable, List, Tuple, TypeVar, Union, cast
+from functools import lru_cache, reduce
+from inspect import signature
+from operator import mul
+from time import perf_counter
+from typing import (Any, Callable, Dict, Generic, Iterable, List, Optional,
+                    Tuple, TypeVar, Union, cast)
 
 Number = Union[int, float]
 
 T = TypeVar('T')
 
+# Compiled expressions take both values and both lists of preprocessed values
+Expression = Callable[[Any, Any, List[Any], List[Any]], float]
+
+# Slack on the cutoffs passed to children, so rounding never rejects a pair
+_EPSILON = 1e-9
+
+
+@lru_cache()
+def _accepts_cutoff(cls: type) -> bool:
+    return 'score_cutoff' in signature(cls.ratio).parameters
+
+
+def _child_ratio(ratio: Ratio[T], a: T, b: T, score_cutoff: Optional[float]) -> float:
+    if score_cutoff is None or not _accepts_cutoff(type(ratio)):
+        return ratio.ratio(a, b)
+
+    return ratio.ratio(a, b, score_cutoff=score_cutoff)
+
+
+def _scaled_bounds(weight: float, similarity: Ratio[T]) -> Tuple[float, float]:
+    """
+    The bounds of a ratio times a weight, a negative weight swaps them
+    """
+    low = weight * similarity.ratio_min()
+    high = weight * similarity.ratio_max()
+
+    return min(low, high), max(low, high)
+
+
+def _by_cost(similarities: List[Ratio[T]]) -> List[int]:
+    return sorted(range(len(similarities)), key=lambda i: similarities[i].cost)
+
+
+def _cascade_sum(terms: List[Tuple[float, Ratio[T]]], a: T, b: T, score_cutoff: float) -> Optional[List[float]]:
+    """
+    Evaluates the terms of a weighted sum cheapest first, returning their
+    values in order, or None once the sum is known to be below score_cutoff
+
+    Every term is given the cutoff it must reach for the sum to reach
+    score_cutoff when all the terms left reach their maximum, and the
+    cutoffs are dropped once the terms left cannot bring the sum below it
+    """
+    lows, highs = zip(*(_scaled_bounds(w, x) for w, x in terms))
+
+    values: List[float] = [0.] * len(terms)
+    known = 0.
+    rest_low = sum(lows)
+    rest_high = sum(highs)
+    reachable = False
+
+    for i in _by_cost([x for _, x in terms]):
+        w, x = terms[i]
+        rest_low -= lows[i]
+        rest_high -= highs[i]
+
+        cutoff = None
+        if not reachable and w > 0:
+            cutoff = (score_cutoff - known - rest_high - _EPSILON) / w
+
+        value = _child_ratio(x, a, b, cutoff)
+
+        if cutoff is not None and value < cutoff:
+            return None
+
+        values[i] = value
+        known += w * value
+
+        if known + rest_high < score_cutoff - _EPSILON:
+            return None
+
+        reachable = reachable or known + rest_low >= score_cutoff
+
+    return values
+
 
 class Ratio(Generic[T], metaclass=ABCMeta):
     """
     This abstract class exists for use in comparisons
+
+    A ratio whose score only depends on some preprocessing of each value
+    (its set of elements, its code points, its vector) names it in
+    _preprocess and scores preprocessed values in _ratio_prepared, so
+    compiled expressions preprocess each value once for every ratio sharing
+    the same preprocessing
     """
+    _preprocess: Optional[Callable[[Any], Any]] = None
+
+    # Relative cost of one evaluation, cheaper children are evaluated first
+    cost: float = 1
+
     @abstractmethod
     def ratio_min(self) -> float:
         raise NotImplementedError()
@@ -25,6 +114,57 @@ class Ratio(Generic[T], metaclass=ABCMeta):
     def ratio(self, a: T, b: T) -> float:
         raise NotImplementedError()
 
+    def _ratio_prepared(self, a: T, b: T, prepared_a: Any, prepared_b: Any) -> float:
+        return self.ratio(a, b)
+
+    def _children(self) -> List[Ratio[T]]:
+        return []
+
+    def calibrate(self, pairs: Iterable[Tuple[T, T]]) -> Ratio[T]:
+        """
+        Replaces the declared cost of every ratio in this one by the time it
+        takes on average over pairs
+        """
+        pairs = list(pairs)
+        children = self._children()
+
+        if children:
+            for child in children:
+                child.calibrate(pairs)
+
+        elif pairs:
+            start = perf_counter()
+            for a, b in pairs:
+                self.ratio(a, b)
+
+            self.cost = (perf_counter() - start) / len(pairs)
+
+        return self
+
+    def _compile(self, slots: Dict[Callable[[Any], Any], int]) -> Expression:
+        if self._preprocess is None:
+            ratio = self.ratio
+
+            return lambda a, b, pa, pb: ratio(a, b)
+
+        i = slots.setdefault(self._preprocess, len(slots))
+        kernel = self._ratio_prepared
+
+        return lambda a, b, pa, pb: kernel(a, b, pa[i], pb[i])
+
+    def compile(self) -> CompiledRatio[T]:
+        """
+        Fuses this ratio and all of its children into one function
+
+        Every preprocessing step shared by several children runs once per
+        value, the arithmetic is that of the uncompiled ratio, in the same
+        order, so the results are identical
+        """
+        slots: Dict[Callable[[Any], Any], int] = {}
+        expression = self._compile(slots)
+
+        return CompiledRatio(self, expression, list(slots))
+
     def normalized_ratio(self,  a: T, b: T) -> float:
         mi = self.ratio_min()
         ma = self.ratio_max()
@@ -43,10 +183,11 @@ class Ratio(Generic[T], metaclass=ABCMeta):
         similarities: List[Ratio[T]] = []
 
         if isinstance(other, Ratio):
-            if isinstance(other, SumRatio):
-                similarities.extend(other.similarities)
-            else:
-                similarities.append(other)
+            for x in (self, other):
+                if isinstance(x, SumRatio):
+                    similarities.extend(x.similarities)
+                else:
+                    similarities.append(x)
 
             return SumRatio(similarities)
 
@@ -110,8 +251,32 @@ class SAddRatio(Ratio[T]):
     def ratio_max(self) -> float:
         return self._max
 
-    def ratio(self,  a: T, b: T) -> float:
-        return self.scalar + self.similarity.ratio(a, b)
+    @property
+    def cost(self) -> float:
+        return self.similarity.cost
+
+    def _children(self) -> List[Ratio[T]]:
+        return [self.similarity]
+
+    def ratio(self,  a: T, b: T, score_cutoff: Optional[float] = None) -> float:
+        if score_cutoff is None:
+            return self.scalar + self.similarity.ratio(a, b)
+
+        cutoff = score_cutoff - self.scalar - _EPSILON
+        value = _child_ratio(self.similarity, a, b, cutoff)
+
+        if value < cutoff:
+            return self._min
+
+        result = self.scalar + value
+
+        return result if result >= score_cutoff else self._min
+
+    def _compile(self, slots: Dict[Callable[[Any], Any], int]) -> Expression:
+        scalar = self.scalar
+        f = self.similarity._compile(slots)
+
+        return lambda a, b, pa, pb: scalar + f(a, b, pa, pb)
 
 
 class SumRatio(Ratio[T]):
@@ -128,8 +293,29 @@ class SumRatio(Ratio[T]):
     def ratio_max(self) -> float:
         return self._max
 
-    def ratio(self,  a: T, b: T) -> float:
-        return sum(map(lambda x: x.ratio(a, b), self.similarities))
+    @property
+    def cost(self) -> float:
+        return sum(x.cost for x in self.similarities)
+
+    def _children(self) -> List[Ratio[T]]:
+        return list(self.similarities)
+
+    def ratio(self,  a: T, b: T, score_cutoff: Optional[float] = None) -> float:
+        if score_cutoff is None:
+            return sum(map(lambda x: x.ratio(a, b), self.similarities))
+
+        values = _cascade_sum([(1, x) for x in self.similarities], a, b, score_cutoff)
+        if values is None:
+            return self._min
+
+        result = sum(values)
+
+        return result if result >= score_cutoff else self._min
+
+    def _compile(self, slots: Dict[Callable[[Any], Any], int]) -> Expression:
+        fs = [x._compile(slots) for x in self.similarities]
+
+        return lambda a, b, pa, pb: sum(f(a, b, pa, pb) for f in fs)
 
 
 class SMulRatio(Ratio[T]):
@@ -138,8 +324,7 @@ class SMulRatio(Ratio[T]):
     def __init__(self, similarity: Ratio[T], scalar: float):
         self.similarity = similarity
         self.scalar = scalar
-        self._min = scalar * similarity.ratio_min()
-        self._max = scalar * similarity.ratio_max()
+        self._min, self._max = _scaled_bounds(scalar, similarity)
 
     def ratio_min(self) -> float:
         return self._min
@@ -147,8 +332,36 @@ class SMulRatio(Ratio[T]):
     def ratio_max(self) -> float:
         return self._max
 
-    def ratio(self,  a: T, b: T) -> float:
-        return self.scalar * self.similarity.ratio(a, b)
+    @property
+    def cost(self) -> float:
+        return self.similarity.cost
+
+    def _children(self) -> List[Ratio[T]]:
+        return [self.similarity]
+
+    def ratio(self,  a: T, b: T, score_cutoff: Optional[float] = None) -> float:
+        if score_cutoff is None:
+            return self.scalar * self.similarity.ratio(a, b)
+
+        if self.scalar <= 0:
+            result = self.scalar * self.similarity.ratio(a, b)
+
+        else:
+            cutoff = (score_cutoff - _EPSILON) / self.scalar
+            value = _child_ratio(self.similarity, a, b, cutoff)
+
+            if value < cutoff:
+                return self._min
+
+            result = self.scalar * value
+
+        return result if result >= score_cutoff else self._min
+
+    def _compile(self, slots: Dict[Callable[[Any], Any], int]) -> Expression:
+        scalar = self.scalar
+        f = self.similarity._compile(slots)
+
+        return lambda a, b, pa, pb: scalar * f(a, b, pa, pb)
 
 
 class ProductRatio(Ratio[T]):
@@ -156,10 +369,14 @@ class ProductRatio(Ratio[T]):
 
     def __init__(self, similarities: Iterable[Ratio[T]]):
         self.similarities = similarities
-        self._min = reduce(float.__mul__, map(
-            lambda x: x.ratio_min(), similarities))
-        self._max = reduce(float.__mul__, map(
-            lambda x: x.ratio_max(), similarities))
+        self._min = 1.
+        self._max = 1.
+
+        # Bounds multiply as intervals, negative factors swap them
+        for x in similarities:
+            products = [y * z for y in (self._min, self._max) for z in (x.ratio_min(), x.ratio_max())]
+            self._min = min(products)
+            self._max = max(products)
 
     def ratio_min(self) -> float:
         return self._min
@@ -167,8 +384,61 @@ class ProductRatio(Ratio[T]):
     def ratio_max(self) -> float:
         return self._max
 
-    def ratio(self, a: T, b: T) -> float:
-        return reduce(float.__mul__, map(lambda x: x.ratio(a, b), self.similarities))
+    @property
+    def cost(self) -> float:
+        return sum(x.cost for x in self.similarities)
+
+    def _children(self) -> List[Ratio[T]]:
+        return list(self.similarities)
+
+    def ratio(self, a: T, b: T, score_cutoff: Optional[float] = None) -> float:
+        if score_cutoff is None:
+            return reduce(mul, map(lambda x: x.ratio(a, b), self.similarities))
+
+        similarities = list(self.similarities)
+
+        # Bounds only multiply through when no factor can be negative
+        if any(x.ratio_min() < 0 for x in similarities):
+            result = reduce(mul, map(lambda x: x.ratio(a, b), similarities))
+
+            return result if result >= score_cutoff else self._min
+
+        values: List[float] = [0.] * len(similarities)
+        left = set(range(len(similarities)))
+        known = 1.
+        reachable = False
+
+        for i in _by_cost(similarities):
+            left.remove(i)
+            rest_high = reduce(mul, (similarities[j].ratio_max() for j in left), 1.)
+            rest_low = reduce(mul, (similarities[j].ratio_min() for j in left), 1.)
+
+            cutoff = None
+            if not reachable:
+                if known * rest_high <= 0:
+                    if score_cutoff > 0:
+                        return self._min
+
+                else:
+                    cutoff = (score_cutoff - _EPSILON) / (known * rest_high)
+
+            value = _child_ratio(similarities[i], a, b, cutoff)
+
+            if cutoff is not None and value < cutoff:
+                return self._min
+
+            values[i] = value
+            known *= value
+            reachable = reachable or known * rest_low >= score_cutoff
+
+        result = reduce(mul, values)
+
+        return result if result >= score_cutoff else self._min
+
+    def _compile(self, slots: Dict[Callable[[Any], Any], int]) -> Expression:
+        fs = [x._compile(slots) for x in self.similarities]
+
+        return lambda a, b, pa, pb: reduce(mul, [f(a, b, pa, pb) for f in fs])
 
 
 class WeightedSumRatio(Ratio[T]):
@@ -176,8 +446,9 @@ class WeightedSumRatio(Ratio[T]):
 
     def __init__(self, similarities: Iterable[Tuple[float, Ratio[T]]]):
         self.similarities = similarities
-        self._min = sum(map(lambda x: x[0] * x[1].ratio_min(), similarities))
-        self._max = sum(map(lambda x: x[0] * x[1].ratio_max(), similarities))
+        bounds = [_scaled_bounds(w, x) for w, x in similarities]
+        self._min = sum(low for low, _ in bounds)
+        self._max = sum(high for _, high in bounds)
 
     def ratio_min(self) -> float:
         return self._min
@@ -185,8 +456,30 @@ class WeightedSumRatio(Ratio[T]):
     def ratio_max(self) -> float:
         return self._max
 
-    def ratio(self,  a: T, b: T) -> float:
-        return sum(map(lambda x: x[0] * x[1].ratio(a, b), self.similarities))
+    @property
+    def cost(self) -> float:
+        return sum(x.cost for _, x in self.similarities)
+
+    def _children(self) -> List[Ratio[T]]:
+        return [x for _, x in self.similarities]
+
+    def ratio(self,  a: T, b: T, score_cutoff: Optional[float] = None) -> float:
+        if score_cutoff is None:
+            return sum(map(lambda x: x[0] * x[1].ratio(a, b), self.similarities))
+
+        terms = list(self.similarities)
+        values = _cascade_sum(terms, a, b, score_cutoff)
+        if values is None:
+            return self._min
+
+        result = sum(w * value for (w, _), value in zip(terms, values))
+
+        return result if result >= score_cutoff else self._min
+
+    def _compile(self, slots: Dict[Callable[[Any], Any], int]) -> Expression:
+        fs = [(w, x._compile(slots)) for w, x in self.similarities]
+
+        return lambda a, b, pa, pb: sum(w * f(a, b, pa, pb) for w, f in fs)
 
 
 class MinRatio(Ratio[T]):
@@ -203,8 +496,36 @@ class MinRatio(Ratio[T]):
     def ratio_max(self) -> float:
         return self._max
 
-    def ratio(self, a: T, b: T) -> float:
-        return min(map(lambda x: x.ratio(a, b), self.similarities))
+    @property
+    def cost(self) -> float:
+        return sum(x.cost for x in self.similarities)
+
+    def _children(self) -> List[Ratio[T]]:
+        return list(self.similarities)
+
+    def ratio(self, a: T, b: T, score_cutoff: Optional[float] = None) -> float:
+        if score_cutoff is None:
+            return min(map(lambda x: x.ratio(a, b), self.similarities))
+
+        # Every child has to reach the cutoff
+        similarities = list(self.similarities)
+        values: List[float] = [0.] * len(similarities)
+        cutoff = score_cutoff - _EPSILON
+
+        for i in _by_cost(similarities):
+            values[i] = _child_ratio(similarities[i], a, b, cutoff)
+
+            if values[i] < cutoff:
+                return self._min
+
+        result = min(values)
+
+        return result if result >= score_cutoff else self._min
+
+    def _compile(self, slots: Dict[Callable[[Any], Any], int]) -> Expression:
+        fs = [x._compile(slots) for x in self.similarities]
+
+        return lambda a, b, pa, pb: min(f(a, b, pa, pb) for f in fs)
 
 
 class MaxRatio(Ratio[T]):
@@ -221,5 +542,75 @@ class MaxRatio(Ratio[T]):
     def ratio_max(self) -> float:
         return self._max
 
-    def ratio(self, a: T, b: T) -> float:
-        return min(map(lambda x: x.ratio(a, b), self.similarities))
+    @property
+    def cost(self) -> float:
+        return sum(x.cost for x in self.similarities)
+
+    def _children(self) -> List[Ratio[T]]:
+        return list(self.similarities)
+
+    def ratio(self, a: T, b: T, score_cutoff: Optional[float] = None) -> float:
+        if score_cutoff is None:
+            return max(map(lambda x: x.ratio(a, b), self.similarities))
+
+        # Children that cannot beat the best so far are skipped
+        best: Optional[float] = None
+
+        for i in _by_cost(list(self.similarities)):
+            x = self.similarities[i]
+
+            if best is not None and x.ratio_max() <= best:
+                continue
+
+            cutoff = score_cutoff - _EPSILON if best is None else max(score_cutoff - _EPSILON, best)
+            value = _child_ratio(x, a, b, cutoff)
+
+            if value >= cutoff and (best is None or value > best):
+                best = value
+
+        return best if best is not None and best >= score_cutoff else self._min
+
+    def _compile(self, slots: Dict[Callable[[Any], Any], int]) -> Expression:
+        fs = [x._compile(slots) for x in self.similarities]
+
+        return lambda a, b, pa, pb: max(f(a, b, pa, pb) for f in fs)
+
+
+class CompiledRatio(Ratio[T]):
+    """
+    A ratio fused by Ratio.compile, see there
+    """
+    __slots__ = ['_min', '_max', 'source', 'expression', 'preprocessors']
+
+    def __init__(self, source: Ratio[T], expression: Expression, preprocessors: List[Callable[[T], Any]]):
+        self.source = source
+        self.expression = expression
+        self.preprocessors = preprocessors
+        self._min = source.ratio_min()
+        self._max = source.ratio_max()
+
+    def ratio_min(self) -> float:
+        return self._min
+
+    def ratio_max(self) -> float:
+        return self._max
+
+    @property
+    def cost(self) -> float:
+        return self.source.cost
+
+    def _children(self) -> List[Ratio[T]]:
+        return [self.source]
+
+    def ratio(self, a: T, b: T, score_cutoff: Optional[float] = None) -> float:
+        # Cutoffs are worth more than shared preprocessing
+        if score_cutoff is not None:
+            return self.source.ratio(a, b, score_cutoff)
+
+        pa = [f(a) for f in self.preprocessors]
+        pb = [f(b) for f in self.preprocessors]
+
+        return self.expression(a, b, pa, pb)
+
+    def compile(self) -> CompiledRatio[T]:
+        return self
@@ -0,0 +1,413 @@
+from hashlib import blake2b
+from typing import Any, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+import numba
+import numpy as np
+
+from .jaccard import _jaccard_sets
+
+# Universal hashing (a * x + b) mod p of 61 bit token hashes, p = 2 ** 61 - 1
+_PRIME = np.uint64((1 << 61) - 1)
+_LOW_32 = np.uint64((1 << 32) - 1)
+_LOW_29 = np.uint64((1 << 29) - 1)
+
+_FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+_FNV_PRIME = np.uint64(0x100000001b3)
+
+
+def _token_hash(token: Hashable) -> int:
+    """
+    Hashes a token to 61 bits, tagged with its type so that 1 and '1' differ
+    """
+    text = token if isinstance(token, str) else repr(token)
+    data = '{}:{}'.format(type(token).__qualname__, text).encode('utf-8')
+
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), 'little') & int(_PRIME)
+
+
+@numba.njit(cache=True)
+def _universal_hash(a: np.uint64, b: np.uint64, x: np.uint64) -> np.uint64:
+    """
+    Computes (a * x + b) mod 2 ** 61 - 1 without overflow, for a, b and x
+    below 2 ** 61, using 2 ** 61 = 1 modulo the prime
+    """
+    a_high = a >> np.uint64(32)
+    a_low = a & _LOW_32
+    x_high = x >> np.uint64(32)
+    x_low = x & _LOW_32
+
+    # The product of the 32 bit halves, with the bits above 2 ** 61 wrapped around
+    value = (a_high * x_high) << np.uint64(3)
+
+    middle = a_high * x_low + a_low * x_high
+    value += (middle >> np.uint64(29)) + ((middle & _LOW_29) << np.uint64(32))
+
+    low = a_low * x_low
+    value += (low & _PRIME) + (low >> np.uint64(61))
+
+    return (value + b) % _PRIME
+
+
+@numba.njit(parallel=True, cache=True)
+def _signatures(hashes: np.ndarray, offsets: np.ndarray, a: np.ndarray, b: np.ndarray, out: np.ndarray):
+    for i in numba.prange(len(offsets) - 1):
+        for k in range(len(a)):
+            smallest = _PRIME
+
+            for j in range(offsets[i], offsets[i + 1]):
+                value = _universal_hash(a[k], b[k], hashes[j])
+
+                if value < smallest:
+                    smallest = value
+
+            out[i, k] = smallest
+
+
+@numba.njit(cache=True)
+def _band_keys(signatures: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """
+    Folds the rows of every band of every signature into one FNV-1a key
+    """
+    keys = np.empty((len(signatures), bands), dtype=np.uint64)
+
+    for i in range(len(signatures)):
+        for band in range(bands):
+            key = _FNV_OFFSET
+
+            for k in range(band * rows, (band + 1) * rows):
+                key = (key ^ signatures[i, k]) * _FNV_PRIME
+
+            keys[i, band] = key
+
+    return keys
+
+
+@numba.njit(cache=True)
+def _bucket_pairs(keys: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """
+    Lists the pairs of rows sharing a key, as (smaller, larger) rows, given
+    the keys sorted and the rows in that order
+    """
+    count = 0
+    start = 0
+    for end in range(1, len(keys) + 1):
+        if end == len(keys) or keys[end] != keys[start]:
+            size = end - start
+            count += size * (size - 1) // 2
+            start = end
+
+    pairs = np.empty((count, 2), dtype=np.int64)
+
+    p = 0
+    start = 0
+    for end in range(1, len(keys) + 1):
+        if end == len(keys) or keys[end] != keys[start]:
+            for x in range(start, end):
+                for y in range(x + 1, end):
+                    pairs[p, 0] = min(order[x], order[y])
+                    pairs[p, 1] = max(order[x], order[y])
+                    p += 1
+
+            start = end
+
+    return pairs
+
+
+def optimal_bands(threshold: float, num_perm: int, false_positive_weight: float = .5,
+                  false_negative_weight: float = .5) -> Tuple[int, int]:
+    """
+    Finds the number of bands and rows per band, within num_perm rows, that
+    minimize the weighted probability of false positives below threshold and
+    false negatives above it
+
+    Parameters
+    ----------
+    threshold : float
+        the Jaccard index from which pairs should be candidates
+    num_perm : int
+        the length of the signatures
+    false_positive_weight : float
+        the weight of candidates below threshold
+    false_negative_weight : float
+        the weight of missed pairs above threshold
+
+    Return
+    ------
+    Tuple[int, int]
+        the number of bands and the rows in each
+    """
+    if not 0 < threshold <= 1:
+        raise ValueError("'threshold' must be within (0, 1]")
+
+    below = np.linspace(0, threshold, 101)
+    above = np.linspace(threshold, 1, 101)
+
+    best: Optional[Tuple[float, int, int]] = None
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positive = np.mean(1 - (1 - below ** rows) ** bands) * threshold
+            false_negative = np.mean((1 - above ** rows) ** bands) * (1 - threshold)
+
+            error = false_positive_weight * false_positive + false_negative_weight * false_negative
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+
+    return best[1], best[2]
+
+
+class MinHash:
+    """
+    Seeded MinHash, a signature of num_perm minimums of universal hashes of
+    the elements of a set, two signatures agree on a fraction of their rows
+    that estimates the Jaccard index of the sets
+
+    Signatures only depend on the elements and the seed, so they can be
+    compared across processes and runs
+    """
+    __slots__ = ['num_perm', 'seed', 'a', 'b']
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        if num_perm < 1:
+            raise ValueError("'num_perm' must be positive")
+
+        self.num_perm = num_perm
+        self.seed = seed
+
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, records: Iterable[Iterable[Hashable]]) -> np.ndarray:
+        """
+        Computes the signatures of many sets, one row each, empty sets get
+        rows of 2 ** 61 - 1, which no element reaches
+        """
+        hashes: List[int] = []
+        offsets = [0]
+
+        for record in records:
+            hashes.extend({_token_hash(token) for token in record})
+            offsets.append(len(hashes))
+
+        out = np.empty((len(offsets) - 1, self.num_perm), dtype=np.uint64)
+        _signatures(np.array(hashes, dtype=np.uint64), np.array(offsets, dtype=np.int64), self.a, self.b, out)
+
+        return out
+
+    def signature(self, tokens: Iterable[Hashable]) -> np.ndarray:
+        return self.signatures([tokens])[0]
+
+
+def estimate_jaccard(one: np.ndarray, two: np.ndarray) -> float:
+    """
+    Estimates the Jaccard index of two sets from their signatures
+    """
+    return float(np.mean(one == two))
+
+
+class MinHashLSH:
+    """
+    Banded locality sensitive hashing of MinHash signatures
+
+    Signatures are cut into bands of rows, and sets whose signatures agree
+    on every row of some band are candidates, the number of bands and rows
+    is tuned so that pairs with a Jaccard index above threshold are likely
+    candidates and pairs below it are not
+    """
+    __slots__ = ['threshold', 'minhash', 'bands', 'rows', 'signatures', 'sets', '_keys', '_sorted']
+
+    def __init__(self, threshold: float = .5, num_perm: int = 128, seed: int = 1,
+                 bands: Optional[Tuple[int, int]] = None, store_sets: bool = True):
+        self.threshold = threshold
+        self.minhash = MinHash(num_perm, seed)
+
+        if bands is None:
+            bands = optimal_bands(threshold, num_perm)
+
+        if bands[0] * bands[1] > num_perm:
+            raise ValueError("'bands' must have at most 'num_perm' rows in total")
+
+        self.bands, self.rows = bands
+        self.signatures = np.empty((0, num_perm), dtype=np.uint64)
+        self.sets: Optional[List[FrozenSet[Any]]] = [] if store_sets else None
+
+        self._keys = np.empty((0, self.bands), dtype=np.uint64)
+        self._sorted: Optional[List[Tuple[np.ndarray, np.ndarray]]] = None
+
+    def _add_signatures(self, signatures: np.ndarray):
+        self.signatures = np.concatenate([self.signatures, signatures])
+        self._keys = np.concatenate([self._keys, _band_keys(signatures, self.bands, self.rows)])
+        self._sorted = None
+
+    def add(self, tokens: Iterable[Hashable]) -> int:
+        """
+        Indexes a set, returning its index
+        """
+        return self.extend([tokens])[0]
+
+    def extend(self, records: Iterable[Iterable[Hashable]]) -> List[int]:
+        """
+        Indexes many sets, returning their indices
+        """
+        records = [frozenset(record) for record in records]
+        start = len(self)
+
+        if self.sets is not None:
+            self.sets.extend(records)
+
+        self._add_signatures(self.minhash.signatures(records))
+
+        return list(range(start, len(self)))
+
+    def _buckets(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        if self._sorted is None:
+            # Empty sets share every band but are similar to nothing
+            rows = np.flatnonzero(self.signatures[:, 0] != _PRIME)
+            self._sorted = []
+
+            for band in range(self.bands):
+                keys = self._keys[rows, band]
+                order = np.argsort(keys, kind='stable')
+
+                self._sorted.append((keys[order], rows[order]))
+
+        return self._sorted
+
+    def candidates(self, tokens: Iterable[Hashable]) -> np.ndarray:
+        """
+        Finds the indices of the sets sharing a band with tokens
+        """
+        signature = self.minhash.signature(tokens)
+        if signature[0] == _PRIME:
+            return np.empty(0, dtype=np.int64)
+
+        keys = _band_keys(signature[None, :], self.bands, self.rows)[0]
+
+        found = [np.empty(0, dtype=np.int64)]
+        for band, (sorted_keys, order) in enumerate(self._buckets()):
+            lo = np.searchsorted(sorted_keys, keys[band], side='left')
+            hi = np.searchsorted(sorted_keys, keys[band], side='right')
+
+            found.append(order[lo:hi])
+
+        return np.unique(np.concatenate(found))
+
+    def _stored_sets(self) -> List[FrozenSet[Any]]:
+        if self.sets is None:
+            raise ValueError("verification needs the sets, index them with 'store_sets'")
+
+        return self.sets
+
+    def query(self, tokens: Iterable[Hashable], threshold: Optional[float] = None,
+              verify: bool = False) -> List[Tuple[int, float]]:
+        """
+        Finds the indexed sets similar to tokens
+
+        Parameters
+        ----------
+        tokens : Iterable[Hashable]
+            the elements of the set to match
+        threshold : Optional[float]
+            the smallest similarity of a result, the threshold of the index by
+            default
+        verify : bool
+            if True, similarities are exact Jaccard indices, otherwise they are
+            estimated from the signatures
+
+        Return
+        ------
+        List[Tuple[int, float]]
+            (index, similarity) pairs, most similar first, ties by index
+        """
+        tokens = frozenset(tokens)
+        threshold = self.threshold if threshold is None else threshold
+
+        candidates = self.candidates(tokens)
+        signature = self.minhash.signature(tokens)
+
+        if verify:
+            sets = self._stored_sets()
+            scores = np.array([_jaccard_sets(tokens, sets[j]) for j in candidates], dtype=np.float64)
+
+        else:
+            scores = np.mean(self.signatures[candidates] == signature, axis=1)
+
+        keep = scores >= threshold
+        candidates = candidates[keep]
+        scores = scores[keep]
+
+        order = np.lexsort((candidates, -scores))
+
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+    def self_join(self, threshold: Optional[float] = None, verify: bool = False) -> List[Tuple[int, int, float]]:
+        """
+        Finds the pairs of indexed sets similar to each other
+
+        Parameters
+        ----------
+        threshold : Optional[float]
+            the smallest similarity of a pair, the threshold of the index by
+            default
+        verify : bool
+            if True, similarities are exact Jaccard indices, otherwise they are
+            estimated from the signatures
+
+        Return
+        ------
+        List[Tuple[int, int, float]]
+            (index, other index, similarity) triples with index < other index,
+            in index order
+        """
+        threshold = self.threshold if threshold is None else threshold
+
+        pairs = [np.empty((0, 2), dtype=np.int64)]
+        for sorted_keys, order in self._buckets():
+            pairs.append(_bucket_pairs(sorted_keys, order))
+
+        pairs = np.unique(np.concatenate(pairs), axis=0)
+
+        if verify:
+            sets = self._stored_sets()
+            scores = np.array([_jaccard_sets(sets[i], sets[j]) for i, j in pairs], dtype=np.float64)
+
+        else:
+            scores = np.mean(self.signatures[pairs[:, 0]] == self.signatures[pairs[:, 1]], axis=1)
+
+        keep = scores >= threshold
+
+        return [(int(i), int(j), float(score)) for (i, j), score in zip(pairs[keep], scores[keep])]
+
+    def save(self, path: str):
+        """
+        Writes the signatures and parameters to an .npz file, the sets are not
+        saved
+        """
+        np.savez(
+            path, signatures=self.signatures,
+            parameters=np.array([self.minhash.num_perm, self.minhash.seed, self.bands, self.rows]),
+            threshold=np.array(self.threshold)
+        )
+
+    @staticmethod
+    def load(path: str, records: Optional[Iterable[Iterable[Hashable]]] = None) -> 'MinHashLSH':
+        """
+        Reads an index written by save, records are the indexed sets, in
+        order, if candidates are to be verified
+        """
+        with np.load(path) as data:
+            num_perm, seed, bands, rows = (int(x) for x in data['parameters'])
+            index = MinHashLSH(float(data['threshold']), num_perm, seed, (bands, rows), store_sets=records is not None)
+
+            index._add_signatures(data['signatures'])
+
+        if records is not None:
+            index.sets = [frozenset(record) for record in records]
+
+            if len(index.sets) != len(index):
+                raise ValueError("'records' must match the indexed sets")
+
+        return index
+
+    def __len__(self) -> int:
+        return len(self.signatures)
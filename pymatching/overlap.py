@@ -1,18 +1,21 @@
-from typing import Iterable, TypeVar
+from typing import AbstractSet, Any, Iterable, TypeVar
 
 from .measures import Ratio
 
 T = TypeVar('T')
 
 
-def overlap_coefficient(one: Iterable[T], two: Iterable[T]) -> float:
-    a = set(one)
-    b = set(two)
-
+def _overlap_sets(a: AbstractSet[Any], b: AbstractSet[Any]) -> float:
     return len(a & b) / min(len(a), len(b))
 
 
+def overlap_coefficient(one: Iterable[T], two: Iterable[T]) -> float:
+    return _overlap_sets(set(one), set(two))
+
+
 class OverlapRatio(Ratio[Iterable[T]]):
+    _preprocess = staticmethod(set)
+
     def ratio_min(self) -> int:
         return 0
 
@@ -21,3 +24,7 @@ class OverlapRatio(Ratio[Iterable[T]]):
 
     def ratio(self, a: Iterable[T], b: Iterable[T]) -> float:
         return overlap_coefficient(a, b)
+
+    def _ratio_prepared(self, a: Iterable[T], b: Iterable[T], prepared_a: AbstractSet[T],
+                        prepared_b: AbstractSet[T]) -> float:
+        return _overlap_sets(prepared_a, prepared_b)
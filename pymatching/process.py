@@ -0,0 +1,830 @@
+import heapq
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from inspect import signature
+from typing import (Any, Callable, Dict, Hashable, Iterable, Iterator, List,
+                    Mapping, Optional, Sequence, Tuple, TypeVar, Union, cast)
+
+import numba
+import numpy as np
+
+from .fuzzymatch import (_NEWLINE, FuzzyMatchRatio, _char_mask,
+                         _fuzzy_score_encoded, _fuzzy_score_filtered,
+                         fuzzy_score)
+from .hamming import (HammingMetric, HammingRatio, hamming_distance,
+                      hamming_ratio)
+from .jaccard import jaccard_distance, jaccard_index
+from .levenshtein import (LevenshteinMetric, LevenshteinRatio,
+                          _levenshtein_encoded, levenshtein_distance,
+                          levenshtein_ratio)
+from .measures import Metric, Ratio
+from .overlap import OverlapRatio, overlap_coefficient
+from .sorensendice import SorensenDiceRatio, sorensen_dice_coefficient
+from .tokenset import _intersection_size
+
+T = TypeVar('T')
+
+Scorer = Union[Ratio[T], Metric[T], Callable[[T, T], float]]
+
+_CHUNK_SIZE = 64
+
+
+def _encode(sequences: Sequence[Sequence[T]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encodes sequences into one flat int64 buffer and the offsets of each
+    sequence within it, equal elements share a code across all sequences
+    """
+    offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+    np.cumsum([len(x) for x in sequences], out=offsets[1:])
+
+    if all(isinstance(x, str) for x in sequences):
+        data = np.frombuffer(''.join(sequences).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+    else:
+        codes: Dict[Hashable, int] = {}
+        data = np.array([codes.setdefault(x, len(codes)) for seq in sequences for x in seq], dtype=np.int64)
+
+    return data, offsets
+
+
+@numba.njit(cache=True)
+def _unique_rows(data: np.ndarray, offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Turns every encoded sequence into the sorted array of its distinct codes
+    """
+    out = np.empty_like(data)
+    out_offsets = np.zeros_like(offsets)
+
+    for i in range(len(offsets) - 1):
+        row = np.unique(data[offsets[i]:offsets[i + 1]])
+        out[out_offsets[i]:out_offsets[i] + len(row)] = row
+        out_offsets[i + 1] = out_offsets[i] + len(row)
+
+    return out[:out_offsets[-1]], out_offsets
+
+
+# Pairwise kernels, undefined scores (e.g. two empty sets) are nan
+
+
+@numba.njit(cache=True)
+def _levenshtein_distance_kernel(a: np.ndarray, b: np.ndarray, cutoff: float) -> float:
+    if cutoff < 0:
+        return _levenshtein_encoded(a, b, max(len(a), len(b)))
+
+    return _levenshtein_encoded(a, b, int(cutoff))
+
+
+@numba.njit(cache=True)
+def _levenshtein_ratio_kernel(a: np.ndarray, b: np.ndarray, cutoff: float) -> float:
+    longest = max(len(a), len(b))
+    if longest == 0:
+        return np.nan
+
+    return 1 - _levenshtein_encoded(a, b, longest) / longest
+
+
+@numba.njit(cache=True)
+def _hamming_distance_kernel(a: np.ndarray, b: np.ndarray, cutoff: float) -> float:
+    count = 0
+    for i in range(len(a)):
+        if a[i] != b[i]:
+            count += 1
+
+    return count
+
+
+@numba.njit(cache=True)
+def _hamming_ratio_kernel(a: np.ndarray, b: np.ndarray, cutoff: float) -> float:
+    if len(a) == 0:
+        return np.nan
+
+    return 1 - _hamming_distance_kernel(a, b, cutoff) / len(a)
+
+
+@numba.njit(cache=True)
+def _jaccard_index_kernel(a: np.ndarray, b: np.ndarray, cutoff: float) -> float:
+    inter = _intersection_size(a, b)
+    union = len(a) + len(b) - inter
+
+    return inter / union if union > 0 else np.nan
+
+
+@numba.njit(cache=True)
+def _jaccard_distance_kernel(a: np.ndarray, b: np.ndarray, cutoff: float) -> float:
+    return 1 - _jaccard_index_kernel(a, b, cutoff)
+
+
+@numba.njit(cache=True)
+def _sorensen_dice_kernel(a: np.ndarray, b: np.ndarray, cutoff: float) -> float:
+    total = len(a) + len(b)
+
+    return 2 * _intersection_size(a, b) / total if total > 0 else np.nan
+
+
+@numba.njit(cache=True)
+def _overlap_kernel(a: np.ndarray, b: np.ndarray, cutoff: float) -> float:
+    smallest = min(len(a), len(b))
+
+    return _intersection_size(a, b) / smallest if smallest > 0 else np.nan
+
+
+@numba.njit(cache=True)
+def _fuzzy_score_kernel(a: np.ndarray, b: np.ndarray, cutoff: float) -> float:
+    return _fuzzy_score_encoded(a, b)
+
+
+class _Kernel:
+    __slots__ = ['kernel', 'dtype', 'sets', 'equal_length']
+
+    def __init__(self, kernel: Callable, dtype: type, sets: bool = False, equal_length: bool = False):
+        self.kernel = kernel
+        self.dtype = dtype
+        self.sets = sets
+        self.equal_length = equal_length
+
+
+_LEVENSHTEIN_DISTANCE = _Kernel(_levenshtein_distance_kernel, np.int32)
+_LEVENSHTEIN_RATIO = _Kernel(_levenshtein_ratio_kernel, np.float64)
+_HAMMING_DISTANCE = _Kernel(_hamming_distance_kernel, np.int32, equal_length=True)
+_HAMMING_RATIO = _Kernel(_hamming_ratio_kernel, np.float64, equal_length=True)
+_JACCARD_INDEX = _Kernel(_jaccard_index_kernel, np.float64, sets=True)
+_JACCARD_DISTANCE = _Kernel(_jaccard_distance_kernel, np.float64, sets=True)
+_SORENSEN_DICE = _Kernel(_sorensen_dice_kernel, np.float64, sets=True)
+_OVERLAP = _Kernel(_overlap_kernel, np.float64, sets=True)
+_FUZZY_SCORE = _Kernel(_fuzzy_score_kernel, np.float64)
+
+_KNOWN_SCORERS: Dict[Any, _Kernel] = {
+    levenshtein_distance: _LEVENSHTEIN_DISTANCE,
+    LevenshteinMetric: _LEVENSHTEIN_DISTANCE,
+    levenshtein_ratio: _LEVENSHTEIN_RATIO,
+    LevenshteinRatio: _LEVENSHTEIN_RATIO,
+    hamming_distance: _HAMMING_DISTANCE,
+    HammingMetric: _HAMMING_DISTANCE,
+    hamming_ratio: _HAMMING_RATIO,
+    HammingRatio: _HAMMING_RATIO,
+    jaccard_index: _JACCARD_INDEX,
+    jaccard_distance: _JACCARD_DISTANCE,
+    sorensen_dice_coefficient: _SORENSEN_DICE,
+    SorensenDiceRatio: _SORENSEN_DICE,
+    overlap_coefficient: _OVERLAP,
+    OverlapRatio: _OVERLAP,
+    fuzzy_score: _FUZZY_SCORE,
+    FuzzyMatchRatio: _FUZZY_SCORE,
+}
+
+
+def _resolve_kernel(scorer: Scorer) -> Tuple[Optional[_Kernel], float]:
+    """
+    Finds the compiled kernel of a scorer, along with the cutoff it carries
+    """
+    if isinstance(scorer, (Ratio, Metric)):
+        kernel = _KNOWN_SCORERS.get(type(scorer))
+
+        if isinstance(scorer, LevenshteinMetric) and scorer.max_distance is not None:
+            return kernel, scorer.max_distance
+
+        return kernel, -1
+
+    try:
+        return _KNOWN_SCORERS.get(scorer), -1
+
+    except TypeError:
+        return None, -1
+
+
+@lru_cache()
+def _cdist_driver(kernel: Callable) -> Callable:
+    @numba.njit(parallel=True)
+    def run(q_data, q_offsets, c_data, c_offsets, cutoff, out):
+        n_choices = len(c_offsets) - 1
+
+        # Flattened, so a single query still spreads over every thread
+        for p in numba.prange(out.size):
+            i = p // n_choices
+            j = p % n_choices
+
+            out[i, j] = kernel(
+                q_data[q_offsets[i]:q_offsets[i + 1]],
+                c_data[c_offsets[j]:c_offsets[j + 1]],
+                cutoff
+            )
+
+    return run
+
+
+@lru_cache()
+def _cpdist_driver(kernel: Callable) -> Callable:
+    @numba.njit(parallel=True)
+    def run(q_data, q_offsets, c_data, c_offsets, cutoff, out):
+        for i in numba.prange(out.size):
+            out[i] = kernel(
+                q_data[q_offsets[i]:q_offsets[i + 1]],
+                c_data[c_offsets[i]:c_offsets[i + 1]],
+                cutoff
+            )
+
+    return run
+
+
+def _num_threads(workers: int) -> int:
+    if workers == -1 or workers > numba.config.NUMBA_NUM_THREADS:
+        return numba.config.NUMBA_NUM_THREADS
+
+    if workers < 1:
+        raise ValueError("'workers' must be positive or -1")
+
+    return workers
+
+
+@contextmanager
+def _threads(workers: int) -> Iterator[None]:
+    previous = numba.get_num_threads()
+    numba.set_num_threads(_num_threads(workers))
+
+    try:
+        yield
+
+    finally:
+        numba.set_num_threads(previous)
+
+
+def _run_kernel(driver: Callable, kernel: _Kernel, cutoff: float, queries: Sequence[T],
+                choices: Sequence[T], out: np.ndarray, workers: int):
+    data, offsets = _encode(list(queries) + list(choices))
+
+    if kernel.sets:
+        data, offsets = _unique_rows(data, offsets)
+
+    split = len(queries)
+
+    with _threads(workers):
+        driver(kernel.kernel)(
+            data, offsets[:split + 1], data, offsets[split:],
+            float(cutoff), out
+        )
+
+
+# Process pool fallback for scorers without a compiled kernel
+
+_worker_state: Dict[str, Any] = {}
+
+
+def _score_function(scorer: Scorer) -> Callable[[T, T], float]:
+    if isinstance(scorer, Ratio):
+        return scorer.ratio
+
+    return scorer
+
+
+def _init_worker(scorer: Scorer, choices: Sequence[T]):
+    _worker_state['scorer'] = _score_function(scorer)
+    _worker_state['choices'] = choices
+
+
+def _score_rows(queries: Sequence[T]) -> List[List[float]]:
+    scorer = _worker_state['scorer']
+    choices = _worker_state['choices']
+
+    return [[scorer(q, c) for c in choices] for q in queries]
+
+
+def _score_pairs(pairs: Sequence[Tuple[T, T]]) -> List[float]:
+    scorer = _worker_state['scorer']
+
+    return [scorer(q, c) for q, c in pairs]
+
+
+def _run_pool(task: Callable, items: Sequence[Any], scorer: Scorer, choices: Sequence[T],
+              workers: int) -> List[Any]:
+    chunks = [items[i:i + _CHUNK_SIZE] for i in range(0, len(items), _CHUNK_SIZE)]
+
+    if workers == 1:
+        _init_worker(scorer, choices)
+
+        try:
+            return [task(chunk) for chunk in chunks]
+
+        finally:
+            _worker_state.clear()
+
+    # Forking once the compiled kernels started their threads can deadlock
+    context = multiprocessing.get_context('spawn')
+
+    with ProcessPoolExecutor(None if workers == -1 else workers, mp_context=context,
+                             initializer=_init_worker, initargs=(scorer, choices)) as pool:
+        return list(pool.map(task, chunks))
+
+
+def cdist(queries: Sequence[T], choices: Sequence[T], scorer: Scorer = levenshtein_ratio,
+          dtype: Optional[type] = None, workers: int = 1) -> np.ndarray:
+    """
+    Scores every query against every choice
+
+    Parameters
+    ----------
+    queries : Sequence[T]
+        the sequences making up the rows of the result
+    choices : Sequence[T]
+        the sequences making up the columns of the result
+    scorer : Scorer
+        a Ratio, a Metric or a function of two sequences, the measures of this
+        package run in compiled parallel kernels, anything else is evaluated
+        in a process pool
+    dtype : Optional[type]
+        the dtype of the result, defaults to int32 for integer distances and
+        float64 otherwise
+    workers : int
+        the number of threads or processes to use, -1 uses all of them
+
+    Return
+    ------
+    np.ndarray
+        matrix of shape (len(queries), len(choices)), pairs whose score is
+        undefined, such as two empty sets, are nan in compiled kernels
+    """
+    kernel, cutoff = _resolve_kernel(scorer)
+
+    if kernel is None:
+        rows = _run_pool(_score_rows, list(queries), scorer, list(choices), workers)
+        out = np.empty((len(queries), len(choices)), dtype=dtype or np.float64)
+
+        if len(queries) > 0:
+            out[:] = [row for chunk in rows for row in chunk]
+
+        return out
+
+    if kernel.equal_length and len(set(map(len, queries)) | set(map(len, choices))) > 1:
+        raise ValueError("'queries' and 'choices' must be of equal length")
+
+    out = np.empty((len(queries), len(choices)), dtype=dtype or kernel.dtype)
+
+    if out.size > 0:
+        _run_kernel(_cdist_driver, kernel, cutoff, queries, choices, out, workers)
+
+    return out
+
+
+def cpdist(queries: Sequence[T], choices: Sequence[T], scorer: Scorer = levenshtein_ratio,
+           dtype: Optional[type] = None, workers: int = 1) -> np.ndarray:
+    """
+    Scores every query against the choice at the same position
+
+    Parameters
+    ----------
+    queries : Sequence[T]
+        the first element of every pair
+    choices : Sequence[T]
+        the second element of every pair, as many as queries
+    scorer : Scorer
+        a Ratio, a Metric or a function of two sequences, see cdist
+    dtype : Optional[type]
+        the dtype of the result, see cdist
+    workers : int
+        the number of threads or processes to use, -1 uses all of them
+
+    Return
+    ------
+    np.ndarray
+        vector of shape (len(queries),)
+    """
+    if len(queries) != len(choices):
+        raise ValueError("'queries' and 'choices' must be of equal length")
+
+    kernel, cutoff = _resolve_kernel(scorer)
+
+    if kernel is None:
+        scores = _run_pool(_score_pairs, list(zip(queries, choices)), scorer, [], workers)
+
+        return np.array([s for chunk in scores for s in chunk], dtype=dtype or np.float64)
+
+    if kernel.equal_length and any(len(q) != len(c) for q, c in zip(queries, choices)):
+        raise ValueError("'a' and 'b' must be of equal length")
+
+    out = np.empty(len(queries), dtype=dtype or kernel.dtype)
+
+    if out.size > 0:
+        _run_kernel(_cpdist_driver, kernel, cutoff, queries, choices, out, workers)
+
+    return out
+
+
+# Top-k extraction
+
+
+def _best_indices(scores: np.ndarray, limit: int) -> np.ndarray:
+    """
+    Finds the positions of the best positive scores, ties in position order
+    """
+    matched = np.flatnonzero(scores > 0)
+
+    return matched[np.argsort(-scores[matched], kind='stable')[:limit]]
+
+
+@numba.njit(parallel=True, cache=True)
+def _fuzzy_score_many(pattern: np.ndarray, mask: np.uint64, data: np.ndarray, offsets: np.ndarray,
+                      cutoff: float, out: np.ndarray):
+    for i in numba.prange(len(out)):
+        out[i] = _fuzzy_score_filtered(pattern, mask, data[offsets[i]:offsets[i + 1]], cutoff)
+
+
+def fuzzy_score_many(pattern: str, candidates: Sequence[str], score_cutoff: Optional[float] = None,
+                     workers: Optional[int] = None,
+                     limit: Optional[int] = None) -> Union[np.ndarray, List[Tuple[str, float, int]]]:
+    """
+    Scores a pattern against many candidates with fuzzy_score
+
+    The pattern is encoded once, candidates that cannot contain it are
+    rejected by a character mask and a greedy subsequence scan before any
+    alignment
+
+    Parameters
+    ----------
+    pattern : str
+        the characters to find, in order
+    candidates : Sequence[str]
+        the strings to score
+    score_cutoff : Optional[float]
+        if given, scores below it are 0 and candidates whose length cannot
+        reach it are not aligned
+    workers : Optional[int]
+        the number of threads to use, None or -1 uses all of them
+    limit : Optional[int]
+        if given, only the best limit matches are returned
+
+    Return
+    ------
+    Union[np.ndarray, List[Tuple[str, float, int]]]
+        the scores, in candidate order, or with limit the (candidate, score,
+        index) triples of the best matches, best first, ties in candidate
+        order, candidates scoring 0 are left out
+    """
+    candidates = list(candidates)
+    codes, _ = _encode([pattern])
+    data, offsets = _encode(candidates)
+
+    out = np.zeros(len(candidates), dtype=np.float64)
+    cutoff = -1. if score_cutoff is None else float(score_cutoff)
+
+    with _threads(-1 if workers is None else workers):
+        _fuzzy_score_many(codes, _char_mask(codes), data, offsets, cutoff, out)
+
+    if limit is None:
+        return out
+
+    return [(candidates[i], float(out[i]), int(i)) for i in _best_indices(out, limit)]
+
+
+@numba.njit(cache=True)
+def _scan(data: np.ndarray, p: int, end: int, pattern: np.ndarray) -> int:
+    """
+    Greedily matches a pattern after position p without skipping a newline,
+    returning where its last symbol matched, -1 at a newline or -2 at the end
+    """
+    for symbol in pattern:
+        p += 1
+
+        while p < end and data[p] != symbol:
+            if data[p] == _NEWLINE:
+                return -1
+
+            p += 1
+
+        if p == end:
+            return -2
+
+    return p
+
+
+@numba.njit(cache=True)
+def _next_line(data: np.ndarray, p: int, end: int) -> int:
+    """
+    The start of the line after the one holding position p
+    """
+    while p < end and data[p] != _NEWLINE:
+        p += 1
+
+    return p + 1
+
+
+@numba.njit(cache=True)
+def _find(data: np.ndarray, begin: int, end: int, pattern: np.ndarray) -> Tuple[int, int]:
+    """
+    Finds the first start from begin onwards matching the whole pattern by
+    _scan, as the start and where the last symbol matched, or (-1, -1)
+    """
+    s = begin
+
+    while True:
+        while s < end and data[s] != pattern[0]:
+            s += 1
+
+        if s >= end:
+            return -1, -1
+
+        p = _scan(data, s, end, pattern[1:])
+
+        if p >= 0:
+            return s, p
+
+        if p == -2:
+            return -1, -1
+
+        # Later starts on the same line stop at the same newline
+        s = _next_line(data, s, end)
+
+
+@numba.njit(cache=True)
+def _advance(data: np.ndarray, offsets: np.ndarray, rows: np.ndarray, starts: np.ndarray, frontier: np.ndarray,
+             pattern: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extends the greedy scan of every surviving row by the last symbol of the
+    pattern, scanning from the next line when it would skip a newline and
+    dropping the rows that no longer contain the pattern
+    """
+    keep = np.zeros(len(rows), dtype=np.bool_)
+    started = np.empty(len(rows), dtype=np.int64)
+    advanced = np.empty(len(rows), dtype=np.int64)
+
+    for k in range(len(rows)):
+        i = rows[k]
+        s = starts[k]
+        p = _scan(data, frontier[k], offsets[i + 1], pattern[-1:]) if len(pattern) > 1 else -1
+
+        if p == -1:
+            begin = _next_line(data, s, offsets[i + 1]) if len(pattern) > 1 else offsets[i]
+            s, p = _find(data, begin, offsets[i + 1], pattern)
+
+        if p >= 0:
+            keep[k] = True
+            started[k] = s
+            advanced[k] = p
+
+    return rows[keep], started[keep], advanced[keep]
+
+
+@numba.njit(parallel=True, cache=True)
+def _fuzzy_score_rows(pattern: np.ndarray, data: np.ndarray, offsets: np.ndarray, rows: np.ndarray,
+                      out: np.ndarray):
+    for k in numba.prange(len(rows)):
+        i = rows[k]
+        out[k] = _fuzzy_score_encoded(pattern, data[offsets[i]:offsets[i + 1]])
+
+
+class _SessionState:
+    __slots__ = ['rows', 'starts', 'frontier', 'scores']
+
+    def __init__(self, rows: np.ndarray, starts: np.ndarray, frontier: np.ndarray):
+        self.rows = rows
+        self.starts = starts
+        self.frontier = frontier
+        self.scores: Optional[np.ndarray] = None
+
+
+class FuzzySession:
+    """
+    Fuzzy matches a query typed one character at a time against fixed
+    candidates, scores are those of fuzzy_score
+
+    Every prefix of the query keeps the candidates that still contain it as a
+    subsequence without skipping a newline, along with where a greedy scan of
+    each one started and stopped, so typing a character only scans the
+    survivors onwards and backspacing returns to the state of the shorter
+    prefix
+    """
+    __slots__ = ['candidates', 'workers', '_data', '_offsets', '_query', '_states']
+
+    def __init__(self, candidates: Sequence[str], query: str = '', workers: Optional[int] = None):
+        self.candidates = list(candidates)
+        self.workers = workers
+        self._data, self._offsets = _encode(self.candidates)
+        self._query = ''
+
+        # Starts and frontiers are absolute positions in the encoded candidates
+        self._states = [_SessionState(np.arange(len(self.candidates)), self._offsets[:-1], self._offsets[:-1] - 1)]
+
+        self.type(query)
+
+    @property
+    def query(self) -> str:
+        return self._query
+
+    @property
+    def survivors(self) -> np.ndarray:
+        """
+        The indices of the candidates containing the query as a subsequence
+        without skipping a newline, which are those fuzzy_score scores above
+        0 for queries without newlines and a superset of them otherwise
+        """
+        return self._states[-1].rows
+
+    def type(self, chars: str):
+        """
+        Appends characters to the query
+        """
+        for char in chars:
+            state = self._states[-1]
+            self._query += char
+
+            pattern, _ = _encode([self._query])
+            self._states.append(_SessionState(*_advance(self._data, self._offsets, state.rows, state.starts,
+                                                        state.frontier, pattern)))
+
+    def backspace(self, n: int = 1):
+        """
+        Removes the last n characters of the query
+        """
+        n = min(n, len(self._query))
+
+        if n > 0:
+            del self._states[-n:]
+            self._query = self._query[:-n]
+
+    def set_query(self, query: str):
+        """
+        Replaces the query, keeping the states of the prefix it shares with
+        the current one
+        """
+        shared = 0
+        while shared < min(len(query), len(self._query)) and query[shared] == self._query[shared]:
+            shared += 1
+
+        self.backspace(len(self._query) - shared)
+        self.type(query[shared:])
+
+    def _survivor_scores(self) -> np.ndarray:
+        state = self._states[-1]
+
+        if state.scores is None:
+            state.scores = np.zeros(len(state.rows), dtype=np.float64)
+
+            if len(self._query) > 0:
+                pattern, _ = _encode([self._query])
+
+                with _threads(-1 if self.workers is None else self.workers):
+                    _fuzzy_score_rows(pattern, self._data, self._offsets, state.rows, state.scores)
+
+        return state.scores
+
+    def scores(self) -> np.ndarray:
+        """
+        Scores every candidate, in candidate order
+        """
+        out = np.zeros(len(self.candidates), dtype=np.float64)
+        out[self.survivors] = self._survivor_scores()
+
+        return out
+
+    def top(self, limit: int = 5) -> List[Tuple[str, float, int]]:
+        """
+        Finds the best matches, as (candidate, score, index) triples, best
+        first, ties in candidate order
+        """
+        rows = self.survivors
+        scores = self._survivor_scores()
+
+        return [(self.candidates[rows[k]], float(scores[k]), int(rows[k])) for k in _best_indices(scores, limit)]
+
+    def __len__(self) -> int:
+        return len(self.survivors)
+
+
+_DISTANCE_FUNCTIONS = [levenshtein_distance, hamming_distance, jaccard_distance]
+
+
+def _is_distance_function(scorer: Any) -> bool:
+    """
+    Whether a scorer is a distance function, compared by identity as scorers
+    need not be hashable
+    """
+    if any(scorer is function for function in _DISTANCE_FUNCTIONS):
+        return True
+
+    # Only a caller that imported the word2vec module can hold its distance
+    word2vec = sys.modules.get(__package__ + '.word2vec')
+
+    return word2vec is not None and scorer is word2vec.word2vec_distance
+
+
+def _bounded_scorer(scorer: Scorer) -> Tuple[Callable[..., float], Optional[str], bool]:
+    """
+    Finds the function to call for a scorer, the name of the keyword that
+    bounds it, if any, and whether lower scores are better
+    """
+    if isinstance(scorer, Ratio):
+        function = scorer.ratio
+        lower_is_better = False
+
+    else:
+        function = scorer
+        lower_is_better = isinstance(scorer, Metric) or _is_distance_function(scorer)
+
+    try:
+        parameters = signature(function).parameters
+    except (TypeError, ValueError):
+        parameters = {}
+
+    keyword = 'max_distance' if lower_is_better else 'score_cutoff'
+
+    return function, keyword if keyword in parameters else None, lower_is_better
+
+
+def _keyed(choices: Union[Mapping[Any, T], Iterable[T]]) -> Iterable[Tuple[Any, T]]:
+    if hasattr(choices, 'items'):
+        return cast(Mapping[Any, T], choices).items()
+
+    return enumerate(choices)
+
+
+def extract(query: T, choices: Union[Mapping[Any, T], Iterable[T]], scorer: Scorer = levenshtein_ratio,
+            limit: Optional[int] = 5, score_cutoff: Optional[float] = None) -> List[Tuple[T, float, Any]]:
+    """
+    Finds the choices that best match the query
+
+    While the best results are collected, the score of the worst one is passed
+    on to scorers that accept a bound (score_cutoff for ratios, max_distance
+    for metrics), so they can give up early on hopeless choices
+
+    Parameters
+    ----------
+    query : T
+        the value to match
+    choices : Union[Mapping[Any, T], Iterable[T]]
+        the values to match against, mappings (dicts, pandas series, ...)
+        are keyed by their keys, other iterables by their position
+    scorer : Scorer
+        a Ratio, a Metric or a function of two values, metrics and distance
+        functions are minimized, anything else is maximized
+    limit : Optional[int]
+        the maximum number of results, positive, None returns every match
+    score_cutoff : Optional[float]
+        the worst score a result may have
+
+    Return
+    ------
+    List[Tuple[T, float, Any]]
+        (choice, score, key) triples, best first, ties in choice order
+    """
+    if limit is not None and limit < 1:
+        raise ValueError("'limit' must be positive")
+
+    function, keyword, lower_is_better = _bounded_scorer(scorer)
+
+    # Scores are negated for metrics, so the heap always keeps the largest
+    sign = -1 if lower_is_better else 1
+    cutoff = None if score_cutoff is None else sign * score_cutoff
+
+    heap: List[Tuple[float, int, Any, T]] = []
+
+    for i, (key, choice) in enumerate(_keyed(choices)):
+        if choice is None:
+            continue
+
+        if keyword is None or cutoff is None:
+            score = function(query, choice)
+
+        else:
+            # Distance bounds of this package are edit counts
+            bound = sign * cutoff
+            if keyword == 'max_distance':
+                bound = int(bound)
+
+            score = function(query, choice, **{keyword: bound})
+
+        value = sign * score
+        if cutoff is not None and value < cutoff:
+            continue
+
+        # Later choices lose ties, their index is negated to sink them
+        entry = (value, -i, key, choice)
+
+        if limit is None or len(heap) < limit:
+            heapq.heappush(heap, entry)
+
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+        else:
+            continue
+
+        if limit is not None and len(heap) == limit:
+            cutoff = heap[0][0]
+
+    return [(choice, sign * value, key) for value, _, key, choice in sorted(heap, reverse=True)]
+
+
+def extract_one(query: T, choices: Union[Mapping[Any, T], Iterable[T]], scorer: Scorer = levenshtein_ratio,
+                score_cutoff: Optional[float] = None) -> Optional[Tuple[T, float, Any]]:
+    """
+    Finds the choice that best matches the query, see extract
+
+    Return
+    ------
+    Optional[Tuple[T, float, Any]]
+        the (choice, score, key) triple, or None if nothing passes score_cutoff
+    """
+    result = extract(query, choices, scorer, limit=1, score_cutoff=score_cutoff)
+
+    return result[0] if result else None
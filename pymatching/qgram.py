@@ -0,0 +1,217 @@
+from typing import Iterable, List, Tuple
+
+import numba
+import numpy as np
+
+from .levenshtein import levenshtein_distance
+from .sorensendice import sorensen_dice_coefficient
+from .tokenset import Measure, Vocabulary, _measure_code, _score
+
+_PAD = '\0'
+
+
+def qgrams(s: str, q: int = 3, pad: bool = True) -> List[str]:
+    """
+    Shingles a string into its overlapping substrings of length q
+
+    Parameters
+    ----------
+    s : str
+        the string
+    q : int
+        the length of the q-grams
+    pad : bool
+        whether the string is padded with q - 1 null characters on both
+        sides, so that its first and last characters get q-grams of their own
+
+    Return
+    ------
+    List[str]
+        the q-grams, in order and with repeats
+    """
+    if q < 1:
+        raise ValueError("'q' must be positive")
+
+    if pad:
+        s = _PAD * (q - 1) + s + _PAD * (q - 1)
+
+    return [s[i:i + q] for i in range(len(s) - q + 1)]
+
+
+@numba.njit(cache=True)
+def _shared_counts(grams: np.ndarray, counts: np.ndarray, offsets: np.ndarray, postings: np.ndarray,
+                   posting_counts: np.ndarray, n_strings: int) -> np.ndarray:
+    """
+    Counts the q-grams every string shares with a query, repeats included
+    """
+    shared = np.zeros(n_strings, dtype=np.int64)
+
+    for i in range(len(grams)):
+        for p in range(offsets[grams[i]], offsets[grams[i] + 1]):
+            shared[postings[p]] += min(counts[i], posting_counts[p])
+
+    return shared
+
+
+class QGramIndex:
+    """
+    Inverted index from the padded q-grams of strings to the strings holding
+    them, for edit distance and q-gram set similarity searches
+
+    Every edit destroys at most q of the |s| + q - 1 padded q-grams of a
+    string, so strings within k edits share at least
+    max(|a|, |b|) + q - 1 - k * q of them, which only the posting lists of
+    the query need to count
+    """
+    __slots__ = ['q', 'strings', 'vocabulary', 'lengths', '_grams', '_counts', '_offsets', '_index']
+
+    def __init__(self, strings: Iterable[str] = (), q: int = 3):
+        if q < 1:
+            raise ValueError("'q' must be positive")
+
+        self.q = q
+        self.strings: List[str] = []
+        self.vocabulary: Vocabulary[str] = Vocabulary()
+        self.lengths = np.empty(0, dtype=np.int64)
+
+        # Distinct q-gram ids and their counts of every string, as CSR
+        self._grams = np.empty(0, dtype=np.int32)
+        self._counts = np.empty(0, dtype=np.int32)
+        self._offsets = np.zeros(1, dtype=np.int64)
+
+        self._index = None
+
+        self.extend(strings)
+
+    def add(self, s: str):
+        self.extend([s])
+
+    def extend(self, strings: Iterable[str]):
+        strings = list(strings)
+        if not strings:
+            return
+
+        rows = [np.unique(np.array([self.vocabulary.intern(x) for x in qgrams(s, self.q)], dtype=np.int32),
+                          return_counts=True) for s in strings]
+
+        self.strings.extend(strings)
+        self.lengths = np.concatenate([self.lengths, [len(s) for s in strings]])
+        self._grams = np.concatenate([self._grams, *(grams for grams, _ in rows)])
+        self._counts = np.concatenate([self._counts, *(counts.astype(np.int32) for _, counts in rows)])
+        self._offsets = np.concatenate([self._offsets, self._offsets[-1] + np.cumsum([len(g) for g, _ in rows])])
+
+        # Posting lists are rebuilt on the next query
+        self._index = None
+
+    def _postings(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The posting lists, as the offsets of every q-gram into the strings
+        holding it and their counts of it
+        """
+        if self._index is None:
+            rows = np.repeat(np.arange(len(self.strings), dtype=np.int32), np.diff(self._offsets))
+            order = np.argsort(self._grams, kind='stable')
+
+            offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self._grams, minlength=len(self.vocabulary)), out=offsets[1:])
+
+            self._index = (offsets, rows[order], self._counts[order])
+
+        return self._index
+
+    def _shared(self, query: str, distinct: bool) -> np.ndarray:
+        grams = [self.vocabulary.ids.get(x, -1) for x in qgrams(query, self.q)]
+        grams, counts = np.unique(np.array([x for x in grams if x >= 0], dtype=np.int32), return_counts=True)
+
+        if distinct:
+            counts = np.ones_like(counts)
+
+        offsets, postings, posting_counts = self._postings()
+
+        return _shared_counts(grams, counts, offsets, postings, posting_counts, len(self.strings))
+
+    def candidates(self, query: str, k: int) -> np.ndarray:
+        """
+        The indices of the strings that may be within k edits of query, by
+        length and by the q-grams they share with it
+        """
+        if k < 0:
+            raise ValueError("'k' must be non-negative")
+
+        required = np.maximum(self.lengths, len(query)) + self.q - 1 - k * self.q
+        close = np.abs(self.lengths - len(query)) <= k
+
+        # Without a positive requirement, the q-grams cannot rule anything out
+        if np.all(required[close] <= 0):
+            return np.flatnonzero(close)
+
+        return np.flatnonzero(close & (self._shared(query, False) >= required))
+
+    def search(self, query: str, k: int) -> List[Tuple[str, int, int]]:
+        """
+        Finds every string within k edits of query
+
+        Parameters
+        ----------
+        query : str
+            the string searched for
+        k : int
+            the largest edit distance
+
+        Return
+        ------
+        List[Tuple[str, int, int]]
+            (string, distance, index) triples, closest first then by index
+        """
+        results = []
+
+        for i in self.candidates(query, k):
+            d = levenshtein_distance(query, self.strings[i], max_distance=k)
+
+            if d <= k:
+                results.append((self.strings[i], d, int(i)))
+
+        return sorted(results, key=lambda x: (x[1], x[2]))
+
+    def similar(self, query: str, threshold: float,
+                measure: Measure = sorensen_dice_coefficient) -> List[Tuple[str, float, int]]:
+        """
+        Finds every string whose set of q-grams is at least threshold similar
+        to that of query
+
+        Parameters
+        ----------
+        query : str
+            the string searched for
+        threshold : float
+            the smallest similarity, within (0, 1]
+        measure : Measure
+            sorensen_dice_coefficient, jaccard_index or overlap_coefficient,
+            their Ratio classes, or 'dice', 'jaccard' or 'overlap'
+
+        Return
+        ------
+        List[Tuple[str, float, int]]
+            (string, similarity, index) triples, most similar first then by
+            index, similarities equal measure(qgrams(query), qgrams(string))
+        """
+        code = _measure_code(measure)
+
+        if not 0 < threshold <= 1:
+            raise ValueError("'threshold' must be within (0, 1]")
+
+        size = len(set(qgrams(query, self.q)))
+        sizes = np.diff(self._offsets)
+        shared = self._shared(query, True)
+
+        results = []
+        for i in np.flatnonzero(shared):
+            score = _score(code, shared[i], size, sizes[i])
+
+            if score >= threshold:
+                results.append((self.strings[i], score, int(i)))
+
+        return sorted(results, key=lambda x: (-x[1], x[2]))
+
+    def __len__(self) -> int:
+        return len(self.strings)
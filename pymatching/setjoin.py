@@ -0,0 +1,340 @@
+from typing import Hashable, Iterable, List, Tuple, TypeVar
+
+import numba
+import numpy as np
+
+from .jaccard import jaccard_index
+from .tokenset import (_DICE, _JACCARD, _OVERLAP, Measure, TokenSetCorpus,
+                       Vocabulary, _intersection_size, _measure_code, _score)
+
+T = TypeVar('T', bound=Hashable)
+
+_UNBOUNDED = 1 << 62
+
+
+@numba.njit(cache=True)
+def _required_overlap(measure: int, threshold: float, a: int, b: int) -> int:
+    """
+    The smallest overlap for which sets of sizes a and b reach threshold,
+    min(a, b) + 1 if none does
+    """
+    if measure == _JACCARD:
+        bound = threshold / (1 + threshold) * (a + b)
+    elif measure == _DICE:
+        bound = threshold * (a + b) / 2
+    else:
+        bound = threshold * min(a, b)
+
+    # The bound is exact up to rounding, which the scores settle
+    overlap = max(int(np.ceil(bound)), 0)
+    while overlap > 0 and _score(measure, overlap - 1, a, b) >= threshold:
+        overlap -= 1
+
+    while overlap <= min(a, b) and _score(measure, overlap, a, b) < threshold:
+        overlap += 1
+
+    return overlap
+
+
+@numba.njit(cache=True)
+def _size_bounds(measure: int, threshold: float, a: int) -> Tuple[int, int]:
+    """
+    The smallest and largest sizes of sets that can reach threshold with a
+    set of size a
+    """
+    if measure == _OVERLAP:
+        return 1, _UNBOUNDED
+
+    if measure == _JACCARD:
+        low = threshold * a
+        high = a / threshold
+    else:
+        low = threshold / (2 - threshold) * a
+        high = (2 - threshold) / threshold * a
+
+    smallest = max(int(low), 1)
+    while smallest > 1 and _required_overlap(measure, threshold, a, smallest - 1) <= smallest - 1:
+        smallest -= 1
+
+    while _required_overlap(measure, threshold, a, smallest) > min(a, smallest):
+        smallest += 1
+
+    largest = max(int(np.ceil(high)), a)
+    while _required_overlap(measure, threshold, a, largest) > min(a, largest):
+        largest -= 1
+
+    while _required_overlap(measure, threshold, a, largest + 1) <= min(a, largest + 1):
+        largest += 1
+
+    return smallest, largest
+
+
+@numba.njit(cache=True)
+def _split(x: np.ndarray, y: np.ndarray, max_hamming: int) -> Tuple[int, int, int, int]:
+    """
+    Splits both sorted sets around the middle element of y, returns a lower
+    bound of their Hamming distance, the split of x, that of y and whether x
+    lacks the middle element
+
+    The elements of x left of the split can only be matched left of it in y
+    and likewise right of it, which bounds where the split of x can be
+    """
+    length_difference = abs(len(x) - len(y))
+
+    if length_difference > max_hamming or len(x) == 0 or len(y) == 0:
+        return length_difference, -1, -1, 0
+
+    mid = (len(y) - 1) // 2
+    slack = (max_hamming - length_difference) // 2
+
+    if len(x) < len(y):
+        lo = mid - slack - length_difference
+        hi = mid + slack
+    else:
+        lo = mid - slack
+        hi = mid + slack + length_difference
+
+    p = np.searchsorted(x, y[mid])
+    if p < lo or p > hi:
+        return max_hamming + 1, -1, -1, 0
+
+    diff = 0 if p < len(x) and x[p] == y[mid] else 1
+    hamming = abs(p - mid) + abs(len(x) - p - 1 + diff - (len(y) - mid - 1)) + diff
+
+    return hamming, p, mid, diff
+
+
+@numba.njit(cache=True)
+def _suffix_filter(x: np.ndarray, y: np.ndarray, max_hamming: int) -> int:
+    """
+    PPJoin+ suffix filter, a lower bound of the Hamming distance between two
+    sorted sets, only computed exactly up to max_hamming
+
+    Both sets are split twice, each half bounding the budget of the other
+    """
+    hamming, p, mid, diff = _split(x, y, max_hamming)
+    if p < 0 or hamming > max_hamming:
+        return hamming
+
+    x_left = x[:p]
+    x_right = x[p + 1 - diff:]
+    y_left = y[:mid]
+    y_right = y[mid + 1:]
+
+    right_difference = abs(len(x_right) - len(y_right))
+
+    left = _split(x_left, y_left, max_hamming - right_difference - diff)[0]
+    hamming = left + right_difference + diff
+    if hamming > max_hamming:
+        return hamming
+
+    return left + _split(x_right, y_right, max_hamming - left - diff)[0] + diff
+
+
+@numba.njit(cache=True)
+def _prefix_join(x_tokens: np.ndarray, x_offsets: np.ndarray, x_order: np.ndarray,
+                 y_tokens: np.ndarray, y_offsets: np.ndarray, y_order: np.ndarray,
+                 n_tokens: int, measure: int, threshold: float, same: bool):
+    """
+    Joins the records of x with those of y, both as sorted token ranks and
+    visited by increasing size, the rarest tokens coming first
+
+    Only the prefixes of y that a similar record must share are indexed, and
+    the prefixes of x probe them. Candidates are pruned by size, by the
+    overlap their positions still allow and by the suffix filter, and the
+    rest are verified by merging. With same, x and y are the same records and
+    every record is only joined with those visited before it
+    """
+    y_sizes = y_offsets[1:] - y_offsets[:-1]
+
+    # Inverted index of the prefixes of y, each list by increasing size
+    counts = np.zeros(n_tokens + 1, dtype=np.int64)
+    prefixes = np.zeros(len(y_sizes), dtype=np.int64)
+
+    for y in y_order:
+        b = y_sizes[y]
+        partner = b if same else _size_bounds(measure, threshold, b)[0]
+        prefixes[y] = min(max(b - _required_overlap(measure, threshold, b, partner) + 1, 0), b)
+
+        for j in range(prefixes[y]):
+            counts[y_tokens[y_offsets[y] + j] + 1] += 1
+
+    starts = np.cumsum(counts)
+    fill = starts[:-1].copy()
+    entries = np.empty((starts[-1], 3), dtype=np.int64)
+
+    for rank in range(len(y_order)):
+        y = y_order[rank]
+
+        for j in range(prefixes[y]):
+            token = y_tokens[y_offsets[y] + j]
+            entries[fill[token], 0] = y
+            entries[fill[token], 1] = j
+            entries[fill[token], 2] = rank
+            fill[token] += 1
+
+    heads = starts[:-1].copy()
+    overlaps = np.zeros(len(y_sizes), dtype=np.int64)
+    touched = np.empty(len(y_sizes), dtype=np.int64)
+
+    pairs_x = []
+    pairs_y = []
+    scores = []
+
+    for x_rank in range(len(x_order)):
+        x = x_order[x_rank]
+        xs = x_tokens[x_offsets[x]:x_offsets[x + 1]]
+        a = len(xs)
+
+        low, high = _size_bounds(measure, threshold, a)
+        if same:
+            high = a
+
+        n_touched = 0
+        prefix = min(max(a - _required_overlap(measure, threshold, a, low) + 1, 0), a)
+
+        for i in range(prefix):
+            token = xs[i]
+
+            # Records too small for this one are too small for the next ones
+            while heads[token] < starts[token + 1] and y_sizes[entries[heads[token], 0]] < low:
+                heads[token] += 1
+
+            for k in range(heads[token], starts[token + 1]):
+                y = entries[k, 0]
+                j = entries[k, 1]
+                b = y_sizes[y]
+
+                if (same and entries[k, 2] >= x_rank) or b > high:
+                    break
+
+                if overlaps[y] < 0:
+                    continue
+
+                required = _required_overlap(measure, threshold, a, b)
+
+                if overlaps[y] == 0:
+                    touched[n_touched] = y
+                    n_touched += 1
+
+                # Positional filter, the rest of both records can only add so much
+                if overlaps[y] + 1 + min(a - i - 1, b - j - 1) < required:
+                    overlaps[y] = -1
+                    continue
+
+                if overlaps[y] == 0:
+                    max_hamming = a + b - 2 * required - i - j
+                    ys = y_tokens[y_offsets[y]:y_offsets[y + 1]]
+
+                    if _suffix_filter(xs[i + 1:], ys[j + 1:], max_hamming) > max_hamming:
+                        overlaps[y] = -1
+                        continue
+
+                overlaps[y] += 1
+
+        for t in range(n_touched):
+            y = touched[t]
+
+            if overlaps[y] > 0:
+                b = y_sizes[y]
+                overlap = _intersection_size(xs, y_tokens[y_offsets[y]:y_offsets[y + 1]])
+                score = _score(measure, overlap, a, b)
+
+                if score >= threshold:
+                    pairs_x.append(x)
+                    pairs_y.append(y)
+                    scores.append(score)
+
+            overlaps[y] = 0
+
+    return np.array(pairs_x, dtype=np.int64), np.array(pairs_y, dtype=np.int64), np.array(scores, dtype=np.float64)
+
+
+def _encode(groups: List[List[Iterable[T]]]) -> Tuple[List[Tuple[np.ndarray, np.ndarray]], int]:
+    """
+    Encodes records as sorted arrays of token ranks, the rarest tokens
+    across every group getting the smallest ranks
+    """
+    vocabulary: Vocabulary[T] = Vocabulary()
+    corpora = [TokenSetCorpus(records, vocabulary) for records in groups]
+
+    frequencies = np.bincount(np.concatenate([corpus.tokens for corpus in corpora]), minlength=len(vocabulary))
+    ranks = np.empty(len(vocabulary), dtype=np.int64)
+    ranks[np.argsort(frequencies, kind='stable')] = np.arange(len(vocabulary))
+
+    result = []
+    for corpus in corpora:
+        tokens = ranks[corpus.tokens]
+        rows = np.repeat(np.arange(len(corpus)), corpus.sizes)
+
+        result.append((tokens[np.lexsort((tokens, rows))], corpus.offsets))
+
+    return result, len(vocabulary)
+
+
+def _by_size(offsets: np.ndarray) -> np.ndarray:
+    # Empty records are similar to nothing
+    sizes = offsets[1:] - offsets[:-1]
+    order = np.argsort(sizes, kind='stable')
+
+    return order[sizes[order] > 0]
+
+
+def _check_threshold(threshold: float):
+    if not 0 < threshold <= 1:
+        raise ValueError("'threshold' must be within (0, 1]")
+
+
+def self_join(records: Iterable[Iterable[T]], measure: Measure = jaccard_index,
+              threshold: float = .8) -> List[Tuple[int, int, float]]:
+    """
+    Finds every pair of records whose similarity reaches threshold
+
+    Parameters
+    ----------
+    records : Iterable[Iterable[T]]
+        the records, as iterables of tokens compared as sets
+    measure : Measure
+        jaccard_index, sorensen_dice_coefficient or overlap_coefficient, their
+        Ratio classes, or 'jaccard', 'dice' or 'overlap'
+    threshold : float
+        the smallest similarity of a pair, within (0, 1]
+
+    Return
+    ------
+    List[Tuple[int, int, float]]
+        (index, other index, similarity) triples with index < other index,
+        in index order, similarities equal those of measure
+    """
+    code = _measure_code(measure)
+    _check_threshold(threshold)
+
+    [(tokens, offsets)], n_tokens = _encode([list(records)])
+    order = _by_size(offsets)
+
+    xs, ys, scores = _prefix_join(tokens, offsets, order, tokens, offsets, order, n_tokens, code, threshold, True)
+
+    return sorted(zip(np.minimum(xs, ys).tolist(), np.maximum(xs, ys).tolist(), scores.tolist()))
+
+
+def join(records: Iterable[Iterable[T]], others: Iterable[Iterable[T]], measure: Measure = jaccard_index,
+         threshold: float = .8) -> List[Tuple[int, int, float]]:
+    """
+    Finds every pair of a record and another record whose similarity reaches
+    threshold, see self_join
+
+    Return
+    ------
+    List[Tuple[int, int, float]]
+        (index in records, index in others, similarity) triples, in index
+        order
+    """
+    code = _measure_code(measure)
+    _check_threshold(threshold)
+
+    [(x_tokens, x_offsets), (y_tokens, y_offsets)], n_tokens = _encode([list(records), list(others)])
+
+    xs, ys, scores = _prefix_join(x_tokens, x_offsets, _by_size(x_offsets), y_tokens, y_offsets,
+                                  _by_size(y_offsets), n_tokens, code, threshold, False)
+
+    return sorted(zip(xs.tolist(), ys.tolist(), scores.tolist()))
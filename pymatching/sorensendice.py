@@ -1,22 +1,25 @@
-from typing import Sequence, TypeVar
+from typing import AbstractSet, Any, Sequence, TypeVar
 
 from .measures import Ratio
 
 T = TypeVar('T')
 
 
-def sorensen_dice_coefficient(one: Sequence[T], two: Sequence[T]) -> float:
-    x = set(one)
-    y = set(two)
-
+def _dice_sets(x: AbstractSet[Any], y: AbstractSet[Any]) -> float:
     return 2 * len(x & y) / (len(x) + len(y))
 
 
+def sorensen_dice_coefficient(one: Sequence[T], two: Sequence[T]) -> float:
+    return _dice_sets(set(one), set(two))
+
+
 dice_coefficient = sorensen_dice_coefficient
 sorensen_coefficient = sorensen_dice_coefficient
 
 
 class SorensenDiceRatio(Ratio[Sequence[T]]):
+    _preprocess = staticmethod(set)
+
     def ratio_min(self):
         return 0
 
@@ -26,6 +29,10 @@ class SorensenDiceRatio(Ratio[Sequence[T]]):
     def ratio(self, a: Sequence[T], b: Sequence[T]) -> float:
         return sorensen_coefficient(a, b)
 
+    def _ratio_prepared(self, a: Sequence[T], b: Sequence[T], prepared_a: AbstractSet[T],
+                        prepared_b: AbstractSet[T]) -> float:
+        return _dice_sets(prepared_a, prepared_b)
+
 
 DiceRatio = SorensenDiceRatio
 SorensenRatio = SorensenDiceRatio
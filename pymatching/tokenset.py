@@ -0,0 +1,277 @@
+from typing import (Any, Callable, Dict, Generic, Hashable, Iterable, List,
+                    Optional, TypeVar, Union)
+
+import numba
+import numpy as np
+
+from .jaccard import JaccardRatio, jaccard_index
+from .measures import Ratio
+from .overlap import OverlapRatio, overlap_coefficient
+from .sorensendice import SorensenDiceRatio, sorensen_dice_coefficient
+
+T = TypeVar('T', bound=Hashable)
+
+Measure = Union[str, Ratio, Callable[[Any, Any], float]]
+
+_JACCARD = 0
+_DICE = 1
+_OVERLAP = 2
+
+_MEASURES: Dict[Any, int] = {
+    'jaccard': _JACCARD,
+    jaccard_index: _JACCARD,
+    JaccardRatio: _JACCARD,
+    'dice': _DICE,
+    sorensen_dice_coefficient: _DICE,
+    SorensenDiceRatio: _DICE,
+    'overlap': _OVERLAP,
+    overlap_coefficient: _OVERLAP,
+    OverlapRatio: _OVERLAP,
+}
+
+
+def _measure_code(measure: Measure) -> int:
+    try:
+        code = _MEASURES.get(type(measure) if isinstance(measure, Ratio) else measure)
+    except TypeError:
+        code = None
+
+    if code is None:
+        raise ValueError("'measure' must be jaccard, dice or overlap")
+
+    return code
+
+
+@numba.njit(cache=True)
+def _intersection_size(a: np.ndarray, b: np.ndarray) -> int:
+    i = 0
+    j = 0
+    count = 0
+
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            i += 1
+        elif a[i] > b[j]:
+            j += 1
+        else:
+            count += 1
+            i += 1
+            j += 1
+
+    return count
+
+
+@numba.njit(cache=True)
+def _score(measure: int, overlap: int, a: int, b: int) -> float:
+    """
+    The similarity of sets of sizes a and b sharing overlap elements, with
+    the arithmetic of the functions of this package
+    """
+    if measure == _JACCARD:
+        return overlap / (a + b - overlap)
+
+    if measure == _DICE:
+        return 2 * overlap / (a + b)
+
+    return overlap / min(a, b)
+
+
+@numba.njit(cache=True)
+def _set_score(measure: int, a: np.ndarray, b: np.ndarray) -> float:
+    # Undefined scores, such as between two empty sets, are nan
+    if len(a) == 0 and len(b) == 0 or measure == _OVERLAP and min(len(a), len(b)) == 0:
+        return np.nan
+
+    return _score(measure, _intersection_size(a, b), len(a), len(b))
+
+
+@numba.njit(cache=True, parallel=True)
+def _scores(query: np.ndarray, tokens: np.ndarray, offsets: np.ndarray, measure: int, out: np.ndarray):
+    for i in numba.prange(len(out)):
+        out[i] = _set_score(measure, query, tokens[offsets[i]:offsets[i + 1]])
+
+
+@numba.njit(cache=True, parallel=True)
+def _pairwise(a_tokens: np.ndarray, a_offsets: np.ndarray, b_tokens: np.ndarray, b_offsets: np.ndarray,
+              measure: int, out: np.ndarray):
+    n_columns = out.shape[1]
+
+    # Flattened, so a single row still spreads over every thread
+    for p in numba.prange(out.size):
+        i = p // n_columns
+        j = p % n_columns
+
+        out[i, j] = _set_score(measure, a_tokens[a_offsets[i]:a_offsets[i + 1]],
+                               b_tokens[b_offsets[j]:b_offsets[j + 1]])
+
+
+class Vocabulary(Generic[T]):
+    """
+    Interns tokens to consecutive int32 ids, so that records become sorted
+    integer arrays hashed once
+    """
+    __slots__ = ['ids', 'tokens']
+
+    def __init__(self, tokens: Iterable[T] = ()):
+        self.ids: Dict[T, int] = {}
+        self.tokens: List[T] = []
+
+        for token in tokens:
+            self.intern(token)
+
+    def intern(self, token: T) -> int:
+        """
+        The id of a token, added if unseen
+        """
+        i = self.ids.get(token)
+
+        if i is None:
+            i = self.ids[token] = len(self.tokens)
+            self.tokens.append(token)
+
+        return i
+
+    def encode(self, record: Iterable[T], add: bool = True) -> np.ndarray:
+        """
+        Encodes a record as the sorted array of the ids of its distinct tokens
+
+        Parameters
+        ----------
+        record : Iterable[T]
+            the tokens, compared as a set
+        add : bool
+            whether unseen tokens are interned, otherwise they are given
+            negative ids, which still count towards the size of the record
+            but match no other record
+
+        Return
+        ------
+        np.ndarray
+            the int32 ids, in increasing order
+        """
+        if add:
+            ids = [self.intern(token) for token in record]
+
+        else:
+            unseen: Dict[T, int] = {}
+            ids = [self.ids[token] if token in self.ids else unseen.setdefault(token, -1 - len(unseen))
+                   for token in record]
+
+        return np.unique(np.array(ids, dtype=np.int32))
+
+    def decode(self, ids: Iterable[int]) -> List[T]:
+        return [self.tokens[i] for i in ids]
+
+    def __contains__(self, token: T) -> bool:
+        return token in self.ids
+
+    def __getitem__(self, i: int) -> T:
+        return self.tokens[i]
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+
+class TokenSetCorpus(Generic[T]):
+    """
+    Records as sets of interned tokens, stored as sorted int32 arrays in one
+    flat buffer, so that set measures only merge integers
+
+    Jaccard, Sorensen-Dice and overlap scores equal those of jaccard_index,
+    sorensen_dice_coefficient and overlap_coefficient, undefined scores are
+    nan instead of raising
+    """
+    __slots__ = ['vocabulary', 'tokens', 'offsets']
+
+    def __init__(self, records: Iterable[Iterable[T]] = (), vocabulary: Optional[Vocabulary[T]] = None):
+        self.vocabulary: Vocabulary[T] = Vocabulary() if vocabulary is None else vocabulary
+        self.tokens = np.empty(0, dtype=np.int32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+        self.extend(records)
+
+    def append(self, record: Iterable[T]):
+        self.extend([record])
+
+    def extend(self, records: Iterable[Iterable[T]]):
+        encoded = [self.vocabulary.encode(record) for record in records]
+        if not encoded:
+            return
+
+        offsets = np.cumsum([len(x) for x in encoded], dtype=np.int64) + self.offsets[-1]
+
+        self.tokens = np.concatenate([self.tokens, *encoded])
+        self.offsets = np.concatenate([self.offsets, offsets])
+
+    @property
+    def sizes(self) -> np.ndarray:
+        """
+        The number of distinct tokens of every record
+        """
+        return np.diff(self.offsets)
+
+    def similarity(self, i: int, j: int, measure: Measure = jaccard_index) -> float:
+        """
+        The similarity between the records at i and j
+        """
+        return float(_set_score(_measure_code(measure), self[i], self[j]))
+
+    def scores(self, query: Iterable[T], measure: Measure = jaccard_index) -> np.ndarray:
+        """
+        Scores a query against every record, without adding its tokens to
+        the vocabulary
+
+        Parameters
+        ----------
+        query : Iterable[T]
+            the tokens of the query, compared as a set
+        measure : Measure
+            jaccard_index, sorensen_dice_coefficient or overlap_coefficient,
+            their Ratio classes, or 'jaccard', 'dice' or 'overlap'
+
+        Return
+        ------
+        np.ndarray
+            the float64 score of every record, in order
+        """
+        code = _measure_code(measure)
+        out = np.empty(len(self), dtype=np.float64)
+
+        _scores(self.vocabulary.encode(query, add=False), self.tokens, self.offsets, code, out)
+
+        return out
+
+    def pairwise(self, other: Optional['TokenSetCorpus[T]'] = None, measure: Measure = jaccard_index) -> np.ndarray:
+        """
+        Scores every record against every record of other, itself by default
+
+        Return
+        ------
+        np.ndarray
+            a float64 matrix, rows following this corpus and columns other
+        """
+        code = _measure_code(measure)
+
+        if other is None:
+            other = self
+        elif other.vocabulary is not self.vocabulary:
+            raise ValueError('Corpora must share their vocabulary')
+
+        out = np.empty((len(self), len(other)), dtype=np.float64)
+        _pairwise(self.tokens, self.offsets, other.tokens, other.offsets, code, out)
+
+        return out
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        """
+        The sorted token ids of the record at i
+        """
+        if not -len(self) <= i < len(self):
+            raise IndexError('Record index out of range')
+
+        i %= len(self)
+
+        return self.tokens[self.offsets[i]:self.offsets[i + 1]]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
@@ -1,7 +1,40 @@
-from typing import Callable, Dict, Generic, Iterable, List, TypeVar
+import heapq
+import json
+import mmap as _mmap
+import struct
+import sys
+from collections import deque
+from itertools import count, islice
+from typing import (Any, Callable, Dict, Generic, Iterable, Iterator, List,
+                    Optional, Tuple, TypeVar, cast)
+
+import numpy as np
 
 T = TypeVar('T')
 
+# On-disk layout of a FrozenTrie, all little-endian:
+# - header: magic, version, target bits, root, size, states, edges, labels size
+# - labels, as a JSON list, padded to 8 bytes
+# - offsets (int64), edge_labels (int32), edge_targets (int32 or int64) and
+#   complete (bool), each padded to 8 bytes
+_MAGIC = b'PYMTRIE\0'
+_VERSION = 1
+_HEADER = struct.Struct('<8sIIqqqqq')
+
+# Traversal orders of completions:
+# - depth, depth first with children in insertion order
+# - sorted, depth first with children in sorted order (lexicographic)
+# - breadth, shortest first
+_ORDERS = ('depth', 'sorted', 'breadth')
+
+
+_Chain = Optional[Tuple[Any, Any]]
+
+
+def _check_order(order: str):
+    if order not in _ORDERS:
+        raise ValueError(f"'order' must be in {_ORDERS}")
+
 
 class TrieNode(Generic[T]):
     def __init__(self, value: T, is_root: bool = False):
@@ -10,23 +43,80 @@ class TrieNode(Generic[T]):
         self.is_complete = False
         self.is_root = is_root
 
-    def get_paths(self, all_paths: bool = False) -> List[List[T]]:
-        paths = []
+        # Weight of the value ending here, and the largest one in the subtree
+        self.weight = 0.0
+        self.max_weight = float('-inf')
+
+    def _update_max_weight(self) -> bool:
+        """
+        Recomputes max_weight from the children, returning whether it changed
+        """
+        best = self.weight if self.is_complete else float('-inf')
+
+        for child in self.children.values():
+            best = max(best, child.max_weight)
+
+        changed = best != self.max_weight
+        self.max_weight = best
+
+        return changed
+
+    def _children(self, order: str) -> List['TrieNode[T]']:
+        if order == 'sorted':
+            return [self.children[k] for k in sorted(self.children)]  # type:ignore
+
+        return list(self.children.values())
+
+    def _iter_paths(self, path: List[T], include_self: bool, order: str) -> Iterator[List[T]]:
+        """
+        Yields the complete paths below this node, each extending path, the
+        values leading to and including this node
+        """
+        if include_self and self.is_complete:
+            yield list(path)
+
+        if order == 'breadth':
+            # Paths are kept as (value, parent) chains until they are yielded
+            queue = deque((child, (child.value, None)) for child in self._children(order))
+            while queue:
+                node, chain = queue.popleft()
+
+                if node.is_complete:
+                    suffix = []
+                    link = chain
+                    while link is not None:
+                        suffix.append(link[0])
+                        link = link[1]
 
-        if not self.is_root:
-            if not all_paths and self.is_complete:
-                paths.append([self.value])
+                    yield path + suffix[::-1]
 
-            for child in self.children.values():
-                for comp in child.get_paths():
-                    paths.append([self.value] + comp)
+                queue.extend((child, (child.value, chain)) for child in node._children(order))
 
-        else:
-            for child in self.children.values():
-                for comp in child.get_paths():
-                    paths.append(comp)
+            return
 
-        return paths
+        # The path is shared, and truncated to the depth of each popped node
+        stack = [(child, len(path)) for child in reversed(self._children(order))]
+        while stack:
+            node, depth = stack.pop()
+
+            del path[depth:]
+            path.append(node.value)
+
+            if node.is_complete:
+                yield list(path)
+
+            stack.extend((child, depth + 1) for child in reversed(node._children(order)))
+
+    def iter_paths(self, all_paths: bool = False, order: str = 'depth') -> Iterator[List[T]]:
+        _check_order(order)
+
+        if self.is_root:
+            return self._iter_paths([], False, order)
+
+        return self._iter_paths([self.value], not all_paths, order)
+
+    def get_paths(self, all_paths: bool = False) -> List[List[T]]:
+        return list(self.iter_paths(all_paths))
 
 
 class Trie(Generic[T]):
@@ -38,8 +128,51 @@ class Trie(Generic[T]):
         self.merger = merger
         self.size = 0
 
-    def add(self, new_value: Iterable[T]):
+    @classmethod
+    def from_sorted(cls, values: Iterable[Iterable[T]], empty: Iterable[T],
+                    merger: Callable[[Iterable[T]], Iterable[T]] = lambda x: x) -> 'Trie[T]':
+        """
+        Builds a trie from sorted values in linear time, every value only
+        walks the part of the previous one it shares, without any lookup
+        """
+        trie = cls(empty, merger)
+        path = [trie.root]
+        previous: List[T] = []
+
+        for value in values:
+            value = list(value)
+
+            if value < previous:
+                raise ValueError("'values' must be sorted")
+
+            shared = 0
+            while shared < min(len(value), len(previous)) and value[shared] == previous[shared]:
+                shared += 1
+
+            del path[shared + 1:]
+
+            for val in value[shared:]:
+                node = TrieNode(val)
+                path[-1].children[val] = node
+                path.append(node)
+                trie.size += 1
+
+            path[-1].is_complete = True
+            previous = value
+
+            for node in reversed(path):
+                if not node._update_max_weight():
+                    break
+
+        return trie
+
+    def add(self, new_value: Iterable[T], weight: Optional[float] = None):
+        """
+        Inserts a value, setting or updating its weight when one is given, new
+        values default to a weight of 0
+        """
         curr = self.root
+        path = [curr]
 
         for val in new_value:
             if val not in curr.children:
@@ -47,22 +180,20 @@ class Trie(Generic[T]):
                 curr.children[val] = TrieNode(val)
 
             curr = curr.children[val]
+            path.append(curr)
 
         curr.is_complete = True
 
-    def get_children(self, item: Iterable[T]) -> Dict[T, TrieNode[T]]:
-        curr = self.root
-
-        for val in item:
-            if val in curr.children:
-                curr = curr.children[val]
-
-            else:
-                raise KeyError(f'{item}')
+        if weight is not None:
+            curr.weight = weight
 
-        return curr.children
+        # Subtree maxima only change along the path, up to the first node
+        # whose maximum is unaffected
+        for node in reversed(path):
+            if not node._update_max_weight():
+                break
 
-    def get_completions(self, prefix: Iterable[T] = []) -> List[Iterable[T]]:
+    def _walk(self, prefix: Iterable[T]) -> Tuple[TrieNode[T], List[T]]:
         curr = self.root
 
         path = []
@@ -76,23 +207,198 @@ class Trie(Generic[T]):
             else:
                 raise KeyError(f'{prefix}')
 
-        return [self.merger(path[:-1] + x) for x in curr.get_paths()]
+        return curr, path
+
+    def get_children(self, item: Iterable[T]) -> Dict[T, TrieNode[T]]:
+        return self._walk(item)[0].children
+
+    def iter_completions(self, prefix: Iterable[T] = [], limit: Optional[int] = None,
+                         order: str = 'depth') -> Iterator[Iterable[T]]:
+        """
+        Lazily yields the values starting with prefix, including the prefix
+        itself, walking the trie with an explicit stack
+
+        Parameters
+        ----------
+        prefix : Iterable[T]
+            the start shared by every value
+        limit : Optional[int]
+            the maximum number of values to yield
+        order : str
+            'depth' (insertion order), 'sorted' or 'breadth' (shortest first)
+
+        Return
+        ------
+        Iterator[Iterable[T]]
+            the merged values
+        """
+        _check_order(order)
+        curr, path = self._walk(prefix)
+
+        return islice(map(self.merger, curr._iter_paths(path, not curr.is_root, order)), limit)
+
+    def iter_paths(self, prefix: Iterable[T] = [], limit: Optional[int] = None,
+                   order: str = 'depth') -> Iterator[Iterable[T]]:
+        """
+        Lazily yields the values strictly extending prefix, see
+        iter_completions
+        """
+        _check_order(order)
+        curr, path = self._walk(prefix)
+
+        return islice(map(self.merger, curr._iter_paths(path, False, order)), limit)
+
+    def get_completions(self, prefix: Iterable[T] = []) -> List[Iterable[T]]:
+        return list(self.iter_completions(prefix))
 
     def get_paths(self, prefix: Iterable[T] = []) -> List[Iterable[T]]:
-        curr = self.root
+        return list(self.iter_paths(prefix))
 
-        path = []
+    def top_completions(self, prefix: Iterable[T] = [], k: int = 10) -> List[Tuple[Iterable[T], float]]:
+        """
+        Finds the k heaviest values starting with prefix, including the
+        prefix itself
 
-        for val in prefix:
-            path.append(val)
+        The search is best-first on the subtree maxima, so it visits close to
+        k paths whatever the size of the subtree
 
-            if val in curr.children:
-                curr = curr.children[val]
+        Return
+        ------
+        List[Tuple[Iterable[T], float]]
+            (value, weight) pairs, heaviest first
+        """
+        curr, path = self._walk(prefix)
+
+        results: List[Tuple[Iterable[T], float]] = []
+        tiebreak = count()
+
+        # Entries are subtrees (node set) or values (node None), both ranked
+        # by the best weight they can lead to, paths as (value, parent) chains
+        heap: List[Tuple[float, int, Optional[TrieNode[T]], _Chain]] = [(-curr.max_weight, next(tiebreak), curr, None)]
+
+        while heap and len(results) < k:
+            weight, _, node, chain = heapq.heappop(heap)
+
+            if node is None:
+                suffix = []
+                while chain is not None:
+                    suffix.append(chain[0])
+                    chain = chain[1]
+
+                results.append((self.merger(path + suffix[::-1]), -weight))
+
+                continue
+
+            if node.is_complete and not node.is_root:
+                heapq.heappush(heap, (-node.weight, next(tiebreak), None, chain))
+
+            for child in node.children.values():
+                heapq.heappush(heap, (-child.max_weight, next(tiebreak), child, (child.value, chain)))
+
+        return results
+
+    def search_within(self, query: Iterable[T], max_distance: int,
+                      prefix: bool = False) -> Iterator[Tuple[Iterable[T], int]]:
+        """
+        Lazily finds every value within max_distance edits of the query
+
+        One row of the edit distance matrix is carried per node, so values
+        share the work done on their common prefix, and a subtree is pruned as
+        soon as its row minimum exceeds max_distance
+
+        Parameters
+        ----------
+        query : Iterable[T]
+            the value to match
+        max_distance : int
+            the largest edit distance to report
+        prefix : bool
+            if True, the query only has to match a prefix of the value, which
+            gives typo tolerant completions
+
+        Return
+        ------
+        Iterator[Tuple[Iterable[T], int]]
+            (value, distance) pairs, in the order of get_completions
+        """
+        query = list(query)
+        first_row = list(range(len(query) + 1))
+
+        if self.root.is_complete and len(query) <= max_distance:
+            yield self.merger([]), len(query)
+
+        path: List[T] = []
+
+        # (node, depth, row, best distance of a prefix so far)
+        # a row of None means no deeper prefix can improve the best distance
+        stack: List[Tuple[TrieNode[T], int, Optional[List[int]], int]] = [
+            (child, 1, first_row, first_row[-1]) for child in reversed(list(self.root.children.values()))]
+
+        while stack:
+            node, depth, prev, best = stack.pop()
+
+            del path[depth - 1:]
+            path.append(node.value)
+
+            row = None
+            if prev is not None:
+                row = [prev[0] + 1]
+                for i, val in enumerate(query):
+                    row.append(min(row[i] + 1, prev[i + 1] + 1, prev[i] + (val != node.value)))
+
+                if prefix:
+                    best = min(best, row[-1])
+
+                if min(row) > max_distance:
+                    if not prefix or best > max_distance:
+                        continue
+
+                    row = None
+
+            distance = best if prefix else cast(List[int], row)[-1]
+
+            if node.is_complete and distance <= max_distance:
+                yield self.merger(list(path)), distance
+
+            for child in reversed(list(node.children.values())):
+                stack.append((child, depth + 1, row, best))
+
+    def freeze(self) -> 'FrozenTrie[T]':
+        """
+        Converts the trie to an immutable, array backed FrozenTrie in which
+        identical subtrees are shared
+        """
+        builder = _DawgBuilder[T]()
+        states: Dict[int, int] = {}
+
+        # Iterative post-order, children are registered before their parent
+        stack = [(self.root, False)]
+        while stack:
+            node, expanded = stack.pop()
+
+            if expanded:
+                edges = [(builder.label(val), states.pop(id(child))) for val, child in node.children.items()]
+                states[id(node)] = builder.add(node.is_complete, edges)
 
             else:
-                raise KeyError(f'{prefix}')
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
 
-        return [self.merger(path[:-1] + x) for x in curr.get_paths(all_paths=True)]
+        return builder.build(states[id(self.root)], self.empty, self.merger, self.size)
+
+    def save(self, path: str):
+        """
+        Writes the frozen trie to path, see FrozenTrie.save
+        """
+        self.freeze().save(path)
+
+    @staticmethod
+    def open(path: str, empty: Iterable[T] = [], merger: Callable[[Iterable[T]], Iterable[T]] = lambda x: x,
+             mmap: bool = True) -> 'FrozenTrie[T]':
+        """
+        Opens a trie written by save, see FrozenTrie.open
+        """
+        return FrozenTrie.open(path, empty, merger, mmap)
 
     def __contains__(self, item: Iterable[T]) -> bool:
         curr = self.root
@@ -111,3 +417,328 @@ class Trie(Generic[T]):
 
     def __len__(self) -> int:
         return self.size
+
+
+class _DawgBuilder(Generic[T]):
+    """
+    Registers the states of a minimal acyclic automaton, states with the same
+    finality and edges are only stored once
+    """
+    __slots__ = ['labels', 'label_ids', 'register', 'finals', 'edges']
+
+    def __init__(self):
+        self.labels: List[T] = []
+        self.label_ids: Dict[T, int] = {}
+        self.register: Dict[Tuple[bool, Tuple[Tuple[int, int], ...]], int] = {}
+        self.finals: List[bool] = []
+        self.edges: List[Tuple[Tuple[int, int], ...]] = []
+
+    def label(self, value: T) -> int:
+        if value not in self.label_ids:
+            self.label_ids[value] = len(self.labels)
+            self.labels.append(value)
+
+        return self.label_ids[value]
+
+    def add(self, final: bool, edges: Iterable[Tuple[int, int]]) -> int:
+        key = (final, tuple(sorted(edges)))
+
+        if key not in self.register:
+            self.register[key] = len(self.finals)
+            self.finals.append(final)
+            self.edges.append(key[1])
+
+        return self.register[key]
+
+    def build(self, root: int, empty: Iterable[T], merger: Callable[[Iterable[T]], Iterable[T]],
+              size: int) -> 'FrozenTrie[T]':
+        # Labels are renumbered in their natural order when they have one
+        try:
+            order = sorted(range(len(self.labels)), key=lambda i: self.labels[i])  # type:ignore
+        except TypeError:
+            order = list(range(len(self.labels)))
+
+        remap = np.empty(len(order), dtype=np.int32)
+        remap[order] = np.arange(len(order), dtype=np.int32)
+
+        offsets = np.zeros(len(self.finals) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in self.edges], out=offsets[1:])
+
+        target_type = np.int32 if len(self.finals) < 2 ** 31 else np.int64
+        edge_labels = np.empty(offsets[-1], dtype=np.int32)
+        edge_targets = np.empty(offsets[-1], dtype=target_type)
+
+        for state, edges in enumerate(self.edges):
+            if edges:
+                pairs = sorted((remap[label], target) for label, target in edges)
+                edge_labels[offsets[state]:offsets[state + 1]] = [label for label, _ in pairs]
+                edge_targets[offsets[state]:offsets[state + 1]] = [target for _, target in pairs]
+
+        return FrozenTrie(
+            empty, merger, size, root, [self.labels[i] for i in order],
+            offsets, edge_labels, edge_targets, np.array(self.finals, dtype=np.bool_))
+
+
+class FrozenTrie(Generic[T]):
+    """
+    Immutable trie stored as a minimal acyclic automaton (DAWG) in NumPy
+    arrays, the edges of state i are edge_labels/edge_targets[offsets[i]:
+    offsets[i + 1]], sorted by label
+
+    Completions come in the natural order of the labels when they have one,
+    rather than in insertion order
+    """
+    __slots__ = ['empty', 'merger', 'size', 'root', 'labels', 'label_ids',
+                 'offsets', 'edge_labels', 'edge_targets', 'complete']
+
+    def __init__(self, empty: Iterable[T], merger: Callable[[Iterable[T]], Iterable[T]], size: int,
+                 root: int, labels: List[T], offsets: np.ndarray, edge_labels: np.ndarray,
+                 edge_targets: np.ndarray, complete: np.ndarray):
+        self.empty = empty
+        self.merger = merger
+        self.size = size
+        self.root = root
+        self.labels = labels
+        self.label_ids = {label: i for i, label in enumerate(labels)}
+        self.offsets = offsets
+        self.edge_labels = edge_labels
+        self.edge_targets = edge_targets
+        self.complete = complete
+
+    @classmethod
+    def from_sorted(cls, values: Iterable[Iterable[T]], empty: Iterable[T],
+                    merger: Callable[[Iterable[T]], Iterable[T]] = lambda x: x) -> 'FrozenTrie[T]':
+        """
+        Builds the minimal automaton of sorted values in linear time, without
+        materializing the trie (Daciuk et al.)
+        """
+        builder = _DawgBuilder[T]()
+
+        # Path of the previous value whose states are not registered yet,
+        # each state is [final, edges], its last edge leads to the next state
+        root: List[Any] = [False, []]
+        unchecked: List[List[Any]] = [root]
+        previous: List[T] = []
+        size = 0
+
+        def minimize(depth: int):
+            while len(unchecked) > depth + 1:
+                final, edges = unchecked.pop()
+                unchecked[-1][1][-1] = (unchecked[-1][1][-1][0], builder.add(final, edges))
+
+        for value in values:
+            value = list(value)
+
+            if value < previous:
+                raise ValueError("'values' must be sorted")
+
+            shared = 0
+            while shared < min(len(value), len(previous)) and value[shared] == previous[shared]:
+                shared += 1
+
+            minimize(shared)
+
+            for val in value[shared:]:
+                state: List[Any] = [False, []]
+                unchecked[-1][1].append((builder.label(val), -1))
+                unchecked.append(state)
+                size += 1
+
+            unchecked[-1][0] = True
+            previous = value
+
+        minimize(0)
+
+        return builder.build(builder.add(root[0], root[1]), empty, merger, size)
+
+    def _child(self, state: int, value: T) -> int:
+        label = self.label_ids.get(value)
+        if label is None:
+            return -1
+
+        lo = self.offsets[state]
+        hi = self.offsets[state + 1]
+        i = lo + np.searchsorted(self.edge_labels[lo:hi], label)
+
+        if i < hi and self.edge_labels[i] == label:
+            return int(self.edge_targets[i])
+
+        return -1
+
+    def _walk(self, prefix: Iterable[T]) -> Tuple[int, List[T]]:
+        state = self.root
+        path = []
+
+        for val in prefix:
+            path.append(val)
+            state = self._child(state, val)
+
+            if state < 0:
+                raise KeyError(f'{prefix}')
+
+        return state, path
+
+    def _children(self, state: int) -> Iterator[Tuple[int, int]]:
+        for i in range(self.offsets[state], self.offsets[state + 1]):
+            yield int(self.edge_targets[i]), int(self.edge_labels[i])
+
+    def _iter_paths(self, state: int, path: List[T], include_self: bool, order: str) -> Iterator[List[T]]:
+        # Edges are sorted by label, so depth and sorted orders are the same
+        if include_self and self.complete[state]:
+            yield list(path)
+
+        if order == 'breadth':
+            queue = deque((target, (self.labels[label], None)) for target, label in self._children(state))
+            while queue:
+                state, chain = queue.popleft()
+
+                if self.complete[state]:
+                    suffix = []
+                    link = chain
+                    while link is not None:
+                        suffix.append(link[0])
+                        link = link[1]
+
+                    yield path + suffix[::-1]
+
+                queue.extend((target, (self.labels[label], chain)) for target, label in self._children(state))
+
+            return
+
+        stack = [(target, len(path), label) for target, label in reversed(list(self._children(state)))]
+        while stack:
+            state, depth, label = stack.pop()
+
+            del path[depth:]
+            path.append(self.labels[label])
+
+            if self.complete[state]:
+                yield list(path)
+
+            stack.extend((target, depth + 1, label) for target, label in reversed(list(self._children(state))))
+
+    def iter_completions(self, prefix: Iterable[T] = [], limit: Optional[int] = None,
+                         order: str = 'depth') -> Iterator[Iterable[T]]:
+        """
+        Lazily yields the values starting with prefix, see
+        Trie.iter_completions
+        """
+        _check_order(order)
+        state, path = self._walk(prefix)
+
+        return islice(map(self.merger, self._iter_paths(state, path, len(path) > 0, order)), limit)
+
+    def iter_paths(self, prefix: Iterable[T] = [], limit: Optional[int] = None,
+                   order: str = 'depth') -> Iterator[Iterable[T]]:
+        """
+        Lazily yields the values strictly extending prefix, see
+        Trie.iter_completions
+        """
+        _check_order(order)
+        state, path = self._walk(prefix)
+
+        return islice(map(self.merger, self._iter_paths(state, path, False, order)), limit)
+
+    def get_completions(self, prefix: Iterable[T] = []) -> List[Iterable[T]]:
+        return list(self.iter_completions(prefix))
+
+    def get_paths(self, prefix: Iterable[T] = []) -> List[Iterable[T]]:
+        return list(self.iter_paths(prefix))
+
+    def save(self, path: str):
+        """
+        Writes the trie to path in a versioned binary layout, labels must be
+        strings or numbers, the merger is not saved
+        """
+        if not all(isinstance(label, (str, int, float)) for label in self.labels):
+            raise TypeError('labels must be strings or numbers to be saved')
+
+        labels = json.dumps(self.labels).encode('utf-8')
+
+        def pad(f, size: int):
+            f.write(b'\0' * (-size % 8))
+
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(
+                _MAGIC, _VERSION, self.edge_targets.dtype.itemsize * 8, self.root, self.size,
+                len(self.complete), len(self.edge_labels), len(labels)))
+
+            f.write(labels)
+            pad(f, len(labels))
+
+            for array in [self.offsets, self.edge_labels, self.edge_targets, self.complete]:
+                data = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<')).tobytes()
+                f.write(data)
+                pad(f, len(data))
+
+    @classmethod
+    def open(cls, path: str, empty: Iterable[T] = [], merger: Callable[[Iterable[T]], Iterable[T]] = lambda x: x,
+             mmap: bool = True) -> 'FrozenTrie[T]':
+        """
+        Opens a trie written by save
+
+        With mmap, the arrays are views of the memory-mapped file, so opening
+        does not depend on the size of the trie and processes opening the same
+        file share its pages through the page cache
+        """
+        with open(path, 'rb') as f:
+            if mmap:
+                buffer: Any = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+            else:
+                buffer = f.read()
+
+        if len(buffer) < _HEADER.size:
+            raise ValueError(f'{path} is not a saved trie')
+
+        magic, version, target_bits, root, size, states, edges, labels_size = _HEADER.unpack_from(buffer)
+
+        if magic != _MAGIC:
+            raise ValueError(f'{path} is not a saved trie')
+
+        if version != _VERSION:
+            raise ValueError(f'{path} has unsupported version {version}')
+
+        position = _HEADER.size
+        labels = json.loads(bytes(buffer[position:position + labels_size]).decode('utf-8'))
+        position += labels_size + -labels_size % 8
+
+        arrays = []
+        for dtype, length in [('<i8', states + 1), ('<i4', edges), (f'<i{target_bits // 8}', edges), ('?', states)]:
+            array = np.frombuffer(buffer, dtype=dtype, count=length, offset=position)
+            arrays.append(array)
+            position += array.nbytes + -array.nbytes % 8
+
+        return cls(empty, merger, size, root, labels, *arrays)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Reports the bytes used by each part of the trie and their total
+        """
+        usage = {
+            'offsets': self.offsets.nbytes,
+            'edge_labels': self.edge_labels.nbytes,
+            'edge_targets': self.edge_targets.nbytes,
+            'complete': self.complete.nbytes,
+            'labels': sys.getsizeof(self.labels) + sum(map(sys.getsizeof, self.labels)),
+            'label_ids': sys.getsizeof(self.label_ids)
+        }
+        usage['total'] = sum(usage.values())
+
+        return usage
+
+    def __contains__(self, item: Iterable[T]) -> bool:
+        state = self.root
+
+        for val in item:
+            state = self._child(state, val)
+
+            if state < 0:
+                return False
+
+        return bool(self.complete[state])
+
+    def __getitem__(self, prefix: Iterable[T]) -> List[Iterable[T]]:
+        return self.get_completions(prefix)
+
+    def __len__(self) -> int:
+        return self.size
@@ -1,53 +1,447 @@
-from multiprocessing.pool import ThreadPool
+import json
+import os
+import re
+from collections import OrderedDict
+from threading import Lock
+from typing import (TYPE_CHECKING, Dict, Iterable, List, NamedTuple,
+                    Optional, Sequence, Tuple, Union)
 
 import numpy as np
-import spacy
-from spacy.language import Language
 
 from .measures import Metric, Ratio
 
-spacy.prefer_gpu()
-nlp: Language = None
-nlp_future = ThreadPool(1).apply_async(spacy.load, ['en_core_web_md'])
+if TYPE_CHECKING:
+    from spacy.language import Language
+
+model_name = os.environ.get('PYMATCHING_SPACY_MODEL', 'en_core_web_md')
+nlp: Optional['Language'] = None
+store: Optional['VectorStore'] = None
+_nlp_lock = Lock()
+
+# Words and single punctuation marks, close to what spaCy splits on
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class VectorCache:
+    """
+    Bounded least recently used cache of text vectors, keyed by text
+    """
+    __slots__ = ['maxsize', 'hits', 'misses', '_vectors', '_lock']
+
+    def __init__(self, maxsize: int = 2 ** 16):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._vectors: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._vectors.get(text)
+
+            if vector is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._vectors.move_to_end(text)
+
+            return vector
+
+    def put(self, text: str, vector: np.ndarray):
+        with self._lock:
+            self._vectors[text] = vector
+            self._vectors.move_to_end(text)
+
+            while len(self._vectors) > max(self.maxsize, 0):
+                self._vectors.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._vectors))
+
+    def clear(self):
+        with self._lock:
+            self._vectors.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+
+vector_cache = VectorCache()
+
+
+class VectorStore:
+    """
+    Word vectors and the row of every word, exported once from a spaCy model
+    so they can be memory mapped and shared by processes without spaCy
+
+    Texts are split into words and punctuation marks, approximating the
+    spaCy tokenizer, and their vector is the average of the word vectors,
+    words without a vector counting as zeros
+    """
+    __slots__ = ['vectors', 'rows']
+
+    def __init__(self, vectors: np.ndarray, rows: Dict[str, int]):
+        self.vectors = vectors
+        self.rows = rows
+
+    @classmethod
+    def from_nlp(cls, model: Optional['Language'] = None) -> 'VectorStore':
+        """
+        Copies the vectors of a spaCy pipeline, the current model by default
+        """
+        vocab = (model or get_nlp()).vocab
+        data = vocab.vectors.data
+        data = np.asarray(data.get() if hasattr(data, 'get') else data, dtype=np.float32)
+
+        keys = [(vocab.strings[key], row) for key, row in vocab.vectors.key2row.items() if key in vocab.strings]
+
+        # Only the rows some word points to are kept
+        used, remap = np.unique(np.array([row for _, row in keys], dtype=np.int64), return_inverse=True)
+
+        return cls(data[used], {word: int(row) for (word, _), row in zip(keys, remap)})
+
+    def save(self, path: str):
+        """
+        Writes the vectors to path/vectors.npy and the rows to path/index.json
+        """
+        os.makedirs(path, exist_ok=True)
+
+        np.save(os.path.join(path, 'vectors.npy'), np.ascontiguousarray(self.vectors))
+
+        with open(os.path.join(path, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.rows, f, ensure_ascii=False)
+
+    @classmethod
+    def open(cls, path: str, mmap: bool = True) -> 'VectorStore':
+        """
+        Loads a saved store, memory mapping the vectors read-only unless mmap
+        is False
+        """
+        vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r' if mmap else None)
+
+        with open(os.path.join(path, 'index.json'), encoding='utf-8') as f:
+            rows = json.load(f)
+
+        return cls(vectors, rows)
+
+    def vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.vectors.shape[1], dtype=np.float32)
+
+        words = _TOKEN.findall(text)
+        for word in words:
+            row = self.rows.get(word)
+
+            if row is not None:
+                vector += self.vectors[row]
+
+        return vector / len(words) if words else vector
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+def export_vectors(path: str, model: Optional[Union[str, 'Language']] = None):
+    """
+    Saves the vectors of a spaCy model, the current one by default, as a
+    VectorStore, see VectorStore.save
+    """
+    if isinstance(model, str):
+        import spacy
+
+        model = spacy.load(model)
+
+    VectorStore.from_nlp(model).save(path)
+
+
+def set_model(model: Union[str, 'Language', VectorStore]):
+    """
+    Sets the vectors to use, from a spaCy model by name, a loaded pipeline or
+    a VectorStore, replacing any model already loaded and the vectors cached
+    from it
+    """
+    global model_name, nlp, store
+
+    with _nlp_lock:
+        store = None
+
+        if isinstance(model, VectorStore):
+            store = model
+            nlp = None
+
+        elif isinstance(model, str):
+            model_name = model
+            nlp = None
+
+        else:
+            model_name = model.meta.get('name', model_name)
+            nlp = model
+
+    vector_cache.clear()
 
 
 def _check_nlp():
     global nlp
-    if nlp is None:
-        nlp = nlp_future.get()
 
+    if nlp is not None:
+        return
+
+    with _nlp_lock:
+        if nlp is None:
+            import spacy
 
-def get_nlp():
+            spacy.prefer_gpu()
+            nlp = spacy.load(model_name)
+
+
+def get_nlp() -> 'Language':
     _check_nlp()
 
     return nlp
 
 
-def word2vec_distance(one: str, two: str) -> float:
-    # if one.split() != 1:
-    #     raise ValueError("'one' must be a single word")
+def _frozen(vector: np.ndarray) -> np.ndarray:
+    vector = np.array(vector, dtype=np.float32)
+    vector.setflags(write=False)
 
-    # if two.split() != 1:
-    #     raise ValueError("'two' must be a single word")
+    return vector
 
-    _check_nlp()
 
-    return np.linalg.norm(nlp(one).vector - nlp(two).vector)
+def _compute_vectors(texts: List[str]) -> List[np.ndarray]:
+    if store is not None:
+        return [_frozen(store.vector(text)) for text in texts]
 
+    return [_frozen(doc.vector) for doc in get_nlp().tokenizer.pipe(texts)]
 
-def word2vec_similarity(one: str, two: str) -> float:
-    _check_nlp()
 
-    a = nlp(one)
-    b = nlp(two)
+def get_vector(text: str) -> np.ndarray:
+    """
+    Finds the vector of a text, the average of its token vectors
+
+    Without a VectorStore only the spaCy tokenizer runs, so the vector is
+    that of the full pipeline without paying for tagging or parsing
+    """
+    vector = vector_cache.get(text)
+
+    if vector is None:
+        vector = _compute_vectors([text])[0]
+        vector_cache.put(text, vector)
+
+    return vector
+
 
-    if np.count_nonzero(a.vector) == 0:
+def get_vectors(texts: Iterable[str]) -> np.ndarray:
+    """
+    Stacks the vectors of many texts, tokenizing the uncached ones in batch
+    """
+    texts = list(texts)
+    vectors: List[Optional[np.ndarray]] = [vector_cache.get(text) for text in texts]
+
+    missing = list(OrderedDict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    if missing:
+        found = dict(zip(missing, _compute_vectors(missing)))
+
+        for text in missing:
+            vector_cache.put(text, found[text])
+
+        vectors = [found[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+
+    if not vectors:
+        length = store.vectors.shape[1] if store is not None else get_nlp().vocab.vectors_length
+
+        return np.zeros((0, length), dtype=np.float32)
+
+    return np.stack(vectors)
+
+
+def word2vec_distance(one: str, two: str) -> float:
+    return float(np.linalg.norm(get_vector(one) - get_vector(two)))
+
+
+def _vector_similarity(one: str, two: str, a: np.ndarray, b: np.ndarray) -> float:
+    if np.count_nonzero(a) == 0:
         return 0
 
-    if np.count_nonzero(b.vector) == 0:
+    if np.count_nonzero(b) == 0:
         return 0
 
-    return a.similarity(b)
+    if one == two:
+        return 1
+
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def word2vec_similarity(one: str, two: str) -> float:
+    return _vector_similarity(one, two, get_vector(one), get_vector(two))
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scales rows to unit length, zero rows stay zero
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def similarity_matrix(texts_a: Sequence[str], texts_b: Sequence[str]) -> np.ndarray:
+    """
+    Computes word2vec_similarity between every pair of texts
+
+    Parameters
+    ----------
+    texts_a : Sequence[str]
+        the texts making up the rows of the result
+    texts_b : Sequence[str]
+        the texts making up the columns of the result
+
+    Return
+    ------
+    np.ndarray
+        float32 matrix of shape (len(texts_a), len(texts_b)), 0 wherever a
+        text has no vector
+    """
+    a = get_vectors(texts_a)
+    b = get_vectors(texts_b)
+
+    out = _normalized(a) @ _normalized(b).T
+
+    # Identical texts are exactly similar, as in word2vec_similarity
+    columns: Dict[str, List[int]] = {}
+    for j, text in enumerate(texts_b):
+        columns.setdefault(text, []).append(j)
+
+    for i, text in enumerate(texts_a):
+        if text in columns and np.any(a[i]):
+            out[i, columns[text]] = 1
+
+    return out
+
+
+class VectorIndex:
+    """
+    Normalized vectors of fixed candidate texts, searched by cosine
+    similarity
+
+    With n_bits, every one of n_tables hash tables buckets the candidates
+    by the signs of n_bits random projections of their vectors, and only
+    the candidates sharing a bucket with the query in some table are
+    scored, trading exactness for speed over large vocabularies
+    """
+    __slots__ = ['texts', 'vectors', 'planes', 'keys', 'orders']
+
+    def __init__(self, texts: Sequence[str], n_bits: Optional[int] = None, n_tables: int = 8,
+                 seed: Optional[int] = 0):
+        self.texts = list(texts)
+        self.vectors = _normalized(get_vectors(self.texts))
+        self.planes: Optional[np.ndarray] = None
+        self.keys: List[np.ndarray] = []
+        self.orders: List[np.ndarray] = []
+
+        if n_bits is None:
+            return
+
+        if not 0 < n_bits <= 63:
+            raise ValueError("'n_bits' must be within [1, 63]")
+
+        if n_tables < 1:
+            raise ValueError("'n_tables' must be positive")
+
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((n_tables, self.vectors.shape[1], n_bits)).astype(np.float32)
+
+        # Texts without a vector are never similar to anything
+        rows = np.flatnonzero(np.any(self.vectors, axis=1))
+
+        for table in range(n_tables):
+            keys = self._hash(self.vectors[rows], table)
+            order = np.argsort(keys, kind='stable')
+
+            self.keys.append(keys[order])
+            self.orders.append(rows[order])
+
+    def _hash(self, vectors: np.ndarray, table: int) -> np.ndarray:
+        bits = (vectors @ self.planes[table]) >= 0
+
+        return bits @ (np.int64(1) << np.arange(bits.shape[1], dtype=np.int64))
+
+    def _candidates(self, vector: np.ndarray) -> np.ndarray:
+        if self.planes is None:
+            return np.arange(len(self.texts))
+
+        found = []
+        for table in range(len(self.keys)):
+            key = self._hash(vector[None, :], table)[0]
+            lo = np.searchsorted(self.keys[table], key, side='left')
+            hi = np.searchsorted(self.keys[table], key, side='right')
+
+            found.append(self.orders[table][lo:hi])
+
+        return np.unique(np.concatenate(found))
+
+    def most_similar(self, text: str, k: int = 10) -> List[Tuple[str, float, int]]:
+        """
+        Finds the k candidates most similar to text, as (candidate, score,
+        index) triples, best first, ties in candidate order
+        """
+        vector = get_vector(text)
+
+        if k < 1 or not np.any(vector):
+            return []
+
+        candidates = self._candidates(vector)
+        scores = self.vectors[candidates] @ (vector / np.linalg.norm(vector))
+
+        if len(candidates) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(candidates))
+
+        best = best[np.lexsort((candidates[best], -scores[best]))]
+
+        return [
+            (self.texts[i], 1. if self.texts[i] == text else float(scores[j]), int(i))
+            for i, j in zip(candidates[best], best)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+
+def most_similar(text: str, candidates_index: Union[VectorIndex, Sequence[str]],
+                 k: int = 10) -> List[Tuple[str, float, int]]:
+    """
+    Finds the k candidates most similar to text, see VectorIndex
+
+    Parameters
+    ----------
+    text : str
+        the text to match
+    candidates_index : Union[VectorIndex, Sequence[str]]
+        a prebuilt index, or candidate texts to search exactly
+    k : int
+        the maximum number of results
+
+    Return
+    ------
+    List[Tuple[str, float, int]]
+        (candidate, score, index) triples, best first, ties in candidate order
+    """
+    if not isinstance(candidates_index, VectorIndex):
+        candidates_index = VectorIndex(candidates_index)
+
+    return candidates_index.most_similar(text, k)
 
 
 class Word2VecMetric(Metric[str]):
@@ -56,6 +450,9 @@ class Word2VecMetric(Metric[str]):
 
 
 class Word2VecRatio(Ratio[str]):
+    _preprocess = staticmethod(get_vector)
+    cost = 64
+
     def ratio_min(self) -> int:
         return 0
 
@@ -64,3 +461,9 @@ class Word2VecRatio(Ratio[str]):
 
     def ratio(self, a: str, b: str) -> float:
         return word2vec_similarity(a, b)
+
+    def _ratio_prepared(self, a: str, b: str, prepared_a: np.ndarray, prepared_b: np.ndarray) -> float:
+        return _vector_similarity(a, b, prepared_a, prepared_b)
+
+    def similarity_matrix(self, a: Sequence[str], b: Sequence[str]) -> np.ndarray:
+        return similarity_matrix(a, b)
@@ -1,12 +1,89 @@
+import re
 from itertools import combinations
 from math import ceil
-from random import sample, seed
+from random import Random, sample, seed
 from typing import List, Tuple
 
 import pytest
 from pytest_benchmark.fixture import BenchmarkFixture
 
 from pymatching import fuzzy_match, fuzzy_score
+from pymatching.fuzzymatch import _compress_match, _map_to_norm
+
+
+def _regex_spread_consec(matches: List[List[int]], final_match: List[int]) -> List[int]:
+    final_match = final_match.copy()
+
+    oleft = len(matches)
+    left = final_match.count(-1)
+    while left < oleft and final_match.count(-1) > 0:
+        for i, l in list(enumerate(matches))[final_match.index(-1):]:
+            if final_match[i] == -1:
+                bot = final_match[i - 1]
+                if bot > -1 and (bot + 1) in l:
+                    final_match[i] = bot + 1
+
+                if i + 1 < len(final_match):
+                    top = final_match[i + 1]
+                    if top > -1 and (top - 1) in l:
+                        final_match[i] = top - 1
+
+        oleft = left
+        left = final_match.count(-1)
+
+    return final_match
+
+
+def _regex_fuzzy_match(pattern: str, text: str) -> Tuple[List[str], str, int]:
+    """
+    The regex matcher fuzzy_match replaced, as a reference
+    """
+    def patlist(pat):
+        return '(?=({}))'.format('.*'.join('({})'.format(re.escape(x)) for x in pat))
+
+    # Mark all viable character indices
+    matches: List[List[int]] = [[] for _ in range(len(pattern))]
+    for s in range(len(pattern)):
+        st = -1 if s == 0 else matches[s - 1][0]
+        ttext = '\n' * (st + 1) + text[st + 1:]
+
+        m = re.search(patlist(pattern[s:]), ttext)
+        while m is not None and m.start(1) > st:
+            st = m.start(1)
+            matches[s].append(st)
+
+            ttext = '\n' * (st + 1) + text[st + 1:]
+            m = re.search(patlist(pattern[s:]), ttext)
+
+        if len(matches[s]) == 0:
+            return ([], '', -1)
+
+    final_match = [-1 for _ in range(len(pattern))]
+    for i, l in enumerate(matches[1: -1]):
+        if len(l) == 1:
+            final_match[i + 1] = l[0]
+
+    final_match = _regex_spread_consec(matches, final_match)
+
+    while final_match.count(-1) != 0:
+        i = final_match.index(-1)
+
+        for j in range(1, len(final_match) - 1):
+            if final_match[j - 1] != -1 and final_match[j] == -1 and final_match[j + 1] != -1:
+                final_match[j] = matches[j][0]
+
+        smallest = (final_match.count(-1), final_match)
+        for j in matches[i]:
+            fm = final_match.copy()
+            fm[i] = j
+
+            fm = _regex_spread_consec(matches, fm)
+            if fm.count(-1) < smallest[0]:
+                smallest = (fm.count(-1), fm)
+
+        final_match = smallest[1]
+
+    return _compress_match(text, final_match)
 
 
 @pytest.mark.parametrize("inputs,results", [
@@ -56,6 +133,88 @@ def test_fuzzy_match(inputs: Tuple[str, str], results: Tuple[List[str], str], be
     assert result == results
 
 
+# Outputs of the regex matcher fuzzy_match replaced, on random pairs
+@pytest.mark.parametrize("pattern,text,match,score", [
+    ('bccba', 'ccacbaaabaacabcccbcacccbaccab', (['bcc', 'ba'], 'bcccbcacccba', 13), 0.6831609195402298),
+    ('ebc', 'aedea debbcebb ddadeabb', (['eb', 'c'], 'ebbc', 7), 0.5257246376811594),
+    ('bcabc', 'abccbccabbbccbcbbbc', (['b', 'cab', 'c'], 'bccbccabbbc', 1), 0.4983732057416268),
+    ('ba', 'cdcc eeee eedc bdec eac ', (['b', 'a'], 'bdec ea', 15), 0.14375),
+    ('aa', ' aceb aebcbbad aaccbb a', (['aa'], 'aa', 15), 0.8630434782608696),
+    ('abbb', 'ccabbccabaaccbaabaccbb', (['abb', 'b'], 'abbccab', 2), 0.6238636363636364),
+    ('da', 'b ddeaeeadeeba dcaeaecc cc', (['d', 'a'], 'ddea', 2), 0.19807692307692307),
+    ('ab', 'cbccbbcbbaabcbcbccca', (['ab'], 'ab', 10), 0.865),
+    ('acebe', 'bdaa  abcdb   cdbecabe', (['a', 'c', 'e', 'be'], 'aa  abcdb   cdbecabe', 2), 0.2895454545454545),
+    ('ca', 'ddd cbaced', (['c', 'a'], 'cba', 4), 0.2783333333333333),
+    ('cdbdb', 'ebecaaa dcbccacdcbd', (['c', 'd', 'b', 'd', 'b'], 'caaa dcbccacdcb', 3), 0.09403508771929825),
+    ('bcbbc', 'aaabacbabaaabcc', (['b', 'cb', 'bc'], 'bacbabaaabc', 3), 0.5076363636363637),
+    ('cb', 'cbedecd bccbdabbccbdcc', (['cb'], 'cb', 0), 0.8636363636363635),
+    ('ddece', 'b eacc eabbaddcbceeac  edba', (['dd', 'e', 'c', 'e'], 'ddcbceeac  e', 12), 0.285),
+    ('bc', 'acccbcccaacbabac\nca\na\nbb', (['bc'], 'bc', 4), 0.8625),
+    ('aba', '\ncacbac', (['a', 'ba'], 'acba', 2), 0.5654761904761905),
+    ('eab', 'eaec ebbcda', (['ea', 'b'], 'eaec eb', 0), 0.49696969696969695),
+    ('bdb', 'baeb dce d ee beab ', (['b', 'd', 'b'], 'baeb dce d ee b', 0), 0.1256140350877193),
+    ('abca', 'bababbbacabbbcb', (['ab', 'ca'], 'ababbbaca', 1), 0.6227777777777778),
+    ('abcb', 'bbaabccbaccccacbacbaaaa', (['abc', 'b'], 'abccb', 3), 0.6563043478260869),
+    ('caa', ' ddbecacecedea d ', (['ca', 'a'], 'cacecedea', 5), 0.46405228758169936),
+    ('ca', 'acaaba', (['ca'], 'ca', 1), 0.8999999999999999),
+    ('abcc', '\nb\naabbca\naabbbaaca\nbaccbbcbc', (['a', 'bc', 'c'], 'accbbcbc', 21), 0.3581896551724138),
+    ('cc', '\n\n\nacabcaaa\n\n\ncb\n', (['c', 'c'], 'cabc', 4), 0.2102941176470588),
+    ('bbaa', 'acaacaacabcacabbcaababac', (['bb', 'aa'], 'bbcaa', 14), 0.655625),
+    ('bacc', 'abcababcac', (['ba', 'c', 'c'], 'babcac', 4), 0.4116666666666666),
+    ('cd', 'dbbecdb', (['cd'], 'cd', 4), 0.8928571428571428),
+    ('bcbc', 'bbacbbcbcbccbcaca', (['bcbc'], 'bcbc', 5), 0.9426470588235294),
+    ('db', 'eadeadecbb dbbebecececba ede a', (['db'], 'db', 11), 0.86),
+    ('cb', '\nac\nbcab\n\nc\n\na\n', (['c', 'b'], 'cab', 5), 0.2633333333333333),
+    ('cb', '  dbd ca badaeeba', (['c', 'b'], 'ca b', 6), 0.2102941176470588),
+    ('aa', 'bacaaaababcaaaaaaababccbccacaa', (['aa'], 'aa', 3), 0.86),
+    ('abca', 'ceecabecb eab aa a dda eab ', (['ab', 'c', 'a'], 'abecb ea', 4), 0.3597222222222222),
+    ('cc', 'abbcbcababbccccacbc', (['cc'], 'cc', 11), 0.8657894736842104),
+    ('abb', 'caccaccaaaacbcaabbcacbc', (['abb'], 'abb', 15), 0.9130434782608695),
+    ('cc', 'aabbccccababbccacabcaccacaabc', (['cc'], 'cc', 4), 0.8603448275862069),
+    ('ca', 'acaccbabaccaabbbbccbbcab', (['ca'], 'ca', 1), 0.8625),
+    ('bcc', 'c aca dcd b deceddcacbcaba', (['b', 'c', 'c'], 'b deceddc', 10), 0.11239316239316237),
+    ('\nbc', '\ncbaaabcac\n', (['\n', 'bc'], '\ncbaaabc', 0), 0.49356060606060603),
+    ('dacec', 'ddcabdb e ddd cebddb d cb ', (['d', 'a', 'ce', 'c'], 'ddcabdb e ddd cebddb d c', 0), 0.284551282051282),
+    ('ac', 'accbaaaaabbcaca', (['ac'], 'ac', 0), 0.87),
+])
+def test_fuzzy_match_regex(pattern: str, text: str, match: Tuple[List[str], str, int], score: float):
+    # Correctness
+    assert fuzzy_match(pattern, text) == match
+    assert fuzzy_score(pattern, text) == pytest.approx(score)
+
+
 def test_fuzzy_score(benchmark: BenchmarkFixture):
     # Benchmarking
     benchmark(fuzzy_score, 'ANime', 'A Nightmare on Elm Street')
+
+
+@pytest.mark.parametrize('alphabet', ['abcde ', 'abc', 'ab\n', 'a\nb\nc ', '.*(a\n', 'a\u00e9\u4e2d '])
+def test_fuzzy_match_random(alphabet: str):
+    rng = Random(alphabet)
+
+    # Correctness, against the regex matcher
+    for _ in range(500):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 40)))
+        pattern = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 7)))
+
+        expected = _regex_fuzzy_match(pattern, text)
+        assert fuzzy_match(pattern, text) == expected
+        assert fuzzy_score(pattern, text) == _map_to_norm(len(expected[1]), len(expected[0]), len(pattern), len(text))
+
+
+def test_fuzzy_match_long(benchmark: BenchmarkFixture):
+    text = 'The quick brown fox jumps over the lazy dog ' * 200
+
+    # Benchmarking
+    result = benchmark(fuzzy_match, 'quick lazy dog', text)
+
+    # Correctness
+    assert result == (['quick ', 'lazy dog'], 'quick brown fox jumps over the lazy dog', 4)
+
+
+def test_fuzzy_match_repeats(benchmark: BenchmarkFixture):
+    # Benchmarking, every character has as many candidates as the text allows
+    result = benchmark(fuzzy_match, 'a' * 60, 'a' * 100000)
+
+    # Correctness
+    assert result == (['a' * 60], 'a' * 60, 0)
@@ -1,12 +1,16 @@
 import string
+from functools import reduce
 from itertools import combinations, permutations
-from random import choice, randint, seed
+from random import Random, choice, randint, seed
 from typing import List
 
+import numpy as np
 from pytest import raises
 from pytest_benchmark.fixture import BenchmarkFixture
 
-from pymatching import HammingMetric, hamming_distance, hamming_ratio
+from pymatching import (HammingIndex, HammingMetric, HammingRatio,
+                        hamming_cdist, hamming_distance, hamming_ratio,
+                        hamming_within, pack_bits)
 
 from .util import random_word
 
@@ -83,3 +87,144 @@ def test_hamming_metric():
         # Triangle Inequality
         for x, y, z in permutations(test_set, 3):
             assert metric(x, y) + metric(y, z) >= metric(x, z)
+
+
+def test_hamming_distance_arrays():
+    seed('hamming_arrays')
+    a = random_word(200, 200)
+    b = ''.join(x if randint(0, 3) else '?' for x in a)
+
+    # Correctness, against comparing element by element
+    expected = sum(x != y for x, y in zip(a, b))
+    assert hamming_distance(a, b) == expected
+    assert hamming_distance(a.encode(), b.encode()) == expected
+    assert hamming_distance(np.array(list(a)), list(b)) == expected
+    assert HammingMetric()(a, b) == expected and HammingRatio().ratio(a, b) == 1 - expected / 200
+
+    # Sequences of different types only compare as elements
+    assert hamming_distance('a' * 100, b'a' * 100) == 100
+    assert hamming_distance(np.array(list('abc')), 'abc') == 0
+
+
+def test_hamming_packed():
+    rng = Random('hamming_packed')
+    hashes = [rng.getrandbits(64) for _ in range(500)]
+    bits = np.array([[rng.random() < .5 for _ in range(100)] for _ in range(50)])
+
+    # Correctness, against counting the bits of every xor
+    expected = [[bin(x ^ y).count('1') for y in hashes] for x in hashes[:10]]
+    assert hamming_cdist(hashes[:10], hashes).tolist() == expected
+    assert hamming_cdist(np.array(hashes[:10], dtype=np.uint64), pack_bits(hashes)).tolist() == expected
+    assert np.array_equal(hamming_cdist(bits, bits), (bits[:, None] != bits[None]).sum(axis=2))
+
+    # Int codes of either side are packed to the same length
+    assert hamming_cdist([1, 2], [1, 2 ** 70]).tolist() == [[0, 2], [2, 2]]
+    assert hamming_cdist(np.array([1, 2]), [3, 2 ** 70]).tolist() == [[1, 2], [1, 2]]
+    assert hamming_cdist([1], [3], n_bits=128).tolist() == [[1]]
+
+    within = sorted((j, d) for j, d in enumerate(expected[0]) if d <= 24)
+    assert hamming_within(hashes[0], pack_bits(hashes), 24) == sorted(within, key=lambda x: (x[1], x[0]))
+    assert hamming_within(bits[7], bits, 0) == [(7, 0)]
+    assert hamming_within(b'\x0f\x00', [b'\x00\x00', b'\xff\x00', b'\x0f\x01'], 1) == [(2, 1)]
+
+    # Errors
+    with raises(ValueError):
+        pack_bits([b'\x00', b'\x00\x00'])
+
+    with raises(ValueError):
+        hamming_within(bits[0][:64], bits, 3)
+
+
+def test_hamming_within_benchmark(benchmark: BenchmarkFixture):
+    rng = Random('hamming_within_benchmark')
+    corpus = pack_bits([rng.getrandbits(256) for _ in range(1000000)], 256)
+
+    # Benchmarking
+    result = benchmark(hamming_within, corpus[0], corpus, 100)
+
+    assert result[0] == (0, 0)
+
+
+def _near_duplicates(n: int, n_bits: int, seed: str) -> List[int]:
+    rng = Random(seed)
+
+    # Clusters of codes a few flipped bits apart
+    return [reduce(lambda x, y: x ^ y, (1 << rng.randrange(n_bits) for _ in range(rng.randint(0, 6))), base)
+            for base in (rng.getrandbits(n_bits) for _ in range(n // 10)) for _ in range(10)]
+
+
+def test_hamming_index():
+    codes = _near_duplicates(2000, 64, 'hamming_index')
+    index = HammingIndex(64, codes[:1000])
+    for code in codes[1000:1100]:
+        index.add(code)
+    index.extend(np.array(codes[1100:], dtype=np.uint64))
+
+    # Correctness, against a full scan
+    assert len(index) == 2000 and index.codes.tolist() == pack_bits(codes).tolist()
+
+    rng = Random('hamming_index_queries')
+    for query in codes[:20] + [rng.getrandbits(64) for _ in range(5)]:
+        distances = [bin(query ^ x).count('1') for x in codes]
+        ranked = sorted(enumerate(distances), key=lambda x: (x[1], x[0]))
+
+        for radius in [0, 3, 7, 12, 20]:
+            assert index.query(query, radius) == [(i, d) for i, d in ranked if d <= radius]
+
+        for k in [1, 5, 20]:
+            assert index.knn(query, k) == ranked[:k]
+
+    # Codes inserted between queries are found once the tables are sorted again
+    assert index.add(codes[0] ^ 1) == 2000 and (2000, 1) in index.query(codes[0], 1)
+    assert index.knn(codes[0] ^ 1, 1) == [(2000, 0)]
+
+    assert HammingIndex(64).knn(codes[0], 3) == []
+    assert HammingIndex(64).query(codes[0], 3) == []
+
+
+def test_hamming_index_bits():
+    bits = np.random.default_rng(0).random((300, 100)) < .5
+    index = HammingIndex(100, bits, m=5)
+
+    # Correctness, codes of bits with substrings across words
+    distances = (bits[:, None] != bits[None]).sum(axis=2)
+    assert index.query(bits[0], 40) == sorted(((i, d) for i, d in enumerate(distances[0].tolist()) if d <= 40),
+                                              key=lambda x: (x[1], x[0]))
+    assert [d for _, d in index.knn(bits[1], 10)] == sorted(distances[1].tolist())[:10]
+
+    # Errors
+    with raises(ValueError):
+        index.add(bits[0][:64])
+
+    with raises(ValueError):
+        index.add(b'\xff' * 16)
+
+    with raises(ValueError):
+        index.query(bits[0], -1)
+
+    with raises(ValueError):
+        HammingIndex(64, m=65)
+
+
+
+def test_hamming_index_long_substrings():
+    codes = np.random.default_rng(0).integers(0, 2 ** 63, 100000, dtype=np.uint64)
+    distances = hamming_cdist(codes[:1], codes)[0]
+    ranked = sorted(enumerate(distances.tolist()), key=lambda x: (x[1], x[0]))
+
+    # Correctness, random codes are too far apart to enumerate their neighbours
+    for m in [1, 2]:
+        index = HammingIndex(64, codes, m=m)
+
+        assert index.knn(codes[0], 5) == ranked[:5]
+        assert index.query(codes[0], 20) == [(i, d) for i, d in ranked if d <= 20]
+
+
+def test_hamming_index_benchmark(benchmark: BenchmarkFixture):
+    codes = _near_duplicates(200000, 64, 'hamming_index_benchmark')
+    index = HammingIndex(64, codes)
+
+    # Benchmarking
+    result = benchmark(index.query, codes[0], 6)
+
+    assert result[0] == (0, 0)
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+import pymatching
+
+
+def _run(code: str) -> str:
+    return subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE, text=True).stdout
+
+
+def test_import_lazy():
+    # Correctness, heavy dependencies wait for first use
+    loaded = _run("import sys, pymatching; print(sorted(m for m in ('numba', 'spacy') if m in sys.modules))")
+    assert loaded.strip() == '[]'
+
+    loaded = _run("import sys, pymatching; pymatching.levenshtein_distance; print('numba' in sys.modules, 'spacy' in sys.modules)")
+    assert loaded.split() == ['True', 'False']
+
+    assert set(pymatching.__all__) <= set(dir(pymatching))
+
+    with pytest.raises(AttributeError):
+        pymatching.levenshtein_distancee
+
+
+@pytest.mark.parametrize('code', ['import pymatching', 'from pymatching import levenshtein_distance'])
+def test_import_benchmark(code: str, benchmark: BenchmarkFixture):
+    # Benchmarking, a fresh interpreter per round
+    benchmark.pedantic(_run, args=(code,), rounds=5)
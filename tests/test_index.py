@@ -0,0 +1,95 @@
+from random import seed
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from pymatching import BKTree, HammingMetric, LevenshteinMetric, VPTree
+
+from .util import random_word
+
+
+def _scan(metric, words, x, radius):
+    return sorted(((w, metric(x, w)) for w in words if metric(x, w) <= radius), key=lambda x: x[1])
+
+
+@pytest.mark.parametrize('tree,metric', [
+    (BKTree, LevenshteinMetric()),
+    (VPTree, LevenshteinMetric()),
+    (VPTree, LevenshteinMetric() * .5)
+])
+def test_range_query(tree, metric):
+    seed('range_query')
+    words = list(set(random_word(3, 8) for _ in range(500)))
+
+    # Bulk and incremental construction
+    index = tree(metric, words[:250])
+    for w in words[250:]:
+        index.add(w)
+
+    assert len(index) == len(words)
+
+    # Correctness, against a linear scan
+    for x in [random_word(3, 8) for _ in range(20)]:
+        for radius in [0, .5, 1, 1.5, 2, 3]:
+            result = index.range_query(x, radius)
+            expected = _scan(metric, words, x, radius)
+
+            assert sorted(result) == sorted(expected)
+            assert [d for _, d in result] == [d for _, d in expected]
+
+
+
+def test_vp_tree_ties():
+    metric = LevenshteinMetric()
+
+    # Correctness, duplicates all at mu are split rather than chained
+    index = VPTree(metric, ['ab'] * 3000 + ['abc'])
+
+    assert len(index) == 3001
+    assert len(index.range_query('ab', 0)) == 3000
+    assert index.knn('abc', 2) == [('abc', 0), ('ab', 1)]
+
+@pytest.mark.parametrize('tree', [BKTree, VPTree])
+def test_knn(tree):
+    metric = LevenshteinMetric()
+
+    seed('knn')
+    words = list(set(random_word(3, 8) for _ in range(500)))
+    index = tree(metric, words)
+
+    # Correctness, against a linear scan
+    for x in [random_word(3, 8) for _ in range(20)]:
+        result = index.knn(x, 5)
+        expected = sorted(metric(x, w) for w in words)[:5]
+
+        assert [d for _, d in result] == expected
+        assert all(metric(x, w) == d for w, d in result)
+
+    assert index.knn('Halloween', 0) == []
+    assert tree(metric).knn('Halloween', 3) == []
+
+
+def test_bk_tree(benchmark: BenchmarkFixture):
+    seed('bk_tree')
+    words = [random_word(15, 15) for _ in range(2000)]
+    index = BKTree(HammingMetric(), words)
+
+    # Benchmarking
+    result = benchmark(index.range_query, words[0], 3)
+
+    # Correctness
+    assert (words[0], 0) in result
+    assert words[0] in index
+    assert not index.add(words[0])
+
+
+def test_vp_tree(benchmark: BenchmarkFixture):
+    seed('vp_tree')
+    words = [random_word(5, 15) for _ in range(2000)]
+    index = VPTree(LevenshteinMetric(), words)
+
+    # Benchmarking
+    result = benchmark(index.knn, words[0], 3)
+
+    # Correctness
+    assert result[0] == (words[0], 0)
@@ -1,13 +1,16 @@
 import string
 from itertools import combinations, permutations
-from random import choice, seed
+from random import choice, randint, seed
 from typing import List
 
+import pytest
+from pytest import raises
 from pytest_benchmark.fixture import BenchmarkFixture
 
 from pymatching import LevenshteinMetric
 from pymatching import levenshtein_distance as ld
 from pymatching import levenshtein_ratio as lr
+from pymatching.levenshtein import _levenshtein_dp
 
 from .util import random_word
 
@@ -18,6 +21,73 @@ def test_levenshtein_distance(benchmark: BenchmarkFixture):
 
     # Correctness
     assert result == 21
+    assert isinstance(result, int)
+
+    assert ld('', '') == 0
+    assert ld('', 'abc') == 3
+    assert ld([1, 2, 3], [1, 3]) == 1
+
+
+def test_levenshtein_distance_blocks():
+    seed('levenshtein_distance_blocks')
+
+    # Covers single word and multi word patterns
+    for _ in range(200):
+        a = random_word(150)
+        b = random_word(150)
+
+        assert ld(a, b) == _levenshtein_dp(a, b)
+
+
+def test_levenshtein_distance_bounded(benchmark: BenchmarkFixture):
+    seed('levenshtein_distance_bounded')
+    a = random_word(500, 500)
+    b = a[:100] + a[101:300] + 'x' + a[300:]
+
+    # Benchmarking
+    result = benchmark(ld, a, b, 4)
+
+    # Correctness
+    assert result == 2
+    assert ld('A Nightmare on Elm Street', 'Friday the 13th', 5) == 6
+    assert ld('A Nightmare on Elm Street', 'Friday the 13th', 21) == 21
+
+    for _ in range(200):
+        a = random_word(100)
+        b = random_word(100)
+        k = randint(0, 30)
+        distance = _levenshtein_dp(a, b)
+
+        assert ld(a, b, k) == min(distance, k + 1)
+
+    # Errors
+    with raises(ValueError):
+        ld('Halloween', 'Black Christmas', -1)
+
+
+@pytest.mark.benchmark(group='levenshtein_kernel')
+@pytest.mark.parametrize('length', [16, 64, 256])
+def test_levenshtein_bitparallel_benchmark(length: int, benchmark: BenchmarkFixture):
+    seed(length)
+    a = random_word(length, length)
+    b = random_word(length, length)
+
+    # Benchmarking
+    result = benchmark(ld, a, b)
+
+    # Correctness
+    assert result == _levenshtein_dp(a, b)
+
+
+@pytest.mark.benchmark(group='levenshtein_kernel')
+@pytest.mark.parametrize('length', [16, 64, 256])
+def test_levenshtein_dp_benchmark(length: int, benchmark: BenchmarkFixture):
+    seed(length)
+    a = random_word(length, length)
+    b = random_word(length, length)
+
+    # Benchmarking
+    benchmark(_levenshtein_dp, a, b)
 
 
 def test_levenshtein_ratio(benchmark: BenchmarkFixture):
@@ -51,6 +121,11 @@ def test_levenshtein_ratio(benchmark: BenchmarkFixture):
         assert 0 <= results[i][0] <= 1
         assert results[i][-1] == distances[i][-1]
 
+    # Cutoff
+    assert lr('Friday the 13th', 'Friday the 69th', .8) == lr('Friday the 13th', 'Friday the 69th')
+    assert lr('Friday the 13th', 'Friday the 69th', .9) == 0
+    assert lr('abcde', 'abcdf', .8) == .8
+
 
 def test_levenshtein_metric():
     metric = LevenshteinMetric()
@@ -74,3 +149,8 @@ def test_levenshtein_metric():
         # Triangle Inequality
         for x, y, z in permutations(test_set, 3):
             assert metric(x, y) + metric(y, z) >= metric(x, z)
+
+    # Bounded
+    metric = LevenshteinMetric(max_distance=3)
+    assert metric('Halloween', 'Black Christmas') == 4
+    assert metric('Halloween', 'Black Christmas', max_distance=20) == ld('Halloween', 'Black Christmas')
@@ -0,0 +1,108 @@
+from functools import partial
+from itertools import combinations
+from random import Random
+
+import numpy as np
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from pymatching import MinHash, MinHashLSH, jaccard_index
+from pymatching.minhash import estimate_jaccard, optimal_bands
+
+from .util import random_records
+
+# Pairs of near duplicates among unrelated sets
+_records = partial(random_records, vocabulary=5000, sizes=(30, 30), copies=1, edits=(1, 1))
+
+
+def test_minhash():
+    # Correctness, signatures only depend on the elements and the seed
+    signature = MinHash(64).signature(['night', 'mare', 'elm'])
+    assert signature.shape == (64,)
+    assert np.array_equal(signature, MinHash(64).signature(['elm', 'night', 'mare', 'elm']))
+    assert not np.array_equal(signature, MinHash(64, seed=2).signature(['night', 'mare', 'elm']))
+
+    # Tokens of different types hash apart, even when written the same
+    assert not np.array_equal(MinHash(64).signature([1]), MinHash(64).signature(['1']))
+
+    rng = Random('minhash')
+    minhash = MinHash(256)
+    for _ in range(20):
+        a = set(rng.sample(range(1000), 100))
+        b = set(rng.sample(sorted(a), 50)) | set(rng.sample(range(1000, 2000), 50))
+
+        estimate = estimate_jaccard(minhash.signature(a), minhash.signature(b))
+        assert abs(estimate - jaccard_index(a, b)) < .1
+
+    assert MinHash(8).signatures([]).shape == (0, 8)
+
+    with pytest.raises(ValueError):
+        MinHash(0)
+
+
+def test_optimal_bands():
+    # Correctness, higher thresholds need longer bands
+    bands, rows = optimal_bands(.5, 128)
+    assert bands * rows <= 128
+    assert optimal_bands(.9, 128)[1] > rows
+
+    with pytest.raises(ValueError):
+        optimal_bands(0, 128)
+
+
+def test_minhash_lsh():
+    records = _records(400, 'lsh')
+    index = MinHashLSH(threshold=.7)
+    assert index.extend(records) == list(range(400))
+    assert index.add([]) == 400
+
+    # Correctness, verified pairs are exact and near duplicates are found
+    expected = {(i, j) for i, j in combinations(range(400), 2) if jaccard_index(records[i], records[j]) >= .7}
+    result = index.self_join(verify=True)
+
+    assert {(i, j) for i, j, _ in result} <= expected
+    assert len(result) >= .95 * len(expected)
+    assert all(score == jaccard_index(records[i], records[j]) for i, j, score in result)
+
+    assert index.query(records[10], verify=True)[:2] == [(10, 1), (11, jaccard_index(records[10], records[11]))]
+    assert index.query([]) == []
+    assert all(score >= .5 for _, score in index.query(records[3], threshold=.5))
+
+    with pytest.raises(ValueError):
+        MinHashLSH(store_sets=False).self_join(verify=True)
+
+
+def test_minhash_lsh_save(tmp_path):
+    records = _records(100, 'save')
+    index = MinHashLSH(threshold=.6, num_perm=64)
+    index.extend(records)
+
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+
+    # Correctness
+    loaded = MinHashLSH.load(path)
+    assert (loaded.bands, loaded.rows, loaded.threshold) == (index.bands, index.rows, index.threshold)
+    assert np.array_equal(loaded.signatures, index.signatures)
+    assert loaded.self_join() == index.self_join()
+
+    loaded = MinHashLSH.load(path, records)
+    assert loaded.self_join(verify=True) == index.self_join(verify=True)
+
+    with pytest.raises(ValueError):
+        MinHashLSH.load(path, records[:10])
+
+
+def test_minhash_benchmark(benchmark: BenchmarkFixture):
+    records = _records(10000, 'benchmark')
+
+    def self_join():
+        index = MinHashLSH(threshold=.8)
+        index.extend(records)
+
+        return index.self_join()
+
+    # Benchmarking
+    result = benchmark.pedantic(self_join, rounds=3)
+
+    assert len(result) >= 4500
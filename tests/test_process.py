@@ -0,0 +1,237 @@
+from random import Random, seed
+
+import numpy as np
+import pytest
+from pytest import raises
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from pymatching import (FuzzyMatchRatio, FuzzySession, HammingMetric,
+                        LevenshteinMetric, LevenshteinRatio, OverlapRatio,
+                        cdist, cpdist, extract, extract_one, fuzzy_score,
+                        fuzzy_score_many, hamming_ratio, jaccard_index,
+                        levenshtein_distance, levenshtein_ratio,
+                        sorensen_dice_coefficient)
+
+from .util import random_word
+
+
+@pytest.mark.parametrize('scorer', [
+    levenshtein_distance,
+    LevenshteinRatio(),
+    LevenshteinMetric(max_distance=3),
+    jaccard_index,
+    sorensen_dice_coefficient,
+    OverlapRatio()
+])
+def test_cdist(scorer):
+    seed('cdist')
+    queries = [random_word(10) for _ in range(10)]
+    choices = [random_word(10) for _ in range(30)]
+
+    score = scorer.ratio if hasattr(scorer, 'ratio') else scorer
+
+    # Correctness
+    result = cdist(queries, choices, scorer=scorer)
+    assert result.shape == (10, 30)
+    assert np.allclose(result, [[score(q, c) for c in choices] for q in queries])
+
+    result = cpdist(queries, choices[:10], scorer=scorer)
+    assert np.allclose(result, [score(q, c) for q, c in zip(queries, choices)])
+
+
+def test_cdist_sequences():
+    queries = [['friday', 'the', '13th'], ['halloween']]
+    choices = [['friday', 'the', '13th', 'part', '2'], ['halloween', 'ii']]
+
+    # Correctness
+    assert cdist(queries, choices, scorer=levenshtein_distance).tolist() == [[2, 3], [5, 1]]
+    assert cdist(queries, choices, scorer=jaccard_index).tolist() == [[.6, 0], [0, .5]]
+
+
+def test_cdist_equal_length():
+    words = ['Friday the 13th', 'Friday the 69th', 'Friday the 31st']
+
+    # Correctness
+    assert cdist(words, words, scorer=HammingMetric()).tolist() == [[0, 2, 4], [2, 0, 4], [4, 4, 0]]
+    assert np.allclose(cpdist(words, words[::-1], scorer=hamming_ratio), [11 / 15, 1, 11 / 15])
+
+    # Errors
+    with raises(ValueError):
+        cdist(words, ['A Nightmare on Elm Street'], scorer=HammingMetric())
+
+    with raises(ValueError):
+        cpdist(words, words[:2])
+
+
+def test_cdist_fuzzy():
+    queries = ['ANime', 'God', 'Q']
+    choices = ['A Nightmare on Elm Street', 'The Godfather', 'The Shining']
+
+    # Correctness
+    expected = [[fuzzy_score(q, c) for c in choices] for q in queries]
+    assert np.allclose(cdist(queries, choices, scorer=FuzzyMatchRatio()), expected)
+    assert np.allclose(cpdist(queries, choices, scorer=fuzzy_score), [expected[i][i] for i in range(3)])
+
+
+def test_cdist_fallback():
+    queries = ['ANime', 'God', 'Q']
+    choices = ['A Nightmare on Elm Street', 'The Godfather', 'The Shining']
+    scorer = LevenshteinRatio() * 2
+
+    # Correctness
+    expected = [[scorer.ratio(q, c) for c in choices] for q in queries]
+    assert np.allclose(cdist(queries, choices, scorer=scorer), expected)
+    assert np.allclose(cdist(queries, choices, scorer=scorer, workers=2), expected)
+
+
+def test_cdist_benchmark(benchmark: BenchmarkFixture):
+    seed('cdist_benchmark')
+    choices = [random_word(5, 20) for _ in range(10000)]
+
+    # Benchmarking
+    result = benchmark(cdist, ['A Nightmare on Elm Street'], choices)
+
+    assert result.shape == (1, 10000)
+
+
+def test_extract(benchmark: BenchmarkFixture):
+    choices = ['Friday the 13th', 'Friday the 31st', 'Halloween', 'Black Christmas', 'Friday the 13th']
+
+    # Benchmarking
+    result = benchmark(extract, 'Friday the 69th', choices, limit=2)
+
+    # Correctness
+    ratio = levenshtein_ratio('Friday the 69th', 'Friday the 13th')
+    assert result == [('Friday the 13th', ratio, 0), ('Friday the 13th', ratio, 4)]
+
+    result = extract('Friday the 69th', choices, limit=None, score_cutoff=.5)
+    assert [key for _, _, key in result] == [0, 4, 1]
+
+    result = extract('Friday the 69th', choices, scorer=LevenshteinMetric(), limit=3)
+    assert result == [('Friday the 13th', 2, 0), ('Friday the 13th', 2, 4), ('Friday the 31st', 4, 1)]
+
+    result = extract('Friday the 69th', choices, scorer=levenshtein_distance, score_cutoff=3)
+    assert [key for _, _, key in result] == [0, 4]
+
+    # Composite ratios
+    scorer = LevenshteinRatio() * 2
+    result = extract('Halloween', choices, scorer=scorer, limit=1)
+    assert result == [('Halloween', 2, 2)]
+
+    # Unhashable scorers
+    class Scorer:
+        __hash__ = None
+
+        def __call__(self, a, b):
+            return levenshtein_ratio(a, b)
+
+    assert extract('Halloween', choices, scorer=Scorer(), limit=1) == [('Halloween', 1, 2)]
+
+    # Errors
+    with raises(ValueError):
+        extract('Halloween', choices, limit=0)
+
+
+def test_extract_one():
+    choices = {'f13': 'Friday the 13th', 'hw': 'Halloween', 'bc': 'Black Christmas'}
+
+    # Correctness
+    assert extract_one('halloween', choices) == ('Halloween', levenshtein_ratio('halloween', 'Halloween'), 'hw')
+    assert extract_one('halloween', choices, scorer=jaccard_index, score_cutoff=.9) is None
+    assert extract_one('halloween', {}) is None
+
+
+def test_extract_matches_sort():
+    seed('extract')
+    choices = [random_word(5, 15) for _ in range(500)]
+
+    # Correctness, against a full sort
+    for query in [random_word(5, 15) for _ in range(10)]:
+        scores = [(-levenshtein_ratio(query, c), i) for i, c in enumerate(choices)]
+        expected = [i for _, i in sorted(scores)[:10]]
+
+        assert [key for _, _, key in extract(query, choices, limit=10)] == expected
+
+
+def test_fuzzy_score_many():
+    seed('fuzzy_score_many')
+    candidates = [random_word(5, 30) for _ in range(1000)] + ['', 'A Nightmare on Elm Street']
+
+    # Correctness
+    for pattern in ['ANime', 'ab', 'x', '']:
+        expected = [fuzzy_score(pattern, c) for c in candidates]
+        assert np.allclose(fuzzy_score_many(pattern, candidates), expected)
+        assert np.allclose(fuzzy_score_many(pattern, candidates, score_cutoff=.5, workers=1),
+                           [x if x >= .5 else 0 for x in expected])
+
+    result = fuzzy_score_many('ANime', candidates, limit=3)
+    assert result[0] == ('A Nightmare on Elm Street', fuzzy_score('ANime', 'A Nightmare on Elm Street'), 1001)
+    assert [score for _, score, _ in result] == sorted((score for _, score, _ in result), reverse=True)
+
+    assert fuzzy_score_many('Q', ['The Living Daylights'], limit=5) == []
+    assert fuzzy_score_many('Q', []).shape == (0,)
+
+
+def test_fuzzy_score_many_benchmark(benchmark: BenchmarkFixture):
+    seed('fuzzy_score_many_benchmark')
+    candidates = [random_word(5, 30) for _ in range(100000)]
+
+    # Benchmarking
+    result = benchmark(fuzzy_score_many, 'anim', candidates, limit=10)
+
+    assert len(result) == 10
+
+
+def test_fuzzy_session():
+    seed('fuzzy_session')
+    candidates = [random_word(5, 30) for _ in range(1000)] + ['A Nightmare on Elm Street']
+    session = FuzzySession(candidates)
+
+    # Correctness, every keystroke matches scoring from scratch
+    for query in ['a', 'an', 'anI', 'anIm', 'anI', 'an', 'anx', '', 'ANime']:
+        session.set_query(query)
+
+        assert session.query == query
+        assert np.allclose(session.scores(), [fuzzy_score(query, c) for c in candidates])
+        assert session.top(5) == fuzzy_score_many(query, candidates, limit=5)
+
+    session.backspace(3)
+    assert session.query == 'AN'
+    assert len(session) == np.count_nonzero(fuzzy_score_many('AN', candidates))
+
+    session.backspace(10)
+    assert session.query == '' and len(session) == len(candidates)
+
+
+def test_fuzzy_session_lines():
+    rng = Random('fuzzy_session_lines')
+    candidates = [''.join(rng.choice('ab\n') for _ in range(rng.randint(0, 12))) for _ in range(2000)]
+    session = FuzzySession(candidates)
+
+    # Correctness, gaps never cross a newline, as in fuzzy_score
+    for query in ['a', 'ab', 'aba', 'ab', 'b', 'bba', 'bbab', 'b', 'ba\n', 'ba\nb']:
+        session.set_query(query)
+        matched = {i for i, c in enumerate(candidates) if fuzzy_score(query, c) > 0}
+
+        if '\n' in query:
+            assert matched <= set(session.survivors.tolist())
+        else:
+            assert set(session.survivors.tolist()) == matched
+
+
+def test_fuzzy_session_benchmark(benchmark: BenchmarkFixture):
+    seed('fuzzy_session_benchmark')
+    candidates = [random_word(5, 30) for _ in range(100000)]
+    session = FuzzySession(candidates, 'ani')
+
+    def keystroke():
+        session.type('m')
+        result = session.top(10)
+        session.backspace()
+
+        return result
+
+    # Benchmarking
+    result = benchmark(keystroke)
+
+    assert result == fuzzy_score_many('anim', candidates, limit=10)
@@ -0,0 +1,72 @@
+from random import seed
+
+import pytest
+from pytest import raises
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from pymatching import (QGramIndex, jaccard_index, levenshtein_distance,
+                        qgrams, sorensen_dice_coefficient)
+
+from .util import random_word
+
+
+def test_qgrams():
+    # Correctness
+    assert qgrams('elm', 2) == ['\0e', 'el', 'lm', 'm\0']
+    assert qgrams('elm', 2, pad=False) == ['el', 'lm']
+    assert qgrams('', 3) == ['\0\0\0', '\0\0\0'] and qgrams('ab', 3, pad=False) == []
+
+    with raises(ValueError):
+        qgrams('elm', 0)
+
+
+@pytest.mark.parametrize('q', [1, 2, 3])
+def test_qgram_search(q):
+    seed('qgram_search')
+    strings = [random_word(1, 12).lower() for _ in range(2000)] + ['', 'halloween']
+    index = QGramIndex(strings[:1000], q)
+    index.extend(strings[1000:])
+
+    # Correctness, against a full scan
+    for query in ['halloween', 'hallowen', 'ab', ''] + strings[:20]:
+        for k in range(4):
+            expected = sorted((s, levenshtein_distance(query, s), i) for i, s in enumerate(strings)
+                              if levenshtein_distance(query, s) <= k)
+
+            assert index.search(query, k) == sorted(expected, key=lambda x: (x[1], x[2]))
+
+
+@pytest.mark.parametrize('measure', [sorensen_dice_coefficient, jaccard_index])
+def test_qgram_similar(measure):
+    seed('qgram_similar')
+    strings = [random_word(1, 12).lower() for _ in range(1000)] + ['halloween']
+    index = QGramIndex(strings)
+
+    # Correctness, against a full scan
+    for query in ['halloween', 'hallowen', 'xq'] + strings[:20]:
+        scores = [(s, measure(qgrams(query), qgrams(s)), i) for i, s in enumerate(strings)]
+        expected = sorted((x for x in scores if x[1] >= .4), key=lambda x: (-x[1], x[2]))
+
+        assert index.similar(query, .4, measure) == expected
+
+    with raises(ValueError):
+        index.similar('halloween', 0)
+
+
+def test_qgram_errors():
+    with raises(ValueError):
+        QGramIndex(q=0)
+
+    with raises(ValueError):
+        QGramIndex(['elm']).search('elm', -1)
+
+
+def test_qgram_benchmark(benchmark: BenchmarkFixture):
+    seed('qgram_benchmark')
+    strings = [random_word(5, 20) for _ in range(100000)]
+    index = QGramIndex(strings)
+
+    # Benchmarking
+    result = benchmark(index.search, strings[0][:-1], 2)
+
+    assert result[0][2] == 0
@@ -0,0 +1,124 @@
+from random import seed
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from pymatching import (FuzzyMatchRatio, HammingRatio, JaccardRatio,
+                        LevenshteinRatio, OverlapRatio, SorensenDiceRatio,
+                        jaccard_index, levenshtein_ratio,
+                        sorensen_dice_coefficient)
+from pymatching.measures.ratio import (MaxRatio, MinRatio, ProductRatio,
+                                       WeightedSumRatio)
+
+from .util import random_word
+
+COMPOSITES = [
+    JaccardRatio() + SorensenDiceRatio() + OverlapRatio(),
+    (LevenshteinRatio() + JaccardRatio()) * 3 + 1,
+    LevenshteinRatio() * FuzzyMatchRatio() * OverlapRatio(),
+    WeightedSumRatio([(.5, JaccardRatio()), (.25, MinRatio([LevenshteinRatio(), FuzzyMatchRatio()]))]),
+    MaxRatio([JaccardRatio(), SorensenDiceRatio(), ProductRatio([LevenshteinRatio(), OverlapRatio()])]),
+    2 * HammingRatio() + JaccardRatio(),
+
+    # Negative weights swap the bounds of their terms
+    LevenshteinRatio() * -1,
+    WeightedSumRatio([(.5, JaccardRatio()), (-1, SorensenDiceRatio()), (.3, OverlapRatio())]) +
+    MaxRatio([SorensenDiceRatio(), OverlapRatio()]),
+    ProductRatio([JaccardRatio() * -2 + 1, LevenshteinRatio()]),
+]
+
+
+def test_ratio_operators():
+    # Correctness
+    composite = JaccardRatio() + SorensenDiceRatio()
+    assert composite.ratio('night', 'nigh') == jaccard_index('night', 'nigh') + \
+        sorensen_dice_coefficient('night', 'nigh')
+    assert (composite + LevenshteinRatio()).ratio_max() == 3
+
+    composite = MaxRatio([JaccardRatio(), LevenshteinRatio()])
+    assert composite.ratio('night', 'thing') == 1 > levenshtein_ratio('night', 'thing')
+
+
+@pytest.mark.parametrize('composite', COMPOSITES)
+def test_ratio_compile(composite):
+    seed('compile')
+    pairs = [(random_word(5, 5), random_word(5, 5)) for _ in range(200)] + [('Halloween', 'Hallowene')]
+
+    compiled = composite.compile()
+
+    # Correctness, identical to the uncompiled tree
+    assert compiled.ratio_min() == composite.ratio_min()
+    assert compiled.ratio_max() == composite.ratio_max()
+    assert compiled.compile() is compiled
+
+    for a, b in pairs:
+        assert compiled.ratio(a, b) == composite.ratio(a, b)
+
+
+def test_ratio_compile_shared():
+    # Correctness, set ratios share one set per value, code point ratios another
+    assert len(COMPOSITES[0].compile().preprocessors) == 1
+    assert len(COMPOSITES[2].compile().preprocessors) == 2
+    assert len(COMPOSITES[5].compile().preprocessors) == 1
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_ratio_compile_benchmark(compiled: bool, benchmark: BenchmarkFixture):
+    composite = COMPOSITES[0].compile() if compiled else COMPOSITES[0]
+
+    # Benchmarking
+    benchmark(composite.ratio, 'A Nightmare on Elm Street', 'The Dream on Oak Road')
+
+
+class _CountingRatio(LevenshteinRatio):
+    cost = 100
+
+    def __init__(self):
+        self.calls = 0
+
+    def ratio(self, a, b, score_cutoff=None):
+        self.calls += 1
+
+        return super().ratio(a, b, score_cutoff)
+
+
+@pytest.mark.parametrize('composite', COMPOSITES)
+def test_ratio_cutoff(composite):
+    seed('cutoff')
+    pairs = [(random_word(5, 5), random_word(5, 5)) for _ in range(200)] + [('Halloween', 'Hallowene')]
+
+    # Correctness, exact above the cutoff and at most the minimum below it
+    for a, b in pairs:
+        expected = composite.ratio(a, b)
+
+        for fraction in [0, .3, .6, .9]:
+            cutoff = composite.ratio_min() + fraction * (composite.ratio_max() - composite.ratio_min())
+            result = composite.ratio(a, b, score_cutoff=cutoff)
+
+            if expected >= cutoff:
+                assert result == expected
+            else:
+                assert result == composite.ratio_min() < cutoff
+
+            assert composite.compile().ratio(a, b, score_cutoff=cutoff) == result
+
+
+def test_ratio_cascade():
+    expensive = _CountingRatio()
+    composite = JaccardRatio() + expensive + OverlapRatio()
+
+    # Correctness, the expensive ratio only runs when the cheap ones leave room
+    assert composite.ratio('abc', 'xyz', score_cutoff=1.5) == 0
+    assert expensive.calls == 0
+
+    assert composite.ratio('abc', 'abc', score_cutoff=1.5) == 3
+    assert expensive.calls == 1
+
+    composite = MinRatio([expensive, JaccardRatio()])
+    assert composite.ratio('abc', 'xyz', score_cutoff=.5) == 0
+    assert expensive.calls == 1
+
+    # Measured costs replace declared ones
+    composite.calibrate([('abc', 'abd')] * 10)
+    assert expensive.cost < 100
+    assert composite.cost == expensive.cost + composite.similarities[1].cost
@@ -0,0 +1,58 @@
+from functools import partial
+from itertools import combinations
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from pymatching import (OverlapRatio, jaccard_index, overlap_coefficient,
+                        sorensen_dice_coefficient)
+from pymatching.setjoin import join, self_join
+
+from .util import random_records
+
+# Clusters of edited copies over a skewed vocabulary, so that every filter prunes something
+_records = partial(random_records, vocabulary=200, sizes=(1, 40), copies=3, edits=(0, 4), skewed=True)
+
+
+@pytest.mark.parametrize('measure', [jaccard_index, sorensen_dice_coefficient, overlap_coefficient])
+@pytest.mark.parametrize('threshold', [.3, .6, .8, 1])
+def test_self_join(measure, threshold):
+    records = _records(300, 'self_join') + [set(), {1}]
+
+    # Correctness, against every pair
+    expected = [(i, j, measure(records[i], records[j])) for i, j in combinations(range(len(records)), 2)
+                if records[i] and records[j] and measure(records[i], records[j]) >= threshold]
+
+    assert self_join(records, measure, threshold) == expected
+
+
+@pytest.mark.parametrize('measure', ['jaccard', 'dice', OverlapRatio()])
+def test_join(measure):
+    records = _records(200, 'join')
+    others = _records(100, 'join_others')
+    score = {'jaccard': jaccard_index, 'dice': sorensen_dice_coefficient}.get(measure, overlap_coefficient)
+
+    # Correctness, against every pair
+    expected = [(i, j, score(a, b)) for i, a in enumerate(records) for j, b in enumerate(others)
+                if score(a, b) >= .7]
+
+    assert join(records, others, measure, .7) == expected
+    assert join(['Halloween', 'Black Christmas'], ['Halloween II'], measure, .7) == [(0, 0, score('Halloween', 'Halloween II'))]
+    assert join([], others, measure) == []
+
+
+def test_self_join_errors():
+    with pytest.raises(ValueError):
+        self_join([{1}], 'levenshtein')
+
+    with pytest.raises(ValueError):
+        self_join([{1}], jaccard_index, 0)
+
+
+def test_self_join_benchmark(benchmark: BenchmarkFixture):
+    records = _records(20000, 'self_join_benchmark')
+
+    # Benchmarking
+    result = benchmark(self_join, records, jaccard_index, .8)
+
+    assert all(score >= .8 for _, _, score in result)
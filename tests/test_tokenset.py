@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from pymatching import (TokenSetCorpus, Vocabulary, jaccard_index,
+                        overlap_coefficient, sorensen_dice_coefficient)
+
+from .util import random_records
+
+
+def _records(n: int, seed: str):
+    # Lists, some repeating a token, so that sets drop duplicates
+    return [sorted(x) + ['token'] * (i % 3) for i, x in enumerate(random_records(n, seed))]
+
+
+def test_vocabulary():
+    vocabulary = Vocabulary(['night', 'mare'])
+
+    # Correctness
+    assert vocabulary.encode(['elm', 'night', 'elm']).tolist() == [0, 2]
+    assert vocabulary.encode(['mare', 'street', 'road'], add=False).tolist() == [-2, -1, 1]
+    assert vocabulary.decode([2, 0]) == ['elm', 'night']
+    assert len(vocabulary) == 3 and 'elm' in vocabulary and 'street' not in vocabulary
+    assert vocabulary.encode([]).dtype == np.int32
+
+
+@pytest.mark.parametrize('measure', [jaccard_index, sorensen_dice_coefficient, overlap_coefficient])
+def test_token_set_corpus(measure):
+    records = _records(200, 'token_set_corpus')
+    corpus = TokenSetCorpus(records[:150])
+    corpus.extend(records[150:])
+
+    # Correctness, against the functions on plain iterables
+    assert len(corpus) == 200 and corpus.sizes.tolist() == [len(set(x)) for x in records]
+    assert corpus[-1].tolist() == sorted(corpus[-1].tolist())
+
+    expected = [[measure(a, b) for b in records] for a in records]
+    assert corpus.pairwise(measure=measure).tolist() == expected
+    assert corpus.similarity(3, 7, measure) == expected[3][7]
+
+    query = records[0][:5] + ['unseen', 'tokens']
+    assert corpus.scores(query, measure).tolist() == [measure(query, x) for x in records]
+    assert 'unseen' not in corpus.vocabulary
+
+    other = TokenSetCorpus(records[:10], corpus.vocabulary)
+    assert corpus.pairwise(other, measure).tolist() == [row[:10] for row in expected]
+
+
+def test_token_set_corpus_errors():
+    corpus = TokenSetCorpus([[1, 2], []])
+
+    # Errors
+    assert np.isnan(corpus.similarity(1, 1))
+    assert np.isnan(corpus.similarity(0, 1, 'overlap'))
+
+    with pytest.raises(ValueError):
+        corpus.scores([1], 'levenshtein')
+
+    with pytest.raises(ValueError):
+        corpus.pairwise(TokenSetCorpus([[1]]))
+
+    with pytest.raises(IndexError):
+        corpus[2]
+
+
+def test_token_set_corpus_benchmark(benchmark: BenchmarkFixture):
+    records = _records(100000, 'token_set_corpus_benchmark')
+    corpus = TokenSetCorpus(records)
+
+    # Benchmarking
+    result = benchmark(corpus.scores, records[0], jaccard_index)
+
+    assert result[0] == 1
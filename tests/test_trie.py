@@ -0,0 +1,198 @@
+from random import randint, seed
+
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from pymatching import FrozenTrie, Trie, levenshtein_distance
+
+from .util import random_word
+
+
+def _trie(words):
+    trie = Trie('', ''.join)
+    for w in words:
+        trie.add(w)
+
+    return trie
+
+
+def test_search_within(benchmark: BenchmarkFixture):
+    seed('search_within')
+    words = list(set(random_word(3, 10) for _ in range(2000)))
+    trie = _trie(words)
+
+    # Benchmarking
+    benchmark(lambda: list(trie.search_within(words[0], 2)))
+
+    # Correctness, against a linear scan
+    for query in [random_word(3, 10) for _ in range(20)] + words[:5]:
+        for k in range(3):
+            expected = {(w, levenshtein_distance(query, w)) for w in words}
+            expected = {(w, d) for w, d in expected if d <= k}
+
+            assert set(trie.search_within(query, k)) == expected
+
+
+def test_search_within_prefix():
+    trie = _trie(['nightmare', 'night', 'nightly', 'halloween', 'knight'])
+
+    # Correctness
+    assert sorted(trie.search_within('nighy', 1)) == [('night', 1)]
+    assert sorted(trie.search_within('nighy', 1, prefix=True)) == [('night', 1), ('nightly', 1), ('nightmare', 1)]
+    assert sorted(trie.search_within('nite', 2, prefix=True)) == [('night', 2), ('nightly', 2), ('nightmare', 2)]
+    assert list(trie.search_within('xyz', 1, prefix=True)) == []
+
+
+def test_freeze(benchmark: BenchmarkFixture):
+    seed('freeze')
+    words = list(set(random_word(1, 8) for _ in range(2000)))
+    trie = _trie(words)
+    frozen = trie.freeze()
+
+    # Benchmarking
+    benchmark(frozen.__contains__, words[0])
+
+    # Correctness
+    assert len(frozen) == len(trie)
+
+    for w in words + [random_word(1, 8) for _ in range(200)]:
+        assert (w in frozen) == (w in trie)
+
+    for prefix in ['', words[0][:1], words[1][:2]]:
+        assert sorted(frozen.get_completions(prefix)) == sorted(trie.get_completions(prefix))
+        assert sorted(frozen.get_paths(prefix)) == sorted(trie.get_paths(prefix))
+
+    assert frozen.get_completions('') == sorted(words)
+
+    # Shared suffixes are stored once
+    assert len(frozen.complete) < len(trie)
+    assert frozen.memory_usage()['total'] == sum(v for k, v in frozen.memory_usage().items() if k != 'total')
+
+    # Errors
+    with pytest.raises(KeyError):
+        frozen.get_completions('0')
+
+
+def test_from_sorted():
+    words = sorted(['nightmare', 'night', 'nightly', 'halloween', 'knight', 'night'])
+    trie = _trie(words)
+
+    # Correctness
+    for other in [Trie.from_sorted(words, '', ''.join), FrozenTrie.from_sorted(words, '', ''.join)]:
+        assert len(other) == len(trie)
+        assert sorted(other.get_completions('')) == sorted(trie.get_completions(''))
+        assert 'night' in other and 'nigh' not in other
+
+    assert len(FrozenTrie.from_sorted(words, '', ''.join).complete) == len(trie.freeze().complete)
+
+    # Errors
+    with pytest.raises(ValueError):
+        Trie.from_sorted(['night', 'halloween'], '', ''.join)
+
+    with pytest.raises(ValueError):
+        FrozenTrie.from_sorted(['night', 'halloween'], '', ''.join)
+
+
+def test_iter_completions(benchmark: BenchmarkFixture):
+    seed('iter_completions')
+    words = list(set(random_word(1, 10) for _ in range(5000)))
+    trie = _trie(words)
+    frozen = trie.freeze()
+
+    # Benchmarking
+    result = benchmark(lambda: list(trie.iter_completions('', limit=10)))
+
+    # Correctness
+    assert result == trie.get_completions('')[:10]
+    assert len(list(trie.iter_completions(''))) == len(words)
+
+    for t in [trie, frozen]:
+        assert list(t.iter_completions('', order='sorted')) == sorted(words)
+        breadth = list(t.iter_completions('', order='breadth'))
+        assert sorted(breadth) == sorted(words)
+        assert [len(w) for w in breadth] == sorted(len(w) for w in words)
+        assert list(t.iter_completions('a', limit=3, order='sorted')) == sorted(w for w in words if w[0] == 'a')[:3]
+        assert set(t.iter_paths('a')) == {w for w in words if w[0] == 'a' and w != 'a'}
+
+    # Errors
+    with pytest.raises(ValueError):
+        trie.iter_completions('', order='random')
+
+
+def test_top_completions():
+    trie = Trie('', ''.join)
+    trie.add('night', 5)
+    trie.add('nightmare', 9)
+    trie.add('nightly', 1)
+    trie.add('knight', 7)
+    trie.add('nigh')
+
+    # Correctness
+    assert trie.top_completions('', 3) == [('nightmare', 9), ('knight', 7), ('night', 5)]
+    assert trie.top_completions('night', 5) == [('nightmare', 9), ('night', 5), ('nightly', 1)]
+
+    # Weight updates, up and down
+    trie.add('nightly', 10)
+    trie.add('nightmare', 2)
+    assert trie.top_completions('nig', 2) == [('nightly', 10), ('night', 5)]
+    assert trie.root.max_weight == 10
+
+    trie.add('nightly', -1)
+    assert trie.top_completions('', 2) == [('knight', 7), ('night', 5)]
+    assert trie.top_completions('nigh', 10)[-1] == ('nightly', -1)
+
+    # Unweighted tries
+    trie = Trie.from_sorted(['halloween', 'knight', 'night'], '', ''.join)
+    assert sorted(trie.top_completions('', 5)) == [('halloween', 0), ('knight', 0), ('night', 0)]
+
+
+@pytest.mark.parametrize('size', [1000, 10000, 100000])
+def test_top_completions_benchmark(size: int, benchmark: BenchmarkFixture):
+    seed('top_completions')
+    weights = {random_word(3, 12): randint(0, 10 ** 6) for _ in range(size)}
+
+    trie = Trie('', ''.join)
+    for word, weight in weights.items():
+        trie.add(word, weight)
+
+    # Benchmarking, latency stays flat as the lexicon grows
+    result = benchmark(trie.top_completions, '', 10)
+
+    # Correctness
+    assert [w for _, w in result] == sorted(weights.values(), reverse=True)[:10]
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_open(mmap: bool, tmp_path, benchmark: BenchmarkFixture):
+    seed('save_open')
+    words = list(set(random_word(1, 8) for _ in range(2000)))
+    trie = _trie(words)
+
+    path = str(tmp_path / 'words.trie')
+    trie.save(path)
+
+    # Benchmarking
+    opened = benchmark(Trie.open, path, '', ''.join, mmap)
+
+    # Correctness
+    assert len(opened) == len(trie)
+    assert opened.get_completions('') == sorted(words)
+
+    for w in words[:100] + [random_word(1, 8) for _ in range(100)]:
+        assert (w in opened) == (w in trie)
+
+    prefix = words[0][:2]
+    assert sorted(opened.get_paths(prefix)) == sorted(trie.get_paths(prefix))
+
+
+def test_open_errors(tmp_path):
+    path = tmp_path / 'words.trie'
+
+    path.write_bytes(b'not a trie')
+    with pytest.raises(ValueError):
+        Trie.open(str(path))
+
+    trie = Trie(())
+    trie.add([('tuple', 'label')])
+    with pytest.raises(TypeError):
+        trie.save(str(path))
@@ -2,9 +2,13 @@ from itertools import combinations, permutations
 from random import choice, seed
 
 import numpy as np
+import pytest
+from pytest import raises
 from pytest_benchmark.fixture import BenchmarkFixture
 
-from pymatching import Word2VecMetric, word2vec_similarity
+from pymatching import (Word2VecMetric, Word2VecRatio, extract,
+                        word2vec_distance, word2vec_similarity)
+from pymatching import word2vec
 from pymatching.word2vec import get_nlp
 
 
@@ -49,3 +53,127 @@ def test_word2vec_metric():
         # Triangle Inequality
         for x, y, z in permutations(test_set, 3):
             assert metric(x, y) + metric(y, z) >= metric(x, z)
+
+
+@pytest.fixture
+def toy_nlp():
+    import spacy
+
+    nlp = spacy.blank('en')
+    for word, vector in [('cat', [1, 2, 3]), ('dog', [1, 2, 4]), ('car', [-3, 0, 1])]:
+        nlp.vocab.set_vector(word, np.array(vector, dtype=np.float32))
+
+    word2vec.set_model(nlp)
+    yield nlp
+    word2vec.set_model('en_core_web_md')
+    word2vec.vector_cache.maxsize = 2 ** 16
+
+
+def test_word2vec_vectors(toy_nlp):
+    # Correctness, the tokenizer alone gives the vectors of the pipeline
+    for text in ['cat', 'cat dog', 'a dog', 'fish']:
+        assert np.array_equal(word2vec.get_vector(text), toy_nlp(text).vector)
+
+    assert np.allclose(word2vec_similarity('cat', 'dog'), toy_nlp('cat').similarity(toy_nlp('dog')))
+    assert np.allclose(word2vec_similarity('cat dog', 'car'), toy_nlp('cat dog').similarity(toy_nlp('car')))
+    assert word2vec_similarity('cat', 'fish') == 0
+    assert word2vec_similarity('cat', 'cat') == 1
+    assert Word2VecMetric()('cat', 'dog') == 1
+    assert extract('cat', ['car', 'dog', 'cat'], scorer=word2vec_distance, limit=2) == [('cat', 0, 2), ('dog', 1, 1)]
+
+    batch = word2vec.get_vectors(['cat', 'bird', 'cat dog', 'bird'])
+    assert batch.shape == (4, 3)
+    assert np.array_equal(batch[2], toy_nlp('cat dog').vector)
+    assert word2vec.get_vectors([]).shape == (0, 3)
+
+
+def test_word2vec_cache(toy_nlp):
+    word2vec.vector_cache.clear()
+
+    # Correctness
+    word2vec_similarity('cat', 'dog')
+    word2vec_similarity('dog', 'cat')
+    assert word2vec.vector_cache.info() == (2, 2, 2 ** 16, 2)
+
+    word2vec.get_vectors(['cat', 'bird', 'bird'])
+    assert word2vec.vector_cache.info() == (3, 4, 2 ** 16, 3)
+
+    # Least recently used texts are evicted first
+    word2vec.vector_cache.maxsize = 2
+    word2vec.get_vector('cat')
+    word2vec.get_vector('car')
+    assert len(word2vec.vector_cache) == 2
+    assert word2vec.vector_cache.get('bird') is None and word2vec.vector_cache.get('cat') is not None
+
+    with raises(ValueError):
+        word2vec.get_vector('cat')[0] = 1
+
+
+def test_word2vec_similarity_matrix(toy_nlp):
+    texts_a = ['cat', 'dog', 'fish', 'cat dog', 'car']
+    texts_b = ['dog', 'car', 'cat', 'bird', 'cat']
+
+    # Correctness
+    result = Word2VecRatio().similarity_matrix(texts_a, texts_b)
+    assert result.shape == (5, 5)
+    assert np.allclose(result, [[word2vec_similarity(a, b) for b in texts_b] for a in texts_a])
+    assert result[0, 2] == result[0, 4] == 1 and not result[2].any()
+
+    assert word2vec.similarity_matrix([], texts_b).shape == (0, 5)
+
+
+def test_word2vec_most_similar(toy_nlp, benchmark: BenchmarkFixture):
+    rng = np.random.default_rng(0)
+    vocab = ['w{}'.format(i) for i in range(5000)]
+    for word in vocab:
+        toy_nlp.vocab.set_vector(word, rng.standard_normal(3).astype(np.float32))
+
+    candidates = vocab + ['fish']
+    index = word2vec.VectorIndex(candidates)
+
+    # Correctness, against scoring every candidate
+    for query in ['w1', 'cat', 'cat dog']:
+        scores = [word2vec_similarity(query, c) for c in candidates]
+        expected = sorted(range(len(candidates)), key=lambda i: -scores[i])[:5]
+
+        result = word2vec.most_similar(query, index, 5)
+        assert [i for _, _, i in result] == expected
+        assert np.allclose([score for _, score, _ in result], [scores[i] for i in expected])
+
+    assert word2vec.most_similar('w1', candidates, 1) == [('w1', 1, 1)]
+    assert word2vec.most_similar('fish', index) == []
+
+    # Approximate search only scores the candidates sharing a bucket
+    approximate = word2vec.VectorIndex(candidates, n_bits=6, n_tables=4)
+    assert approximate.most_similar('w1', 1) == [('w1', 1, 1)]
+    assert len(approximate._candidates(word2vec.get_vector('w1'))) < len(candidates)
+
+    with raises(ValueError):
+        word2vec.VectorIndex(candidates, n_bits=64)
+
+    # Benchmarking
+    benchmark(approximate.most_similar, 'cat', 10)
+
+
+def test_word2vec_store(toy_nlp, tmp_path):
+    word2vec.export_vectors(str(tmp_path), toy_nlp)
+    store = word2vec.VectorStore.open(str(tmp_path))
+
+    # Correctness
+    assert isinstance(store.vectors, np.memmap)
+    assert len(store) == 3 and 'cat' in store and 'fish' not in store
+
+    for text in ['cat', 'cat dog', 'a dog', 'fish', '(car)', '']:
+        assert np.allclose(store.vector(text), toy_nlp(text).vector)
+
+    # Scores without spaCy
+    word2vec.set_model(store)
+    assert word2vec.nlp is None
+
+    assert np.allclose(word2vec_similarity('cat', 'dog'), toy_nlp('cat').similarity(toy_nlp('dog')))
+    assert Word2VecMetric()('cat', 'dog') == 1
+    assert word2vec.similarity_matrix(['cat', 'fish'], ['car']).shape == (2, 1)
+    assert word2vec.get_vectors([]).shape == (0, 3)
+    assert word2vec.nlp is None
+
+    assert np.array_equal(word2vec.VectorStore.open(str(tmp_path), mmap=False).vectors, store.vectors)
@@ -1,6 +1,6 @@
 import string
-from random import choice, randint
-from typing import Optional
+from random import Random, choice, randint
+from typing import List, Optional, Set, Tuple
 
 
 def random_word(a: int, b: Optional[int] = None) -> str:
@@ -12,3 +12,32 @@ def random_word(a: int, b: Optional[int] = None) -> str:
         ma = b
 
     return ''.join(choice(string.ascii_letters) for _ in range(randint(mi, ma)))
+
+
+def random_records(n: int, seed: str, vocabulary: int = 300, sizes: Tuple[int, int] = (1, 30), copies: int = 0,
+                   edits: Tuple[int, int] = (0, 0), skewed: bool = False) -> List[Set[int]]:
+    """
+    Sets of ints, each followed by copies with a few elements replaced,
+    skewed sets draw sizes elements from a Pareto distribution instead of
+    sampling distinct ones evenly
+    """
+    rng = Random(seed)
+    records: List[Set[int]] = []
+
+    while len(records) < n:
+        if skewed:
+            record = {min(int(rng.paretovariate(1)), vocabulary - 1) for _ in range(rng.randint(*sizes))}
+        else:
+            record = set(rng.sample(range(vocabulary), rng.randint(*sizes)))
+
+        records.append(record)
+
+        for _ in range(copies):
+            copy = set(record)
+            for _ in range(rng.randint(*edits)):
+                copy.discard(rng.choice(sorted(copy)))
+                copy.add(rng.randrange(vocabulary))
+
+            records.append(copy)
+
+    return records[:n]